@@ -5,8 +5,9 @@ const mongoose = require('mongoose');
 const Discount = require('./models/Discount');
 const fs = require('fs');
 const path = require('path');
+const zlib = require('zlib');
 const cron = require('node-cron');
-const { exec } = require('child_process');
+const { exec, spawn } = require('child_process');
 
 dotenv.config();
 
@@ -27,9 +28,154 @@ app.get('/', (req, res) => {
   res.json({ message: 'ChileCupones API is running' });
 });
 
+// Read model exported by the crawler (crawler-scripts/read_model.py):
+// manifest.json maps each bucket (all, bank/<slug>, category/<slug>) to its
+// ETag, and <bucket>.json.gz / .json.br hold the pre-joined, sorted offers
+const READ_MODEL_DIR = path.join(__dirname, 'data', 'read-model');
+let readModelManifest = { mtimeMs: null, data: null };
+
+// Verifications and counters the API changed since the read model was
+// exported: _id -> { at, fields }. They are laid over the read model's
+// buckets instead of invalidating it, and dropped once an export has them.
+const liveFields = new Map();
+let liveVersion = 0;
+// Bucket name -> its parsed offers and, for the current liveVersion, the overlaid body
+const overlayCache = new Map();
+
+const recordLiveFields = (discount, fields) => {
+  liveFields.set(String(discount._id ?? discount.externalId), { at: Date.now(), fields });
+  liveVersion += 1;
+};
+
+// Same slugs as crawler-scripts/read_model.py
+const slugify = (name) => (name || '').toLowerCase()
+  .replace(/[áéíóúüñ]/g, c => 'aeiouun'['áéíóúüñ'.indexOf(c)])
+  .replace(/[^a-z0-9]+/g, ' ').trim().replace(/ /g, '-');
+
+// The live counterpart of the read model's bank/<slug> and category/<slug> buckets
+const matchesBucket = (discount, query) => {
+  if (query.bank) {
+    const banks = (discount.paymentMethods || []).map(method => method && method.name);
+    if (discount.paymentMethod) banks.push(discount.paymentMethod);
+    return banks.some(bank => bank && slugify(bank) === query.bank);
+  }
+  if (query.category) {
+    const categories = (discount.store && discount.store.categories) || [];
+    return categories.some(category => slugify(category) === query.category);
+  }
+  return true;
+};
+
+const readManifest = () => {
+  const file = path.join(READ_MODEL_DIR, 'manifest.json');
+  let stat;
+  try {
+    stat = fs.statSync(file);
+  } catch (err) {
+    return null;
+  }
+  if (readModelManifest.mtimeMs !== stat.mtimeMs) {
+    readModelManifest = { mtimeMs: stat.mtimeMs, data: JSON.parse(fs.readFileSync(file, 'utf-8')) };
+    // generatedAt is when the export read the discounts: older changes are in it
+    const generatedAt = Date.parse(readModelManifest.data.generatedAt);
+    for (const [id, { at }] of liveFields) {
+      if (at < generatedAt) liveFields.delete(id);
+    }
+    liveVersion += 1;
+  }
+  return readModelManifest.data;
+};
+
+// The bucket's body with liveFields laid over it, or null when none of its offers changed
+const overlayBucket = (name, bucket) => {
+  let cached = overlayCache.get(name);
+  if (!cached || cached.etag !== bucket.etag) {
+    const body = zlib.gunzipSync(fs.readFileSync(path.join(READ_MODEL_DIR, `${name}.json.gz`)));
+    cached = { etag: bucket.etag, offers: JSON.parse(body), version: null, body: null };
+    overlayCache.set(name, cached);
+  }
+  if (cached.version !== liveVersion) {
+    let changed = false;
+    const offers = cached.offers.map(offer => {
+      const live = liveFields.get(String(offer._id ?? offer.externalId));
+      if (!live) return offer;
+      changed = true;
+      return { ...offer, ...live.fields };
+    });
+    cached.version = liveVersion;
+    cached.body = changed ? JSON.stringify(offers) : null;
+  }
+  return cached.body;
+};
+
+// Sends a bucket of the read model, as-is unless the API changed some of
+// its offers since the export; false when there is none to send
+const sendReadModel = (req, res) => {
+  const manifest = readManifest();
+  if (!manifest) return false;
+
+  let name = 'all';
+  if (req.query.bank) name = `bank/${req.query.bank}`;
+  else if (req.query.category) name = `category/${req.query.category}`;
+  const bucket = manifest.buckets[name];
+  if (!bucket) {
+    // An unknown bank or category simply has no offers
+    if (name !== 'all') {
+      res.json([]);
+      return true;
+    }
+    return false;
+  }
+
+  let overlaid = null;
+  if (liveFields.size) {
+    try {
+      overlaid = overlayBucket(name, bucket);
+    } catch (err) {
+      return false;
+    }
+  }
+
+  const etag = overlaid ? `"${bucket.etag}-${liveVersion}"` : `"${bucket.etag}"`;
+  res.set({
+    'ETag': etag,
+    'Cache-Control': 'public, no-cache',
+    'Vary': 'Accept-Encoding',
+    'Content-Type': 'application/json; charset=utf-8',
+  });
+  if ((req.headers['if-none-match'] || '').split(',').map(tag => tag.trim()).includes(etag)) {
+    res.status(304).end();
+    return true;
+  }
+  if (overlaid) {
+    res.send(overlaid);
+    return true;
+  }
+
+  const accepted = req.headers['accept-encoding'] || '';
+  const encoding = bucket.encodings.includes('br') && /\bbr\b/.test(accepted) ? 'br'
+    : /\bgzip\b/.test(accepted) ? 'gzip' : null;
+  const file = path.join(READ_MODEL_DIR, `${name}.json.${encoding === 'br' ? 'br' : 'gz'}`);
+  let body;
+  try {
+    body = fs.readFileSync(file);
+  } catch (err) {
+    return false;
+  }
+  if (encoding) {
+    res.set('Content-Encoding', encoding);
+  } else {
+    body = zlib.gunzipSync(body);
+  }
+  res.send(body);
+  return true;
+};
+
 // API Routes
 app.get('/api/discounts', async (req, res) => {
   try {
+    if (sendReadModel(req, res)) return;
+
     let discounts = [];
     if (mongoose.connection.readyState === 1) {
        discounts = await Discount.find({ active: true })
@@ -43,11 +189,144 @@ app.get('/api/discounts', async (req, res) => {
       const jsonPath = path.join(__dirname, 'data', 'discounts.json');
       if (fs.existsSync(jsonPath)) {
         const data = fs.readFileSync(jsonPath, 'utf-8');
-        discounts = JSON.parse(data);
+        // Offers the crawler swept stay in the file until they are archived
+        discounts = JSON.parse(data).filter(d => d.active !== false)
+          .sort((a, b) => String(b.createdAt || '').localeCompare(String(a.createdAt || '')));
       }
     }
     
-    res.json(discounts);
+    res.json(discounts.filter(discount => matchesBucket(discount, req.query)));
+  } catch (err) {
+    res.status(500).json({ message: err.message });
+  }
+});
+
+// Map tiles exported by the crawler (crawler-scripts/spatial_index.py):
+// index.json lists the geohash cells and their bounds, <cell>.json its offers
+const TILE_DIR = path.join(__dirname, 'data', 'tiles');
+const tileCache = new Map();
+
+const readTile = (name) => {
+  const file = path.join(TILE_DIR, name);
+  let stat;
+  try {
+    stat = fs.statSync(file);
+  } catch (err) {
+    return null;
+  }
+  const cached = tileCache.get(name);
+  if (cached && cached.mtimeMs === stat.mtimeMs) return cached.data;
+  const data = JSON.parse(fs.readFileSync(file, 'utf-8'));
+  tileCache.set(name, { mtimeMs: stat.mtimeMs, data });
+  return data;
+};
+
+const haversineKm = (lat1, lng1, lat2, lng2) => {
+  const rad = Math.PI / 180;
+  const a = Math.sin((lat2 - lat1) * rad / 2) ** 2 +
+    Math.cos(lat1 * rad) * Math.cos(lat2 * rad) * Math.sin((lng2 - lng1) * rad / 2) ** 2;
+  return 2 * 6371.0088 * Math.asin(Math.sqrt(a));
+};
+
+const GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz';
+
+const geohashEncode = (lat, lng, precision) => {
+  const latRange = [-90, 90];
+  const lngRange = [-180, 180];
+  let code = '';
+  let bits = 0;
+  let bitCount = 0;
+  let even = true;
+  while (code.length < precision) {
+    const [value, range] = even ? [lng, lngRange] : [lat, latRange];
+    const mid = (range[0] + range[1]) / 2;
+    bits = bits * 2 + (value >= mid ? 1 : 0);
+    range[value >= mid ? 0 : 1] = mid;
+    even = !even;
+    if (++bitCount === 5) {
+      code += GEOHASH_BASE32[bits];
+      bits = bitCount = 0;
+    }
+  }
+  return code;
+};
+
+// Geohash cells of `precision` characters covering the box, or null when
+// there are more of them than `limit` (a box wider than the indexed area)
+const coveringCells = (south, west, north, east, precision, limit) => {
+  const lngBits = Math.ceil(precision * 5 / 2);
+  const cellHeight = 180 / 2 ** (precision * 5 - lngBits);
+  const cellWidth = 360 / 2 ** lngBits;
+  const clamp = (value, min, max) => Math.min(Math.max(value, min), max);
+  [south, north] = [clamp(south, -90, 90), clamp(north, -90, 90)];
+  [west, east] = [clamp(west, -180, 180), clamp(east, -180, 180)];
+
+  const rows = Math.floor((north + 90) / cellHeight) - Math.floor((south + 90) / cellHeight) + 1;
+  const columns = Math.floor((east + 180) / cellWidth) - Math.floor((west + 180) / cellWidth) + 1;
+  if (rows <= 0 || columns <= 0) return [];
+  if (rows * columns > limit) return null;
+
+  const cells = [];
+  for (let row = 0; row < rows; row++) {
+    const lat = Math.min((Math.floor((south + 90) / cellHeight) + row + 0.5) * cellHeight - 90, 90);
+    for (let column = 0; column < columns; column++) {
+      const lng = Math.min((Math.floor((west + 180) / cellWidth) + column + 0.5) * cellWidth - 180, 180);
+      cells.push(geohashEncode(lat, lng, precision));
+    }
+  }
+  return cells;
+};
+
+// Offers in a bounding box (?bbox=south,west,north,east) or near a point
+// (?lat=..&lng=..&radius=km). Only the tiles of the cells covering the area
+// are looked up in index.json and read.
+app.get('/api/discounts/map', (req, res) => {
+  try {
+    const index = readTile('index.json');
+    if (!index) {
+      return res.status(503).json({ message: 'Map tiles have not been generated yet' });
+    }
+
+    let south, west, north, east;
+    let center = null;
+    let radius = null;
+    if (req.query.bbox) {
+      [south, west, north, east] = req.query.bbox.split(',').map(Number);
+    } else if (req.query.lat && req.query.lng) {
+      center = { lat: Number(req.query.lat), lng: Number(req.query.lng) };
+      radius = Number(req.query.radius || 5);
+      const dLat = radius / 111.32;
+      const dLng = radius / (111.32 * Math.max(Math.cos(center.lat * Math.PI / 180), 1e-6));
+      [south, west, north, east] = [center.lat - dLat, center.lng - dLng, center.lat + dLat, center.lng + dLng];
+    }
+    if ([south, west, north, east, radius ?? 0].some(v => v === undefined || Number.isNaN(v))) {
+      return res.status(400).json({ message: 'Pass bbox=south,west,north,east or lat, lng and radius (km)' });
+    }
+
+    const indexed = Object.keys(index.cells);
+    const covering = coveringCells(south, west, north, east, index.precision, indexed.length);
+    const cells = covering
+      ? covering.filter(cell => index.cells[cell])
+      : indexed.filter(cell => {
+        const [cellSouth, cellWest, cellNorth, cellEast] = index.cells[cell].bounds;
+        return !(cellSouth > north || cellNorth < south || cellWest > east || cellEast < west);
+      });
+
+    const results = [];
+    for (const cell of cells) {
+      for (const offer of readTile(`${cell}.json`) || []) {
+        if (offer.latitude < south || offer.latitude > north || offer.longitude < west || offer.longitude > east) continue;
+        if (center) {
+          const distanceKm = haversineKm(center.lat, center.lng, offer.latitude, offer.longitude);
+          if (distanceKm <= radius) results.push({ ...offer, distanceKm });
+        } else {
+          results.push(offer);
+        }
+      }
+    }
+    if (center) results.sort((a, b) => a.distanceKm - b.distanceKm);
+
+    res.json(results);
   } catch (err) {
     res.status(500).json({ message: err.message });
   }
@@ -68,6 +347,7 @@ app.patch('/api/discounts/:id/verify', async (req, res) => {
         discount.verified = verified;
         discount.lastVerifiedAt = new Date();
         await discount.save();
+        recordLiveFields(discount, { verified: discount.verified, lastVerifiedAt: discount.lastVerifiedAt });
         updated = true;
       }
     }
@@ -82,6 +362,7 @@ app.patch('/api/discounts/:id/verify', async (req, res) => {
           data[index].verified = verified;
           data[index].lastVerifiedAt = new Date();
           fs.writeFileSync(jsonPath, JSON.stringify(data, null, 2));
+          recordLiveFields(data[index], { verified, lastVerifiedAt: data[index].lastVerifiedAt });
           updated = true;
         }
       }
@@ -110,6 +391,7 @@ app.get('/api/track/:id', async (req, res) => {
       if (discount) {
         discount.clicks += 1;
         await discount.save();
+        recordLiveFields(discount, { clicks: discount.clicks });
         url = discount.url;
         updated = true;
       }
@@ -125,6 +407,7 @@ app.get('/api/track/:id', async (req, res) => {
           data[index].clicks = (data[index].clicks || 0) + 1;
           url = data[index].url;
           fs.writeFileSync(jsonPath, JSON.stringify(data, null, 2));
+          recordLiveFields(data[index], { clicks: data[index].clicks });
         }
       }
     }
@@ -160,6 +443,7 @@ app.post('/api/discounts/:id/feedback', async (req, res) => {
         else discount.dislikes += 1;
         await discount.save();
         newCounts = { likes: discount.likes, dislikes: discount.dislikes };
+        recordLiveFields(discount, newCounts);
         updated = true;
       }
     }
@@ -176,6 +460,7 @@ app.post('/api/discounts/:id/feedback', async (req, res) => {
           
           newCounts = { likes: data[index].likes, dislikes: data[index].dislikes };
           fs.writeFileSync(jsonPath, JSON.stringify(data, null, 2));
+          recordLiveFields(data[index], newCounts);
           updated = true;
         }
       }
@@ -192,25 +477,71 @@ app.post('/api/discounts/:id/feedback', async (req, res) => {
 });
 
 // Crawler Automation
-const runCrawler = () => {
+const CRAWLER_DIR = path.join(__dirname, '..', 'crawler-scripts');
+// Warm crawler worker (crawler-scripts/daemon.py). Runs go through it when it
+// is up; otherwise every run spawns a fresh `python main.py`.
+const CRAWLER_DAEMON_URL = process.env.CRAWLER_DAEMON_URL || 'http://127.0.0.1:8765';
+// Longest wait for a daemon run before giving up on it (the runs go on in the daemon)
+const CRAWLER_RUN_TIMEOUT_MS = Number(process.env.CRAWLER_RUN_TIMEOUT_MS || 30 * 60 * 1000);
+
+const crawlerPython = () => {
+  // Determine Python path based on OS and environment
+  const venvDir = path.join(CRAWLER_DIR, '.venv'); // Docker/Linux structure
+  const localVenvDir = path.join(__dirname, '..', '.venv'); // Local Windows structure
+
+  if (fs.existsSync(path.join(localVenvDir, 'Scripts', 'python.exe'))) {
+    return path.join(localVenvDir, 'Scripts', 'python.exe');
+  } else if (fs.existsSync(path.join(venvDir, 'bin', 'python'))) {
+    return path.join(venvDir, 'bin', 'python');
+  }
+  return 'python'; // Fallback to global python
+};
+
+const crawlerDaemonIsUp = async () => {
+  try {
+    const response = await fetch(`${CRAWLER_DAEMON_URL}/health`, { signal: AbortSignal.timeout(1000) });
+    return response.ok;
+  } catch (err) {
+    return false;
+  }
+};
+
+const runCrawlerInDaemon = async () => {
+  // wait=1 answers once the runs finished, so callers can reload the data
+  let response;
+  try {
+    response = await fetch(`${CRAWLER_DAEMON_URL}/runs?wait=1`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: '{}',
+      signal: AbortSignal.timeout(CRAWLER_RUN_TIMEOUT_MS),
+    });
+  } catch (err) {
+    if (err.name === 'TimeoutError') {
+      throw new Error(`Crawler daemon runs still going after ${CRAWLER_RUN_TIMEOUT_MS / 1000}s`);
+    }
+    throw err;
+  }
+  if (!response.ok) throw new Error(`Crawler daemon answered ${response.status}`);
+  const { runs } = await response.json();
+  const failed = runs.filter(run => run.status !== 'ok');
+  if (failed.length === runs.length) {
+    throw new Error(failed.map(run => `${run.source}: ${run.error || run.status}`).join('; '));
+  }
+  return runs;
+};
+
+const runCrawler = async () => {
+  if (await crawlerDaemonIsUp()) {
+    console.log('Starting Crawler run in daemon...');
+    return runCrawlerInDaemon();
+  }
+
   return new Promise((resolve, reject) => {
     console.log('Starting Crawler...');
-    
-    // Determine Python path based on OS and environment
-    const isWin = process.platform === "win32";
-    const venvDir = path.join(__dirname, '..', 'crawler-scripts', '.venv'); // Docker/Linux structure
-    const localVenvDir = path.join(__dirname, '..', '.venv'); // Local Windows structure
-    
-    let pythonPath;
-    if (fs.existsSync(path.join(localVenvDir, 'Scripts', 'python.exe'))) {
-        pythonPath = path.join(localVenvDir, 'Scripts', 'python.exe');
-    } else if (fs.existsSync(path.join(venvDir, 'bin', 'python'))) {
-        pythonPath = path.join(venvDir, 'bin', 'python');
-    } else {
-        pythonPath = 'python'; // Fallback to global python
-    }
 
-    const scriptPath = path.join(__dirname, '..', 'crawler-scripts', 'main.py');
+    const pythonPath = crawlerPython();
+    const scriptPath = path.join(CRAWLER_DIR, 'main.py');
     
     // Check if venv exists, otherwise try global python
     const cmd = fs.existsSync(pythonPath) && pythonPath !== 'python' ? `"${pythonPath}" "${scriptPath}"` : `python "${scriptPath}"`;
@@ -229,6 +560,16 @@ const runCrawler = () => {
   });
 };
 
+// Start the crawler daemon next to the API unless one is already running or
+// CRAWLER_DAEMON=off. Its output goes straight to ours instead of being buffered.
+const startCrawlerDaemon = async () => {
+  if (process.env.CRAWLER_DAEMON === 'off' || await crawlerDaemonIsUp()) return;
+  const daemon = spawn(crawlerPython(), [path.join(CRAWLER_DIR, 'daemon.py')], { cwd: CRAWLER_DIR, stdio: 'inherit' });
+  daemon.on('error', err => console.error(`Crawler daemon failed to start: ${err.message}`));
+  daemon.on('exit', code => console.log(`Crawler daemon exited with code ${code}`));
+  process.on('exit', () => daemon.kill());
+};
+
 // Manual Trigger Endpoint
 app.post('/api/crawl', async (req, res) => {
   try {
@@ -240,11 +581,15 @@ app.post('/api/crawl', async (req, res) => {
 });
 
 // Scheduled Task (Every day at 3 AM)
-cron.schedule('0 3 * * *', () => {
+cron.schedule('0 3 * * *', async () => {
+  // The daemon keeps its own per-source schedule
+  if (await crawlerDaemonIsUp()) return;
   console.log('Running scheduled crawler task...');
-  runCrawler();
+  runCrawler().catch(err => console.error(`Scheduled crawl failed: ${err.message}`));
 });
 
+startCrawlerDaemon();
+
 // Database Connection
 mongoose.connect(process.env.MONGO_URI)
   .then(() => console.log('MongoDB Connected'))
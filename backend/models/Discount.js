@@ -8,10 +8,13 @@ const discountSchema = new mongoose.Schema({
   discountPercentage: Number, // e.g., 20 for 20%
   discountAmount: Number, // e.g., 5000 for $5000 off
   currency: { type: String, default: 'CLP' },
+  installments: Number, // e.g., 6 for "6 cuotas sin interés"
+  weekdays: [String], // e.g., ["tuesday"]; empty means every day
   
   // Relations
   store: { type: mongoose.Schema.Types.ObjectId, ref: 'Store' },
   paymentMethods: [{ type: mongoose.Schema.Types.ObjectId, ref: 'PaymentMethod' }],
+  paymentMethod: String, // Name of the bank in paymentMethods, as the frontend filters on it
   
   // Validity
   validFrom: Date,
@@ -23,15 +26,25 @@ const discountSchema = new mongoose.Schema({
   
   // Media
   imageUrl: String,
+
+  // Location (main branch of the store, from the crawler's gazetteer)
+  latitude: Number,
+  longitude: Number,
+  geohash: String, // Prefix queries give every enclosing map cell
   
   // Status
   active: { type: Boolean, default: true },
   verified: { type: Boolean, default: false }, // Validated by Validation Service
   lastVerifiedAt: Date,
+  deactivatedAt: Date, // When the source stopped listing it; archived after ARCHIVE_AFTER_DAYS
   
   // Metadata
   source: { type: String, required: true }, // e.g., "crawler-banco-chile"
   externalId: String, // ID in the source system to avoid duplicates
+  contentHash: String, // Fingerprint of the scraped content, unchanged offers are skipped
+  offerGroupId: String, // Shared by near-duplicates of the same promotion across banks
+  crawlGeneration: String, // Id of the last crawl run that saw the offer
+  lastSeenAt: Date,
   
   // Metrics
   clicks: { type: Number, default: 0 },
@@ -46,6 +59,9 @@ const discountSchema = new mongoose.Schema({
 discountSchema.index({ store: 1, active: 1 });
 discountSchema.index({ paymentMethods: 1, active: 1 });
 discountSchema.index({ validUntil: 1 });
+discountSchema.index({ geohash: 1, active: 1 });
+discountSchema.index({ offerGroupId: 1 });
+discountSchema.index({ source: 1, active: 1, crawlGeneration: 1 }); // Per-source sweep of vanished offers
 discountSchema.index({ externalId: 1, source: 1 }, { unique: true }); // Prevent duplicates from same source
 
 module.exports = mongoose.model('Discount', discountSchema);
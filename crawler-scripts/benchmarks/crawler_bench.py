@@ -0,0 +1,224 @@
+"""
+Offline crawler benchmark.
+
+Serves synthetic (or recorded) listing pages from a local HTTP server and runs
+the BaseScraper.run fetch -> parse -> save pipeline against them, with
+mongomock or a local mongod. Each case runs in a fresh process so peak RSS is
+per case. Results are written as JSON for comparison across commits.
+
+    cd crawler-scripts
+    python -m benchmarks.crawler_bench --cards 10,1000,10000
+    python -m benchmarks.crawler_bench --mongo mongodb://localhost:27017/chilecupones_bench
+    python -m benchmarks.crawler_bench --compare benchmarks/results/old.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+STAGES = ('fetch', 'parse', 'save')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values):
+    return {
+        'p50': percentile(values, 50),
+        'p90': percentile(values, 90),
+        'p99': percentile(values, 99),
+        'mean': sum(values) / len(values),
+    }
+
+
+def _count_mongomock_calls(counter):
+    import mongomock
+
+    methods = ('find', 'find_one', 'insert_one', 'insert_many', 'update_one', 'update_many',
+               'bulk_write', 'delete_many', 'aggregate', 'count_documents')
+
+    def wrap(name):
+        original = getattr(mongomock.collection.Collection, name)
+
+        def counted(self, *args, **kwargs):
+            counter['round_trips'] += 1
+            return original(self, *args, **kwargs)
+
+        setattr(mongomock.collection.Collection, name, counted)
+
+    for name in methods:
+        wrap(name)
+
+
+def run_case(n_cards, repeat, mongo_uri, tier, fixture, seed):
+    """Benchmark one listing size. Runs inside a fresh worker process."""
+    # Must be set before the crawler modules read their configuration
+    os.environ['CRAWLER_CACHE_DIR'] = tempfile.mkdtemp(prefix='crawler-bench-')
+    if mongo_uri:
+        os.environ['MONGO_URI'] = mongo_uri
+
+    from benchmarks.fixtures import listing_html, recorded_fixture
+    from benchmarks.server import FixtureServer
+    import scrapers.base_scraper as base
+    from scrapers.banco_chile import BancoChileScraper
+    from scrapers.extraction import CardSelectors
+
+    counter = {'round_trips': 0}
+    if mongo_uri:
+        # Real round trips are counted by db.py's command listener into scraper.metrics
+        import db
+        database = db.get_database()
+    else:
+        import mongomock
+        _count_mongomock_calls(counter)
+        database = mongomock.MongoClient().get_database('chilecupones_bench')
+    base.get_database = lambda: database
+    base.is_database_available = lambda: True
+
+    class BenchScraper(BancoChileScraper):
+        card_selectors = CardSelectors(card='article.benefit', title='h3')
+        pagination = None
+        api_patterns = ()
+        dynamic = tier == 'browser'
+
+        def __init__(self, url):
+            super().__init__()
+            self.source_name = 'bench'
+            self.url = url
+
+    html = recorded_fixture(fixture) if fixture else listing_html(n_cards, seed)
+    timings = {stage: [] for stage in STAGES}
+    totals, round_trips, items_saved, downloaded = [], [], [], []
+
+    with FixtureServer({'/beneficios': html}) as server:
+        for _ in range(repeat):
+            for name in ('discounts', 'stores'):
+                database.drop_collection(name)
+            base._store_cache.clear()
+
+            scraper = BenchScraper(server.url('/beneficios'))
+            counter['round_trips'] = 0
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                scraper.run()
+            totals.append(time.perf_counter() - start)
+            round_trips.append(scraper.metrics.db_round_trips if mongo_uri else counter['round_trips'])
+            items_saved.append(database['discounts'].count_documents({}))
+            downloaded.append(scraper.metrics.bytes_downloaded)
+            # Stages overlap in the streaming pipeline; these are the time spent in each
+            for stage in STAGES:
+                timer = scraper.metrics.stages.get(stage)
+                timings[stage].append(timer.seconds if timer else 0.0)
+
+    if tier == 'browser':
+        from browser_pool import close_browser_pool
+        close_browser_pool()
+
+    median_total = percentile(totals, 50)
+    return {
+        'cards': n_cards if not fixture else None,
+        'fixture': fixture,
+        'tier': tier,
+        'repeat': repeat,
+        'items_saved': items_saved[-1],
+        'cards_per_sec': items_saved[-1] / median_total if median_total else None,
+        'total_seconds': summarize(totals),
+        'stages': {stage: summarize(values) for stage, values in timings.items()},
+        'db_round_trips': percentile(round_trips, 50),
+        'bytes_downloaded': percentile(downloaded, 50),
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_case(case, baseline=None):
+    label = case['fixture'] or f"{case['cards']} cards"
+    line = (f"  {label:<16} {case['cards_per_sec'] or 0:10.0f} cards/s  "
+            f"fetch p50 {case['stages']['fetch']['p50'] * 1000:8.1f}ms  "
+            f"parse p50 {case['stages']['parse']['p50'] * 1000:8.1f}ms  "
+            f"save p50 {case['stages']['save']['p50'] * 1000:8.1f}ms  "
+            f"db {case['db_round_trips']:5d} rt  rss {case['peak_rss_kb'] / 1024:7.1f}MB")
+    if baseline and baseline.get('cards_per_sec') and case['cards_per_sec']:
+        line += f"  ({(case['cards_per_sec'] / baseline['cards_per_sec'] - 1) * 100:+.1f}% vs baseline)"
+    print(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline crawler throughput benchmark")
+    parser.add_argument('--cards', default='10,100,1000,10000',
+                        help='comma-separated listing sizes')
+    parser.add_argument('--fixture', action='append', default=[],
+                        help='recorded page in benchmarks/fixtures/ to benchmark instead of synthetic sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case')
+    parser.add_argument('--mongo', default=None,
+                        help='MongoDB URI of a scratch database (default: in-memory mongomock)')
+    parser.add_argument('--tier', choices=('http', 'browser'), default='http',
+                        help='fetch through the static HTTP tier or through Playwright')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='result file (default: benchmarks/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', default=None, help='earlier result file to compare against')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cases = [(None, f) for f in args.fixture] or [(int(n), None) for n in args.cards.split(',') if n]
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            for case in json.load(f)['cases']:
+                baseline[(case['cards'], case['fixture'], case['tier'])] = case
+
+    results = []
+    print(f"Crawler benchmark ({'mongod' if args.mongo else 'mongomock'}, {args.tier} tier, {args.repeat} runs per case)")
+    for n_cards, fixture in cases:
+        # A fresh process per case keeps peak RSS and module state independent
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            case = pool.submit(run_case, n_cards, args.repeat, args.mongo, args.tier, fixture, args.seed).result()
+        results.append(case)
+        print_case(case, baseline.get((case['cards'], case['fixture'], case['tier'])))
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': 'mongod' if args.mongo else 'mongomock',
+        'cases': results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
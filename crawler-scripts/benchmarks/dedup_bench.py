@@ -0,0 +1,108 @@
+"""
+Benchmark for cross-bank near-duplicate grouping (scrapers/dedup.py).
+
+Plants promotions that appear under one to three banks in different
+wordings, groups them with a fresh OfferGrouper and reports throughput and
+how well the groups match the planted promotions.
+
+    cd crawler-scripts
+    python -m benchmarks.dedup_bench --size 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from scrapers.records import Offer
+
+BANKS = ("Banco de Chile", "Banco Itaú", "Santander", "BCI")
+WORDINGS = [
+    ("{pct}% Dcto en {store}", "{pct}% Dcto en {store}\nPagando con tarjetas {bank}. Válido hasta el 31 de diciembre."),
+    ("{pct}% de descuento en {store}", "Descuento exclusivo en {store}"),
+    ("{pct}% dcto. en {store}", "Exclusivo clientes {bank}: {pct}% dcto. en {store} todos los días."),
+]
+KINDS = ("Restaurant", "Farmacia", "Cafetería", "Tienda", "Óptica", "Librería", "Gimnasio", "Botillería")
+SYLLABLES = ("ka", "mu", "le", "ta", "ri", "so", "pa", "ne", "lo", "vi", "ra", "che", "qui", "do", "ma", "tu")
+
+
+def store_name(rng):
+    # Made-up brand names; stores are told apart by name, as real ones are
+    brand = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+    return f"{rng.choice(KINDS)} {brand}" if rng.random() < 0.5 else brand
+
+
+def planted_offers(size, seed=0):
+    """(promotion id, bank, discount) triples; each promotion shows up under 1-3 banks."""
+    rng = random.Random(seed)
+    offers = []
+    stores = set()
+    promotion = 0
+    while len(offers) < size:
+        store = store_name(rng)
+        if store in stores:
+            continue
+        stores.add(store)
+        pct = rng.choice((10, 15, 20, 25, 30, 35, 40, 50))
+        for bank in rng.sample(BANKS, rng.randint(1, 3)):
+            title, description = rng.choice(WORDINGS)
+            offers.append((promotion, bank, Offer(
+                externalId=f"{bank[:4].lower()}-{len(offers)}",
+                title=title.format(pct=pct, store=store),
+                description=description.format(pct=pct, store=store, bank=bank),
+                url=f"https://example.com/{len(offers)}",
+                store_name=store,
+                store_slug=store.lower().replace(' ', '-'),
+                discountPercentage=pct,
+            )))
+        promotion += 1
+    return offers[:size]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Near-duplicate grouping benchmark")
+    parser.add_argument('--size', type=int, default=100000, help='offers to group')
+    parser.add_argument('--batch', type=int, default=100, help='offers per assign() call, as parse chunks')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('CRAWLER_CACHE_DIR', tempfile.mkdtemp(prefix='dedup-bench-'))
+    from scrapers.dedup import OfferGrouper
+
+    offers = planted_offers(args.size, args.seed)
+    grouper = OfferGrouper(path=os.path.join(os.environ['CRAWLER_CACHE_DIR'], 'offer_groups.json.gz'))
+
+    # As each bank's scraper does: its own batches, under its own source
+    by_bank = defaultdict(list)
+    for _, bank, discount in offers:
+        by_bank[bank].append(discount)
+    start = time.perf_counter()
+    for bank, discounts in by_bank.items():
+        for i in range(0, len(discounts), args.batch):
+            grouper.assign(discounts[i:i + args.batch], bank)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    grouper.save()
+    save_time = time.perf_counter() - start
+
+    promotions_by_group = defaultdict(set)
+    groups_by_promotion = defaultdict(set)
+    for promotion, _, discount in offers:
+        promotions_by_group[discount.offerGroupId].add(promotion)
+        groups_by_promotion[promotion].add(discount.offerGroupId)
+    pure = sum(len(p) == 1 for p in promotions_by_group.values()) / len(promotions_by_group)
+    whole = sum(len(g) == 1 for g in groups_by_promotion.values()) / len(groups_by_promotion)
+
+    print(f"{len(offers)} offers, {len(groups_by_promotion)} planted promotions -> {len(promotions_by_group)} groups")
+    print(f"  grouping   {elapsed:8.2f}s  {len(offers) / elapsed:10.0f} offers/s")
+    print(f"  save       {save_time:8.2f}s  {os.path.getsize(grouper.path) / 1024 / 1024:.1f}MB")
+    print(f"  groups holding a single promotion   {pure * 100:5.1f}%")
+    print(f"  promotions kept in a single group   {whole * 100:5.1f}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import os
+import random
+from html import escape
+
+RECORDED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+STORES = [
+    "Starbucks", "McDonald's", "Farmacias Ahumada", "Salcobrand", "Jumbo", "Lider",
+    "Rappi", "Fork", "Shell", "Copec", "Pedro, Juan y Diego", "Dunkin Donuts",
+    "Falabella", "Ripley", "Paris", "Cruz Verde", "Papa John's", "Cinemark",
+]
+TEMPLATES = [
+    "{pct}% Dcto en {store}",
+    "{pct}% de descuento en {store} pagando con tarjeta",
+    "Hasta {pct}% dcto. en {store} todos los martes",
+    "${amount} de descuento por litro en {store}",
+]
+
+
+def synthetic_cards(n_cards, seed=0):
+    """Deterministic fake offers shaped like the banks' benefit cards."""
+    rng = random.Random(seed)
+    cards = []
+    for i in range(n_cards):
+        store = rng.choice(STORES)
+        title = rng.choice(TEMPLATES).format(pct=rng.randint(5, 60), amount=rng.choice((50, 100, 150)), store=store)
+        cards.append({
+            'title': title,
+            'body': f"Válido de lunes a domingo en locales {store} adheridos. Beneficio #{i}.",
+            'href': f"/beneficios/{i}",
+            'img': f"/img/{i % 50}.png",
+        })
+    return cards
+
+
+def listing_html(n_cards, seed=0):
+    """A listing page with `n_cards` <article class="benefit"> cards (the bench scraper's selectors)."""
+    parts = ['<!doctype html><html><head><meta charset="utf-8"><title>Beneficios</title></head><body><main>']
+    for card in synthetic_cards(n_cards, seed):
+        parts.append(
+            '<article class="benefit">'
+            f'<a href="{card["href"]}"><img src="{card["img"]}" alt=""></a>'
+            f'<h3>{escape(card["title"])}</h3>'
+            f'<p>{escape(card["body"])}</p>'
+            '</article>'
+        )
+    parts.append('</main></body></html>')
+    return ''.join(parts)
+
+
+def recorded_fixture(name):
+    """Load a listing page saved from a real bank portal into benchmarks/fixtures/."""
+    with open(os.path.join(RECORDED_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
@@ -0,0 +1,64 @@
+"""
+Benchmark for the URL liveness checker (link_checker.py).
+
+Serves offer pages from a local FixtureServer that holds every response
+back by --delay seconds, with a share of them missing (404), and checks
+them one at a time, concurrently, and again from the TTL cache.
+
+    cd crawler-scripts
+    python -m benchmarks.link_check_bench --urls 500 --delay 0.05
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.server import FixtureServer
+from link_checker import LinkChecker
+
+
+def timed_check(checker, urls):
+    start = time.perf_counter()
+    results, checked = checker.check_all(urls)
+    return time.perf_counter() - start, results, checked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="URL liveness checker benchmark")
+    parser.add_argument('--urls', type=int, default=500, help='offer URLs to check')
+    parser.add_argument('--dead', type=float, default=0.1, help='share of URLs that answer 404')
+    parser.add_argument('--delay', type=float, default=0.05, help='seconds the server takes per response')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--per-host', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=0, help='request starts per second per host (0: unlimited)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    alive_paths = [f"/oferta/{i}" for i in range(args.urls) if rng.random() >= args.dead]
+    with FixtureServer({path: '<html><body>Oferta</body></html>' for path in alive_paths}, delay=args.delay) as server:
+        urls = [server.url(f"/oferta/{i}") for i in range(args.urls)]
+        expected = {server.url(path) for path in alive_paths}
+        cache_file = os.path.join(tempfile.mkdtemp(prefix='link-check-bench-'), 'link_checks.json')
+
+        # Built when their turn comes: 'cached' loads what 'concurrent' saved
+        cases = [
+            ('sequential', lambda: LinkChecker(concurrency=1, per_host=1, rate=0, cache_file=None)),
+            ('concurrent', lambda: LinkChecker(args.concurrency, args.per_host, args.rate, cache_file=cache_file)),
+            ('cached', lambda: LinkChecker(args.concurrency, args.per_host, args.rate, cache_file=cache_file)),
+        ]
+        print(f"{args.urls} URLs, {len(expected)} alive, {args.delay * 1000:.0f}ms per response")
+        for name, make_checker in cases:
+            checker = make_checker()
+            server.requests = 0
+            elapsed, results, checked = timed_check(checker, urls)
+            correct = sum((url in expected) == result['alive'] for url, result in results.items())
+            print(f"  {name:<11} {elapsed:8.2f}s  {len(urls) / elapsed:10.0f} URLs/s  "
+                  f"{server.requests:6d} requests  {checked:6d} checked  {correct}/{len(urls)} correct")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark for the offer text parsing engine (scrapers/offer_text.py).
+
+Parses batches of synthetic offer titles and descriptions and compares them
+with the per-item regex the scrapers used before, cold (empty memo cache)
+and warm (the same strings seen again, as on a re-crawl).
+
+    cd crawler-scripts
+    python -m benchmarks.offer_text_bench --size 10000
+"""
+import argparse
+import re
+import sys
+import time
+
+from benchmarks.fixtures import synthetic_cards
+from scrapers import offer_text
+
+
+def legacy_parse(title):
+    """What each scraper's parse() did inline before the shared engine."""
+    percentage = 0
+    match = re.search(r'(\d+)%', title)
+    if match:
+        percentage = int(match.group(1))
+    return percentage
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offer text parsing micro-benchmark")
+    parser.add_argument('--size', type=int, default=10000, help='strings per batch')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    pairs = [(card['title'], f"{card['title']}. {card['body']} Hasta el 31 de diciembre. 6 cuotas sin interés.")
+             for card in synthetic_cards(args.size)]
+    distinct = len(set(pairs))
+
+    def cold():
+        offer_text._parse.cache_clear()
+        offer_text.parse_offer_texts(pairs)
+
+    def warm():
+        offer_text.parse_offer_texts(pairs)
+
+    legacy = timed(lambda: [legacy_parse(title) for title, _ in pairs], args.repeat)
+    cold_time = timed(cold, args.repeat)
+    warm()
+    warm_time = timed(warm, args.repeat)
+
+    print(f"{args.size} offers ({distinct} distinct), best of {args.repeat}:")
+    print(f"  legacy percentage-only regex {legacy * 1000:9.1f}ms  {args.size / legacy:12.0f} offers/s")
+    print(f"  engine, cold cache           {cold_time * 1000:9.1f}ms  {args.size / cold_time:12.0f} offers/s")
+    print(f"  engine, warm cache           {warm_time * 1000:9.1f}ms  {args.size / warm_time:12.0f} offers/s")
+    print(f"  cache: {offer_text._parse.cache_info()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
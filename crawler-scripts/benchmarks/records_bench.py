@@ -0,0 +1,102 @@
+"""
+Memory benchmark for the pipeline's records (scrapers/records.py).
+
+Builds the raw cards and parsed offers of a synthetic listing twice, as the
+dicts the scrapers used to pass around and as RawCard/Offer, and reports
+the memory they hold (tracemalloc) and the time to build them. The strings
+are created up front and shared by both, so only the records themselves
+are measured.
+
+    cd crawler-scripts
+    python -m benchmarks.records_bench --size 100000
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fixtures import synthetic_cards
+from scrapers.offer_text import parse_offer_text
+from scrapers.records import Offer, RawCard
+
+
+def raw_fields(size):
+    fields = []
+    for i, card in enumerate(synthetic_cards(size)):
+        store = card['title'].split(' en ')[-1]
+        fields.append((f"bench-{i}", card['title'], store, f"https://example.com{card['href']}",
+                       f"https://example.com{card['img']}", f"{card['title']}\n{card['body']}"))
+    return fields
+
+
+def raw_dicts(fields):
+    return [{"id": id_, "title": title, "store": store, "url": url, "img": img, "raw_text": text}
+            for id_, title, store, url, img, text in fields]
+
+
+def raw_cards(fields):
+    return [RawCard(externalId=id_, title=title, store_name=store, url=url, imageUrl=img, raw_text=text)
+            for id_, title, store, url, img, text in fields]
+
+
+def offer_dicts(items, parsed, slugs):
+    return [{
+        'externalId': item['id'], 'title': item['title'], 'description': item['raw_text'], **fields,
+        'url': item['url'], 'imageUrl': item['img'], 'store_name': item['store'], 'store_slug': slug,
+        'latitude': None, 'longitude': None, 'geohash': None, 'paymentMethod': "Banco de Chile",
+    } for item, fields, slug in zip(items, parsed, slugs)]
+
+
+def offers(items, parsed, slugs):
+    return [Offer(
+        externalId=item.externalId, title=item.title, description=item.raw_text, **fields,
+        url=item.url, imageUrl=item.imageUrl, store_name=item.store_name, store_slug=slug,
+        paymentMethod="Banco de Chile",
+    ) for item, fields, slug in zip(items, parsed, slugs)]
+
+
+def measure(build):
+    """(records, bytes they hold, seconds to build them). Timed without tracemalloc, which slows allocation."""
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    records = build()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return records, held, elapsed
+
+
+def report(stage, size, dict_bytes, dict_time, record_bytes, record_time):
+    print(f"  {stage:<10} dict   {dict_bytes / size:7.0f} B/offer  {dict_bytes / 1024 / 1024:8.1f}MB  "
+          f"{dict_time * 1000:8.1f}ms")
+    print(f"  {'':<10} slots  {record_bytes / size:7.0f} B/offer  {record_bytes / 1024 / 1024:8.1f}MB  "
+          f"{record_time * 1000:8.1f}ms  ({(1 - record_bytes / dict_bytes) * 100:.0f}% less memory)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record representation memory benchmark")
+    parser.add_argument('--size', type=int, default=100000, help='offers to build')
+    args = parser.parse_args(argv)
+
+    fields = raw_fields(args.size)
+    # Parsed once: both representations get the same field values
+    parsed = [parse_offer_text(title, text) for _, title, _, _, _, text in fields]
+    slugs = [store.lower().replace(' ', '-') for _, _, store, _, _, _ in fields]
+
+    print(f"{args.size} offers")
+    items, dict_bytes, dict_time = measure(lambda: raw_dicts(fields))
+    cards, record_bytes, record_time = measure(lambda: raw_cards(fields))
+    report('raw cards', args.size, dict_bytes, dict_time, record_bytes, record_time)
+
+    _, dict_bytes, dict_time = measure(lambda: offer_dicts(items, parsed, slugs))
+    _, record_bytes, record_time = measure(lambda: offers(cards, parsed, slugs))
+    report('offers', args.size, dict_bytes, dict_time, record_bytes, record_time)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import hashlib
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class FixtureServer:
+    """
+    Local HTTP stand-in for a bank portal. Serves a fixed set of pages from
+    memory, optionally with ETags so conditional GETs can be exercised.
+
+        with FixtureServer({'/beneficios': html}) as server:
+            server.url('/beneficios')
+    """
+
+    def __init__(self, pages, etag=False, delay=0.0):
+        self.pages = {}
+        for path, body in pages.items():
+            self.add(path, body)
+        self.etag = etag
+        # Seconds each response is held back, to stand in for a slow portal
+        self.delay = delay
+        self.requests = 0
+        self.bytes_sent = 0
+        self._server = None
+        self._thread = None
+
+    def add(self, path, body, content_type='text/html; charset=utf-8', status=200):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.pages[path] = (status, content_type, body, '"%s"' % hashlib.md5(body).hexdigest())
+
+    def url(self, path='/'):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _respond(self, send_body):
+                fixture.requests += 1
+                if fixture.delay:
+                    time.sleep(fixture.delay)
+                page = fixture.pages.get(self.path.split('?')[0])
+                if page is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                status, content_type, body, etag = page
+                if fixture.etag and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if fixture.etag:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+                    fixture.bytes_sent += len(body)
+
+            def do_GET(self):
+                self._respond(True)
+
+            def do_HEAD(self):
+                self._respond(False)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fixture-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
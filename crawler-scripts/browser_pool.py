@@ -0,0 +1,228 @@
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Number of Chromium processes launched per crawl
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "1"))
+# Max pages loading at the same time across the whole pool
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "6"))
+# A context is thrown away and replaced after serving this many pages
+BROWSER_CONTEXT_MAX_PAGES = int(os.getenv("BROWSER_CONTEXT_MAX_PAGES", "20"))
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "true").lower() != "false"
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+class _PooledContext:
+    def __init__(self, browser, context):
+        self.browser = browser
+        self.context = context
+        self.pages_served = 0
+        self.in_use = 0
+        self.retired = False
+
+
+class BrowserPool:
+    """
+    Shared Chromium pool driven by the async Playwright API.
+
+    Playwright runs on a private event loop in a background thread, so scraper
+    threads can borrow pages through `submit()` and many pages can load in
+    parallel inside one process. Each key (usually the source name) gets its
+    own isolated browser context, recycled after `context_max_pages` pages or
+    as soon as a page on it crashes.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_pages=BROWSER_MAX_PAGES,
+                 context_max_pages=BROWSER_CONTEXT_MAX_PAGES, headless=BROWSER_HEADLESS):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.context_max_pages = max(1, context_max_pages)
+        self.headless = headless
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browsers = []
+        self._contexts = {}
+        self._slots = None
+        self._launch_lock = None
+
+    # -- lifecycle (called from scraper threads) --------------------------
+
+    def start(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            ready = threading.Event()
+            self._loop = asyncio.new_event_loop()
+
+            def serve():
+                asyncio.set_event_loop(self._loop)
+                ready.set()
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=serve, name="browser-pool", daemon=True)
+            self._thread.start()
+            ready.wait()
+            try:
+                asyncio.run_coroutine_threadsafe(self._launch(), self._loop).result()
+            except Exception:
+                self._stop_loop()
+                raise
+
+    def submit(self, coro):
+        """Schedule a coroutine on the pool's loop and return its concurrent future."""
+        try:
+            self.start()
+        except Exception:
+            coro.close()
+            raise
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(30)
+            except Exception as e:
+                print(f"[browser-pool] Error while shutting down: {e}")
+            self._stop_loop()
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    # -- async side (runs on the pool's loop) -----------------------------
+
+    async def _launch(self):
+        from playwright.async_api import async_playwright
+
+        self._slots = asyncio.Semaphore(self.max_pages)
+        self._launch_lock = asyncio.Lock()
+        self._playwright = await async_playwright().start()
+        try:
+            for _ in range(self.size):
+                self._browsers.append(await self._new_browser())
+        except Exception:
+            await self._shutdown()
+            raise
+        print(f"[browser-pool] Launched {self.size} browser(s), up to {self.max_pages} pages in parallel.")
+
+    async def _new_browser(self):
+        return await self._playwright.chromium.launch(headless=self.headless)
+
+    async def _shutdown(self):
+        for pooled in list(self._contexts.values()):
+            await self._close_context(pooled)
+        self._contexts.clear()
+        for browser in self._browsers:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        self._browsers = []
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _pick_browser(self):
+        async with self._launch_lock:
+            # Replace browsers that died since the last borrow
+            for i, browser in enumerate(self._browsers):
+                if not browser.is_connected():
+                    print(f"[browser-pool] Browser {i} disconnected, relaunching.")
+                    self._browsers[i] = await self._new_browser()
+            load = {id(b): 0 for b in self._browsers}
+            for pooled in self._contexts.values():
+                if id(pooled.browser) in load:
+                    load[id(pooled.browser)] += pooled.in_use
+            return min(self._browsers, key=lambda b: load[id(b)])
+
+    async def _acquire_context(self, key):
+        pooled = self._contexts.get(key)
+        if pooled is None or pooled.retired or not pooled.browser.is_connected():
+            browser = await self._pick_browser()
+            context = await browser.new_context(user_agent=USER_AGENT)
+            pooled = _PooledContext(browser, context)
+            self._contexts[key] = pooled
+        pooled.in_use += 1
+        pooled.pages_served += 1
+        if pooled.pages_served >= self.context_max_pages:
+            pooled.retired = True
+        return pooled
+
+    async def _release_context(self, key, pooled, crashed):
+        pooled.in_use -= 1
+        if crashed:
+            pooled.retired = True
+        if pooled.retired:
+            if self._contexts.get(key) is pooled:
+                del self._contexts[key]
+            if pooled.in_use == 0:
+                await self._close_context(pooled)
+
+    async def _close_context(self, pooled):
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def page(self, key="default"):
+        """Borrow a fresh page on the context reserved for `key`."""
+        async with self._slots:
+            pooled = await self._acquire_context(key)
+            crashed = False
+            page = None
+            try:
+                page = await pooled.context.new_page()
+
+                def on_crash(_):
+                    nonlocal crashed
+                    crashed = True
+
+                page.on("crash", on_crash)
+                yield page
+            except Exception:
+                crashed = True
+                raise
+            finally:
+                if page is not None:
+                    try:
+                        await page.close()
+                    except Exception:
+                        crashed = True
+                await self._release_context(key, pooled, crashed)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """Return the crawl-wide browser pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+        return _pool
+
+
+def close_browser_pool():
+    """Shut down the shared pool if one was started."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
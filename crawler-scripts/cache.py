@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Crawler-private state that survives between runs (endpoints, HTTP cache, ...)
+CACHE_DIR = os.getenv("CRAWLER_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+
+
+def cache_path(*parts):
+    return os.path.join(CACHE_DIR, *parts)
+
+
+def atomic_write(path, write, mode='w'):
+    """Write through a temp file in the same directory, then swap it in."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_json(path, default=None):
+    """Read a JSON file, returning `default` if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    atomic_write(path, lambda f: json.dump(data, f, ensure_ascii=False, separators=(',', ':'), default=str))
@@ -0,0 +1,362 @@
+"""
+Long-running crawler worker.
+
+Keeps the MongoDB client, HTTP session and browser pool warm between runs,
+crawls each source on its own interval (with jitter) and accepts run
+triggers over a local HTTP endpoint:
+
+    GET  /health          liveness and uptime
+    GET  /sources         schedule and last outcome per source
+    POST /runs            start a run; body {"sources": [...]} (all when
+                          omitted), ?wait=1 answers once the run finished
+    GET  /runs            recent runs
+    GET  /runs/<id>       one run
+
+A source that is already running is never started twice: triggering it
+again returns the run in progress.
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from dotenv import load_dotenv
+
+from browser_pool import close_browser_pool, get_browser_pool
+from db import close_client, is_database_available, reset_database_health
+from gazetteer import close_gazetteer, get_gazetteer
+from http_client import close_session
+from local_store import close_local_store, get_local_store
+from metrics import REPORT_DIR, build_report, write_report
+from scrapers.dedup import close_offer_grouper, get_offer_grouper
+
+load_dotenv()
+
+DAEMON_HOST = os.getenv("CRAWLER_DAEMON_HOST", "127.0.0.1")
+DAEMON_PORT = int(os.getenv("CRAWLER_DAEMON_PORT", "8765"))
+# Default seconds between two scheduled runs of a source
+DEFAULT_INTERVAL = float(os.getenv("CRAWLER_INTERVAL", "86400"))
+# Per-source overrides, e.g. "mock-bank-chile=3600,banco-itau=21600"
+SOURCE_INTERVALS = {
+    name.strip(): float(seconds)
+    for name, seconds in (pair.split('=', 1) for pair in os.getenv("CRAWLER_INTERVALS", "").split(',') if '=' in pair)
+}
+# Each interval is stretched or shrunk by up to this fraction so sources drift apart
+SCHEDULE_JITTER = float(os.getenv("CRAWLER_JITTER", "0.1"))
+# Finished runs kept for GET /runs
+RUN_HISTORY = 100
+
+
+def _view(run):
+    return {k: v for k, v in run.items() if k != 'done'}
+
+
+class CrawlDaemon:
+    """Schedules and runs sources on a shared pool; at most one run per source at a time."""
+
+    def __init__(self, concurrency, timeout, report_dir=REPORT_DIR, schedule=True):
+        self.timeout = timeout
+        self.report_dir = report_dir
+        self.schedule = schedule
+        self.started_at = time.time()
+        # source -> scraper class; a run builds only the scraper it needs
+        self._scraper_types = {scraper.source_name: type(scraper) for scraper in self._build_scrapers()}
+        self.sources = list(self._scraper_types)
+        self.next_run = {source: self._first_run(source) for source in self.sources}
+        self.last_outcome = {}
+
+        self._pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="crawl")
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        # run id -> run; source -> id of its run in progress
+        self._runs = OrderedDict()
+        self._active = {}
+        self._scrapers = {}
+
+    @staticmethod
+    def _build_scrapers():
+        from main import build_scrapers
+        return build_scrapers()
+
+    def interval(self, source):
+        return SOURCE_INTERVALS.get(source, DEFAULT_INTERVAL)
+
+    def _jittered(self, seconds):
+        return seconds * (1 + random.uniform(-SCHEDULE_JITTER, SCHEDULE_JITTER))
+
+    def _first_run(self, source):
+        # Spread the first runs over the first interval instead of all at startup
+        return time.time() + random.uniform(0, self.interval(source) * SCHEDULE_JITTER)
+
+    # -- runs -----------------------------------------------------------------
+
+    def trigger(self, sources=None, trigger='manual'):
+        """
+        Start a run of each source not already running. Returns the runs,
+        with `started` False for sources whose run was already in progress.
+        """
+        unknown = [source for source in sources or () if source not in self.sources]
+        if unknown:
+            raise KeyError(', '.join(unknown))
+
+        runs = []
+        with self._lock:
+            for source in sources or self.sources:
+                if source in self._active:
+                    runs.append({**_view(self._runs[self._active[source]]), 'started': False})
+                    continue
+                run = {'id': uuid.uuid4().hex[:12], 'source': source, 'trigger': trigger, 'status': 'queued',
+                       'queuedAt': datetime.now().isoformat(timespec='seconds'),
+                       'startedAt': None, 'finishedAt': None, 'duration': None, 'error': None}
+                run['done'] = threading.Event()
+                self._runs[run['id']] = run
+                self._active[source] = run['id']
+                while len(self._runs) > RUN_HISTORY:
+                    oldest = next(iter(self._runs))
+                    if self._runs[oldest]['status'] in ('queued', 'running'):
+                        break
+                    del self._runs[oldest]
+                runs.append({**_view(run), 'started': True})
+                self._pool.submit(self._execute, run)
+        return runs
+
+    def _execute(self, run):
+        from main import run_source
+
+        with self._lock:
+            run['status'] = 'running'
+            run['startedAt'] = datetime.now().isoformat(timespec='seconds')
+        print(f"[daemon] Run {run['id']}: {run['source']} ({run['trigger']})")
+        worker = None
+        try:
+            # A MongoDB that went down (or came back) since the last run is noticed
+            reset_database_health()
+            scraper = self._scraper_types[run['source']]()
+            with self._lock:
+                self._scrapers[run['source']] = scraper
+            outcome = run_source(scraper, self.timeout)
+            worker = outcome.pop('worker')
+            status, error, duration = outcome['status'], outcome['error'], outcome['duration']
+            with self._lock:
+                self.last_outcome[run['source']] = outcome
+            self._after_run(duration)
+        except Exception as e:
+            status, error, duration = 'error', str(e), None
+            print(f"[daemon] Run {run['id']} failed: {e}")
+        finally:
+            if worker is not None and worker.is_alive():
+                # A timed-out scraper is cancelled but still winding down; it gets
+                # one more budget before its pool thread goes back to other sources
+                print(f"[daemon] Run {run['id']}: waiting for {run['source']} to stop")
+                worker.join(self.timeout)
+            stuck = worker is not None and worker.is_alive()
+            with self._lock:
+                if not stuck:
+                    self._scrapers.pop(run['source'], None)
+                    self._active.pop(run['source'], None)
+                self.next_run[run['source']] = time.time() + self._jittered(self.interval(run['source']))
+                run.update(status=status, error=error, finishedAt=datetime.now().isoformat(timespec='seconds'),
+                           duration=round(duration, 3) if duration is not None else None)
+            run['done'].set()
+            if stuck:
+                # The source stays active until the thread really stops, so no
+                # second run starts next to it
+                print(f"[daemon] Run {run['id']}: {run['source']} still running after cancellation")
+                threading.Thread(target=self._release_when_stopped, args=(run['source'], worker),
+                                 name=f"release-{run['source']}", daemon=True).start()
+            self._wake.set()
+
+    def _release_when_stopped(self, source, worker):
+        worker.join()
+        with self._lock:
+            self._scrapers.pop(source, None)
+            self._active.pop(source, None)
+        self._wake.set()
+
+    def _after_run(self, elapsed):
+        """What main.py does once after a crawl, here after every run; the warm clients stay open."""
+        from main import export_discounts, export_tiles
+
+        with self._export_lock:
+            get_offer_grouper().save()
+            get_gazetteer().save()
+            get_local_store().export_snapshot()
+            export_tiles()
+            export_discounts()
+            with self._lock:
+                outcomes = list(self.last_outcome.values())
+            # The report covers the latest run of every source
+            write_report(build_report(outcomes, elapsed), self.report_dir)
+
+    def run_view(self, run_id):
+        with self._lock:
+            run = self._runs.get(run_id)
+            return None if run is None else _view(run)
+
+    def runs_view(self):
+        with self._lock:
+            return [_view(run) for run in reversed(self._runs.values())]
+
+    def sources_view(self):
+        with self._lock:
+            return [{
+                'source': source,
+                'interval': self.interval(source),
+                'running': source in self._active,
+                'nextRunAt': datetime.fromtimestamp(self.next_run[source]).isoformat(timespec='seconds'),
+                'lastStatus': self.last_outcome.get(source, {}).get('status'),
+                'lastError': self.last_outcome.get(source, {}).get('error'),
+            } for source in self.sources]
+
+    def wait(self, runs, timeout=None):
+        for run in runs:
+            with self._lock:
+                stored = self._runs.get(run['id'])
+            if stored is not None:
+                stored['done'].wait(timeout)
+
+    # -- schedule -------------------------------------------------------------
+
+    def scheduler(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = time.time()
+            with self._lock:
+                due = [s for s in self.sources if self.next_run[s] <= now and s not in self._active]
+                waiting = [self.next_run[s] for s in self.sources if s not in self._active]
+            if due:
+                self.trigger(due, trigger='schedule')
+                continue
+            self._wake.wait(max(0.0, min(waiting, default=now + 60) - now))
+
+    def warm_up(self):
+        """Connect to MongoDB and launch the browser before the first run needs them."""
+        if not is_database_available():
+            print("[daemon] MongoDB unavailable, runs will use the JSON fallback until it is back.")
+        try:
+            get_browser_pool().start()
+        except Exception as e:
+            print(f"[daemon] Browser pool not started: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            scrapers = list(self._scrapers.values())
+        for scraper in scrapers:
+            scraper.cancel_event.set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = urlparse(self.path).path.rstrip('/')
+            if path == '/health':
+                self._send(200, {'status': 'ok', 'uptime': round(time.time() - daemon.started_at, 1),
+                                 'sources': daemon.sources})
+            elif path == '/sources':
+                self._send(200, daemon.sources_view())
+            elif path == '/runs':
+                self._send(200, daemon.runs_view())
+            elif path.startswith('/runs/'):
+                run = daemon.run_view(path[len('/runs/'):])
+                self._send(200, run) if run else self._send(404, {'message': 'Unknown run'})
+            else:
+                self._send(404, {'message': 'Not found'})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path.rstrip('/') != '/runs':
+                return self._send(404, {'message': 'Not found'})
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                runs = daemon.trigger(body.get('sources'))
+            except KeyError as e:
+                return self._send(400, {'message': f"Unknown source: {e.args[0]}"})
+            except (ValueError, AttributeError):
+                return self._send(400, {'message': 'Body must be {"sources": [...]}'})
+
+            if parse_qs(url.query).get('wait', ['0'])[0] not in ('0', 'false', ''):
+                daemon.wait(runs)
+                runs = [{**daemon.run_view(run['id']), 'started': run['started']} for run in runs]
+            self._send(202 if any(run['started'] for run in runs) else 200, {'runs': runs})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def parse_args(argv=None):
+    from main import DEFAULT_CONCURRENCY, DEFAULT_SOURCE_TIMEOUT
+
+    parser = argparse.ArgumentParser(description="ChileCupones crawler worker")
+    parser.add_argument("--host", default=DAEMON_HOST)
+    parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="max sources crawled in parallel")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_SOURCE_TIMEOUT,
+                        help="wall-clock budget per source, in seconds")
+    parser.add_argument("--no-schedule", action="store_true",
+                        help="only run on triggers")
+    parser.add_argument("--report-dir", default=REPORT_DIR,
+                        help="where run-report.json and crawler.prom are written")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    daemon = CrawlDaemon(args.concurrency, args.timeout, args.report_dir, schedule=not args.no_schedule)
+    server = ThreadingHTTPServer((args.host, args.port), _handler(daemon))
+    server.daemon_threads = True
+
+    def shutdown(signum, frame):
+        # shutdown() blocks until serve_forever returns, so not from its own thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    threading.Thread(target=daemon.warm_up, name="warm-up", daemon=True).start()
+    if daemon.schedule:
+        threading.Thread(target=daemon.scheduler, name="scheduler", daemon=True).start()
+    print(f"[daemon] Listening on http://{args.host}:{args.port} for {', '.join(daemon.sources)}")
+    try:
+        server.serve_forever()
+    finally:
+        print("[daemon] Stopping...")
+        daemon.stop()
+        server.server_close()
+        close_offer_grouper()
+        close_gazetteer()
+        close_browser_pool()
+        close_session()
+        close_client()
+        close_local_store()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,93 @@
 import os
-from pymongo import MongoClient
+import threading
+from pymongo import MongoClient, monitoring
+from pymongo.write_concern import WriteConcern
 from dotenv import load_dotenv
 
+from metrics import record_round_trip
+
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/chilecupones")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+# How long to wait for a reachable server before falling back to JSON
+MONGO_SERVER_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+# "majority" or a number of acknowledging nodes
+MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN", "1")
+
+# Commands that keep the connection alive rather than do crawler work
+HOUSEKEEPING_COMMANDS = {'ping', 'hello', 'ismaster', 'isMaster', 'endSessions', 'saslStart', 'saslContinue'}
+
+_client = None
+_available = None
+_lock = threading.Lock()
+
+
+class _RoundTripCounter(monitoring.CommandListener):
+    """Attributes every MongoDB command to the source running in the calling thread."""
+
+    def started(self, event):
+        if event.command_name not in HOUSEKEEPING_COMMANDS:
+            record_round_trip()
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def get_client():
+    """Return the process-wide MongoClient, creating it on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = MongoClient(
+                MONGO_URI,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                serverSelectionTimeoutMS=MONGO_SERVER_TIMEOUT_MS,
+                connectTimeoutMS=MONGO_SERVER_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                event_listeners=[_RoundTripCounter()],
+            )
+        return _client
+
 
 def get_database():
-    client = MongoClient(MONGO_URI)
-    return client.get_database()
+    w = int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN
+    return get_client().get_database(write_concern=WriteConcern(w=w))
+
+
+def is_database_available():
+    """Ping the server once and remember the answer for the rest of the run."""
+    global _available
+    with _lock:
+        if _available is not None:
+            return _available
+    try:
+        get_client().admin.command('ping')
+        available = True
+    except Exception as e:
+        print(f"[db] MongoDB not reachable at startup: {e}")
+        available = False
+    with _lock:
+        _available = available
+    return available
+
+
+def reset_database_health():
+    """Forget the cached ping result so the next run checks again."""
+    global _available
+    with _lock:
+        _available = None
+
+
+def close_client():
+    """Close the shared client and its connection pool."""
+    global _client, _available
+    with _lock:
+        client, _client = _client, None
+        _available = None
+    if client is not None:
+        client.close()
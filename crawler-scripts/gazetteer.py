@@ -0,0 +1,151 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+from cache import cache_path, load_json, save_json
+
+load_dotenv()
+
+# Bundled store -> branch locations
+DATASET_PATH = os.getenv(
+    "GAZETTEER_DATASET", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'store_locations.json'))
+GEOCODE_CACHE_PATH = cache_path('geocodes.json')
+# Optional Nominatim-compatible search endpoint for stores the dataset doesn't know.
+# Off by default: the crawl stays offline and the result is cached either way.
+GEOCODER_URL = os.getenv("GEOCODER_URL", "")
+GEOCODER_REGION = os.getenv("GEOCODER_REGION", "Santiago, Chile")
+# Unknown stores are looked up again after this many days
+GEOCODE_MISS_TTL_DAYS = float(os.getenv("GEOCODE_MISS_TTL_DAYS", "7"))
+
+NON_WORD = re.compile(r'[^a-z0-9]+')
+ACCENTS = str.maketrans('áéíóúüñ', 'aeiouun')
+
+
+def name_key(name):
+    """Lowercase, accent-free, punctuation-free form of a store name or slug."""
+    return NON_WORD.sub(' ', (name or '').lower().translate(ACCENTS)).strip()
+
+
+class Gazetteer:
+    """
+    Resolves stores to branch locations: the bundled dataset first (by slug,
+    then by alias), then the optional geocoder. Every resolution, including
+    misses, is remembered in .cache/geocodes.json across runs.
+    """
+
+    def __init__(self, dataset_path=DATASET_PATH, cache_file=GEOCODE_CACHE_PATH):
+        with open(dataset_path, 'r', encoding='utf-8') as f:
+            self.stores = json.load(f)['stores']
+        self.cache_file = cache_file
+        self._cache = load_json(cache_file, {})
+        self._dirty = False
+        self._lock = threading.Lock()
+        # Longest aliases first so "farmacias ahumada" beats "ahumada"
+        self._aliases = sorted(
+            ((name_key(alias), slug) for slug, store in self.stores.items() for alias in store.get('aliases', [])),
+            key=lambda pair: -len(pair[0])
+        )
+
+    def branches(self, slug, name=None):
+        """Known branches of a store as dicts with name, commune, lat and lng; [] when unknown or online-only."""
+        entry = self._resolve(slug, name)
+        if entry is None:
+            return []
+        if entry.get('store'):
+            return self.stores[entry['store']].get('branches', [])
+        if entry.get('lat') is not None:
+            return [{'name': None, 'commune': None, 'lat': entry['lat'], 'lng': entry['lng']}]
+        return []
+
+    def locate(self, slug, name=None):
+        """(lat, lng) of the store's main branch, or None."""
+        branches = self.branches(slug, name)
+        return (branches[0]['lat'], branches[0]['lng']) if branches else None
+
+    def _resolve(self, slug, name):
+        if slug in self.stores:
+            return {'store': slug}
+
+        key = name_key(name or slug)
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and not self._expired(entry):
+            return entry
+
+        entry = self._match_alias(key) or self._geocode(name or slug) or {'store': None}
+        entry['resolvedAt'] = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            self._cache[key] = entry
+            self._dirty = True
+        return entry
+
+    def _match_alias(self, key):
+        padded = f" {key} "
+        for alias, slug in self._aliases:
+            if f" {alias} " in padded:
+                return {'store': slug, 'source': 'alias'}
+        return None
+
+    def _geocode(self, query):
+        if not GEOCODER_URL:
+            return None
+        # Imported lazily so the gazetteer doesn't pull in the HTTP stack when offline
+        from http_client import HTTP_TIMEOUT, get_session
+        try:
+            response = get_session().get(
+                GEOCODER_URL, params={'q': f"{query}, {GEOCODER_REGION}", 'format': 'json', 'limit': 1},
+                timeout=HTTP_TIMEOUT
+            )
+            response.raise_for_status()
+            results = response.json()
+        except Exception as e:
+            print(f"[gazetteer] Geocoding '{query}' failed: {e}")
+            return None
+        if not results:
+            return None
+        return {'store': None, 'source': 'geocoder',
+                'lat': float(results[0]['lat']), 'lng': float(results[0]['lon'])}
+
+    @staticmethod
+    def _expired(entry):
+        if entry.get('store') or entry.get('lat') is not None:
+            return False
+        resolved_at = entry.get('resolvedAt')
+        if not resolved_at:
+            return True
+        return datetime.now() - datetime.fromisoformat(resolved_at) > timedelta(days=GEOCODE_MISS_TTL_DAYS)
+
+    def save(self):
+        """Persist new resolutions, if any."""
+        with self._lock:
+            if not self._dirty:
+                return False
+            save_json(self.cache_file, self._cache)
+            self._dirty = False
+            return True
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Return the process-wide gazetteer, loading the dataset on first use."""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = Gazetteer()
+        return _gazetteer
+
+
+def close_gazetteer():
+    """Save the geocode cache and drop the gazetteer."""
+    global _gazetteer
+    with _gazetteer_lock:
+        gazetteer, _gazetteer = _gazetteer, None
+    if gazetteer is not None:
+        gazetteer.save()
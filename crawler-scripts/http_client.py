@@ -0,0 +1,113 @@
+import gzip
+import hashlib
+import os
+import threading
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+from browser_pool import USER_AGENT
+from cache import atomic_write, cache_path, load_json, save_json
+from metrics import record_bytes
+
+load_dotenv()
+
+# Keep-alive connections kept per host
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+HTTP_CACHE_DIR = cache_path('http')
+
+_session = None
+_lock = threading.Lock()
+
+
+def _build_session():
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                  allowed_methods=("GET", "HEAD", "POST"))
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept-Encoding": "gzip, deflate",
+        "Accept-Language": "es-CL,es;q=0.9",
+    })
+    return session
+
+
+def get_session():
+    """Return the process-wide pooled requests.Session."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def close_session():
+    global _session
+    with _lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
+
+
+class CachedResponse:
+    def __init__(self, url, text, not_modified, meta):
+        self.url = url
+        self.text = text
+        # True when the server answered 304 and `text` is the cached body
+        self.not_modified = not_modified
+        self.meta = meta
+
+
+def _cache_paths(url):
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return os.path.join(HTTP_CACHE_DIR, key + '.json'), os.path.join(HTTP_CACHE_DIR, key + '.html.gz')
+
+
+def conditional_get(url, timeout=HTTP_TIMEOUT):
+    """
+    GET `url` through the pooled session, revalidating against the on-disk
+    cache with If-None-Match / If-Modified-Since.
+    """
+    meta_path, body_path = _cache_paths(url)
+    meta = load_json(meta_path)
+    headers = {}
+    if meta and os.path.exists(body_path):
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('lastModified'):
+            headers['If-Modified-Since'] = meta['lastModified']
+
+    response = get_session().get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and headers:
+        with gzip.open(body_path, 'rt', encoding='utf-8') as f:
+            return CachedResponse(url, f.read(), True, meta)
+    response.raise_for_status()
+
+    meta = {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'lastModified': response.headers.get('Last-Modified'),
+        'fetchedAt': datetime.now().isoformat(),
+    }
+    record_bytes(len(response.content))
+    text = response.text
+    if meta['etag'] or meta['lastModified']:
+        atomic_write(body_path, lambda f: f.write(gzip.compress(text.encode('utf-8'))), mode='wb')
+        save_json(meta_path, meta)
+    return CachedResponse(url, text, False, meta)
+
+
+def update_cache_meta(url, **fields):
+    """Attach extra fields (e.g. how many items the page parsed into) to a cache entry."""
+    meta_path, _ = _cache_paths(url)
+    meta = load_json(meta_path)
+    if meta is not None:
+        meta.update(fields)
+        save_json(meta_path, meta)
@@ -0,0 +1,213 @@
+"""
+Liveness check of the discounts' `url`s.
+
+All URLs are checked concurrently through the pooled keep-alive session:
+HEAD first, GET when the server doesn't support HEAD. Each host gets at
+most LINK_CHECK_PER_HOST requests in flight and LINK_CHECK_RATE request
+starts per second, so a catalog that mostly points to one portal doesn't
+hammer it. Results are cached in .cache/link_checks.json for
+LINK_CHECK_TTL_HOURS, and `verified`/`lastVerifiedAt` are written back in
+bulk updates of at most LINK_CHECK_BATCH_SIZE URLs each.
+
+    python link_checker.py
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import requests
+from dotenv import load_dotenv
+
+from cache import cache_path, load_json, save_json
+from http_client import get_session
+
+load_dotenv()
+
+LINK_CHECK_CACHE_PATH = cache_path('link_checks.json')
+# URLs checked at the same time overall, and per host
+LINK_CHECK_CONCURRENCY = int(os.getenv("LINK_CHECK_CONCURRENCY", "32"))
+LINK_CHECK_PER_HOST = int(os.getenv("LINK_CHECK_PER_HOST", "4"))
+# Request starts per second per host
+LINK_CHECK_RATE = float(os.getenv("LINK_CHECK_RATE", "5"))
+LINK_CHECK_TIMEOUT = float(os.getenv("LINK_CHECK_TIMEOUT", "10"))
+# A URL checked less than this long ago keeps its result
+LINK_CHECK_TTL_HOURS = float(os.getenv("LINK_CHECK_TTL_HOURS", "24"))
+# URLs per `$in` of the write-back, so a large catalog stays well under MongoDB's 16MB command size
+LINK_CHECK_BATCH_SIZE = int(os.getenv("LINK_CHECK_BATCH_SIZE", "500"))
+
+# Answers to HEAD that only mean "try GET"
+HEAD_UNSUPPORTED = {405, 501}
+
+
+class HostLimiter:
+    """Caps in-flight requests and spaces request starts for one host."""
+
+    def __init__(self, concurrency, rate):
+        self.slots = threading.BoundedSemaphore(max(1, concurrency))
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.slots.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+        return self
+
+    def __exit__(self, *exc):
+        self.slots.release()
+
+
+class LinkChecker:
+    def __init__(self, concurrency=LINK_CHECK_CONCURRENCY, per_host=LINK_CHECK_PER_HOST, rate=LINK_CHECK_RATE,
+                 timeout=LINK_CHECK_TIMEOUT, ttl_hours=LINK_CHECK_TTL_HOURS, cache_file=LINK_CHECK_CACHE_PATH):
+        self.concurrency = max(1, concurrency)
+        self.per_host = per_host
+        self.rate = rate
+        self.timeout = timeout
+        self.ttl = timedelta(hours=ttl_hours)
+        self.cache_file = cache_file
+        self._cache = load_json(cache_file, {}) if cache_file else {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def _limiter(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = HostLimiter(self.per_host, self.rate)
+            return limiter
+
+    def _request(self, method, url):
+        with self._limiter(url):
+            with self._lock:
+                self.requests += 1
+            response = get_session().request(method, url, allow_redirects=True, timeout=self.timeout,
+                                             stream=method == 'GET')
+            # A streamed GET only needs its status; closing returns the connection to the pool
+            response.close()
+            return response.status_code
+
+    def check(self, url):
+        """{'alive', 'status', 'error', 'checkedAt'} for one URL, without the cache."""
+        status, error = None, None
+        try:
+            status = self._request('HEAD', url)
+            if status in HEAD_UNSUPPORTED:
+                status = self._request('GET', url)
+        except requests.RequestException as e:
+            error = str(e)
+        return {'alive': status is not None and 200 <= status < 300, 'status': status, 'error': error,
+                'checkedAt': datetime.now().isoformat(timespec='seconds')}
+
+    def _fresh(self, url):
+        entry = self._cache.get(url)
+        if not entry:
+            return None
+        if datetime.now() - datetime.fromisoformat(entry['checkedAt']) > self.ttl:
+            return None
+        return entry
+
+    def check_all(self, urls):
+        """
+        Check every distinct URL, reusing cached results younger than the
+        TTL. Returns ({url: result}, number of URLs actually requested).
+        """
+        results, pending = {}, []
+        for url in dict.fromkeys(urls):
+            cached = self._fresh(url)
+            if cached is not None:
+                results[url] = cached
+            else:
+                pending.append(url)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(pending)),
+                                    thread_name_prefix="link-check") as pool:
+                for url, result in zip(pending, pool.map(self.check, pending)):
+                    results[url] = result
+        if self.cache_file:
+            # Only URLs still in the catalog are kept
+            self._cache = dict(results)
+            save_json(self.cache_file, self._cache)
+        return results, len(pending)
+
+
+def verify_discounts(database=None, checker=None):
+    """
+    Check the URLs of all active discounts and store the outcome as
+    `verified`/`lastVerifiedAt`, in MongoDB when a database is given,
+    otherwise in the local store. Returns (alive, dead).
+    """
+    checker = checker or LinkChecker()
+    start = time.monotonic()
+    now = datetime.now()
+
+    if database is None:
+        from local_store import get_local_store
+        store = get_local_store()
+        records = [r for r in store.records() if r.get('active', True) and r.get('url')]
+    else:
+        records = list(database['discounts'].find({'active': True, 'url': {'$ne': None}}, {'url': 1}))
+
+    results, checked = checker.check_all(record['url'] for record in records)
+    alive = [url for url, result in results.items() if result['alive']]
+    dead = [url for url, result in results.items() if not result['alive']]
+
+    if database is None:
+        store.upsert([{'source': record.get('source'), 'externalId': record.get('externalId'),
+                       'verified': results[record['url']]['alive'], 'lastVerifiedAt': now.isoformat()}
+                      for record in records])
+    else:
+        from pymongo import UpdateMany
+        operations = [UpdateMany({'active': True, 'url': {'$in': urls[start:start + LINK_CHECK_BATCH_SIZE]}},
+                                 {'$set': {'verified': verified, 'lastVerifiedAt': now}})
+                      for urls, verified in ((alive, True), (dead, False))
+                      for start in range(0, len(urls), LINK_CHECK_BATCH_SIZE)]
+        if operations:
+            database['discounts'].bulk_write(operations, ordered=False)
+
+    print(f"[links] {len(results)} URLs ({checked} checked, {len(results) - checked} cached) "
+          f"in {time.monotonic() - start:.2f}s: {len(alive)} alive, {len(dead)} dead, {checker.requests} requests")
+    return len(alive), len(dead)
+
+
+def main(argv=None):
+    from db import close_client, get_database, is_database_available
+    from http_client import close_session
+    from local_store import close_local_store
+
+    parser = argparse.ArgumentParser(description="Check that the discounts' URLs still work")
+    parser.add_argument("--concurrency", type=int, default=LINK_CHECK_CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=LINK_CHECK_PER_HOST)
+    parser.add_argument("--rate", type=float, default=LINK_CHECK_RATE, help="request starts per second per host")
+    parser.add_argument("--no-cache", action="store_true", help="check every URL again")
+    args = parser.parse_args(argv)
+
+    from main import export_discounts
+
+    checker = LinkChecker(args.concurrency, args.per_host, args.rate,
+                          ttl_hours=0 if args.no_cache else LINK_CHECK_TTL_HOURS)
+    try:
+        verify_discounts(get_database() if is_database_available() else None, checker)
+        export_discounts()
+    finally:
+        close_session()
+        close_client()
+        close_local_store()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
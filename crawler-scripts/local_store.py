@@ -0,0 +1,261 @@
+import json
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from cache import atomic_write
+
+load_dotenv()
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'data')
+# Append-only record log, the source of truth in no-Mongo mode
+LOG_PATH = os.getenv("LOCAL_STORE_LOG", os.path.join(DATA_DIR, 'discounts.jsonl'))
+# Compact array read by backend/app.js
+SNAPSHOT_PATH = os.getenv("LOCAL_STORE_SNAPSHOT", os.path.join(DATA_DIR, 'discounts.json'))
+# Long-inactive records moved out of the store (see scrapers/expiry.py)
+ARCHIVE_PATH = os.getenv("LOCAL_STORE_ARCHIVE", os.path.join(DATA_DIR, 'discounts_archive.jsonl'))
+# Fields backend/app.js edits in the snapshot (verify, clicks, likes)
+BACKEND_FIELDS = ('verified', 'lastVerifiedAt', 'clicks', 'likes', 'dislikes')
+# Rewrite the log once it holds this many lines per live record
+COMPACT_RATIO = float(os.getenv("LOCAL_STORE_COMPACT_RATIO", "2"))
+
+
+def _dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class LocalStore:
+    """
+    Local discount store used when MongoDB is unreachable.
+
+    Records live in a dict keyed by (source, externalId) and are persisted as
+    JSONL: upserts append one line per record, and the log is atomically
+    rewritten (compacted) once it gets too far ahead of the live record count.
+    `export_snapshot()` writes the compact JSON array the backend serves.
+    """
+
+    def __init__(self, log_path=LOG_PATH, snapshot_path=SNAPSHOT_PATH, compact_ratio=COMPACT_RATIO,
+                 archive_path=ARCHIVE_PATH):
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path
+        self.archive_path = archive_path
+        self.compact_ratio = compact_ratio
+        self._stamp_path = snapshot_path + '.stamp'
+        self._lock = threading.Lock()
+        self._records = {}
+        self._log_lines = 0
+        self._dirty = False
+        # mtime of the snapshot as this store last wrote or read it
+        self._snapshot_mtime = None
+        self._load()
+
+    @staticmethod
+    def key(record):
+        return (record.get('source'), record.get('externalId'))
+
+    def _snapshot_changed_externally(self):
+        # backend/app.js edits the snapshot in place (verify, clicks, likes),
+        # so a snapshot we didn't write ourselves has edits the log lacks
+        if not os.path.exists(self.snapshot_path):
+            return False
+        if not os.path.exists(self.log_path):
+            return True
+        try:
+            with open(self._stamp_path, 'r', encoding='utf-8') as f:
+                stamp = int(f.read().strip())
+        except (OSError, ValueError):
+            return True
+        return os.stat(self.snapshot_path).st_mtime_ns != stamp
+
+    def _snapshot_stat(self):
+        try:
+            return os.stat(self.snapshot_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            # Also a snapshot the backend is halfway through writing; read again next time
+            print(f"[local-store] Could not read snapshot {self.snapshot_path}: {e}")
+            return None
+
+    def _load(self):
+        self._snapshot_mtime = self._snapshot_stat()
+        log_exists = os.path.exists(self.log_path)
+        if log_exists:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._log_lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final line from a crash mid-append
+                        continue
+                    self._records[self.key(record)] = record
+
+        if not self._snapshot_changed_externally():
+            return
+        snapshot = self._read_snapshot()
+        if snapshot is None:
+            return
+        if log_exists:
+            self._merge_backend_fields(snapshot)
+        else:
+            # No log yet (first run, or a data dir from before the log): the snapshot is all there is
+            for record in snapshot:
+                self._records[self.key(record)] = record
+        self._compact()
+        self._write_stamp(self._snapshot_mtime)
+
+    def _sync(self):
+        """
+        Pick up the backend's edits to the snapshot since this store last
+        saw it, so a long-lived store (the daemon's) doesn't export over them.
+        Called with the lock held.
+        """
+        mtime = self._snapshot_stat()
+        if mtime is None or mtime == self._snapshot_mtime:
+            return
+        snapshot = self._read_snapshot()
+        if snapshot is None:
+            return
+        self._merge_backend_fields(snapshot)
+        self._compact()
+        self._write_stamp(mtime)
+        self._snapshot_mtime = mtime
+        self._dirty = True
+
+    def _merge_backend_fields(self, snapshot):
+        # Only BACKEND_FIELDS are taken: the crawler's own changes may be in
+        # the log without having been exported yet
+        for record in snapshot:
+            key = self.key(record)
+            if key in self._records:
+                self._records[key] = {**self._records[key],
+                                      **{field: record[field] for field in BACKEND_FIELDS if field in record}}
+
+    def _write_stamp(self, mtime):
+        if mtime is not None:
+            atomic_write(self._stamp_path, lambda f: f.write(str(mtime)))
+
+    def _compact(self):
+        records = list(self._records.values())
+
+        def write(f):
+            for record in records:
+                f.write(_dumps(record))
+                f.write('\n')
+
+        atomic_write(self.log_path, write)
+        self._log_lines = len(records)
+
+    def upsert(self, records):
+        """
+        Merge `records` into the store and append them to the log.
+        Returns (inserted, updated) counts.
+        """
+        inserted = updated = 0
+        with self._lock:
+            self._sync()
+            lines = []
+            for record in records:
+                key = self.key(record)
+                old = self._records.get(key)
+                if old is None:
+                    inserted += 1
+                    merged = record
+                else:
+                    updated += 1
+                    merged = {**old, **record}
+                self._records[key] = merged
+                lines.append(_dumps(merged))
+
+            if lines:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(lines))
+                    f.write('\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._log_lines += len(lines)
+                self._dirty = True
+
+            if self._log_lines > self.compact_ratio * max(len(self._records), 1):
+                self._compact()
+        return inserted, updated
+
+    def archive(self, keys):
+        """
+        Append the records under `keys` to the archive log and drop them from
+        the store. The log is compacted right away so they don't come back.
+        Returns how many were archived.
+        """
+        with self._lock:
+            self._sync()
+            records = [self._records.pop(key) for key in keys if key in self._records]
+            if not records:
+                return 0
+            os.makedirs(os.path.dirname(self.archive_path), exist_ok=True)
+            with open(self.archive_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(_dumps(record) + '\n' for record in records))
+                f.flush()
+                os.fsync(f.fileno())
+            self._compact()
+            self._dirty = True
+        return len(records)
+
+    def get(self, source, external_id):
+        with self._lock:
+            return self._records.get((source, external_id))
+
+    def records(self):
+        with self._lock:
+            return list(self._records.values())
+
+    def export_snapshot(self, force=False):
+        """Write the compact JSON array read by the backend, if anything changed."""
+        with self._lock:
+            self._sync()
+            if not (self._dirty or force):
+                return False
+            records = list(self._records.values())
+
+            def write(f):
+                f.write('[')
+                for i, record in enumerate(records):
+                    if i:
+                        f.write(',\n')
+                    f.write(_dumps(record))
+                f.write(']\n')
+
+            atomic_write(self.snapshot_path, write)
+            self._snapshot_mtime = os.stat(self.snapshot_path).st_mtime_ns
+            self._write_stamp(self._snapshot_mtime)
+            self._dirty = False
+            return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_local_store():
+    """Return the process-wide local store, loading it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LocalStore()
+        return _store
+
+
+def close_local_store():
+    """Export the snapshot if the run changed anything and drop the store."""
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None and store.export_snapshot():
+        print(f"[local-store] Exported snapshot to {store.snapshot_path}")
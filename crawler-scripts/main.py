@@ -1,30 +1,195 @@
+import argparse
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from browser_pool import close_browser_pool
+from db import close_client, get_database, is_database_available
+from gazetteer import close_gazetteer
+from http_client import close_session
+from link_checker import verify_discounts
+from local_store import close_local_store
+from metrics import REPORT_DIR, build_report, write_report
+from read_model import export_read_model
+from scrapers.dedup import close_offer_grouper
+from spatial_index import export_map_tiles
+
 # Load environment variables
 load_dotenv()
 
-def main():
-    print("ChileCupones Crawler Engine Starting...")
-    
+# Max number of sources crawled at the same time
+DEFAULT_CONCURRENCY = int(os.getenv("CRAWLER_CONCURRENCY", "3"))
+# Wall-clock budget per source, in seconds
+DEFAULT_SOURCE_TIMEOUT = float(os.getenv("CRAWLER_SOURCE_TIMEOUT", "300"))
+
+
+def build_scrapers():
     from scrapers.mock_bank import MockBankScraper
     from scrapers.banco_chile import BancoChileScraper
     from scrapers.banco_itau import BancoItauScraper
-    
-    scrapers = [
+
+    return [
         MockBankScraper(),
         BancoChileScraper(),
         BancoItauScraper()
     ]
-    
-    for scraper in scrapers:
+
+
+def run_source(scraper, timeout):
+    """
+    Run one scraper in its own daemon thread and wait at most `timeout` seconds.
+    A source that overruns is cancelled and abandoned so it can't hold up the
+    crawl; the outcome's `worker` is its thread, for callers that must know
+    when it has actually stopped.
+    """
+    from scrapers.base_scraper import ScraperCancelled
+
+    outcome = {'source': scraper.source_name, 'status': 'ok', 'error': None}
+
+    def target():
         try:
             scraper.run()
+        except ScraperCancelled as e:
+            outcome['status'] = 'timeout'
+            outcome['error'] = str(e)
         except Exception as e:
-            print(f"Error running scraper {scraper.source_name}: {e}")
-            
+            outcome['status'] = 'error'
+            outcome['error'] = str(e)
+
+    scraper.set_budget(timeout)
+    worker = threading.Thread(target=target, name=f"scraper-{scraper.source_name}", daemon=True)
+    start = time.monotonic()
+    worker.start()
+    worker.join(timeout)
+
+    if worker.is_alive():
+        scraper.cancel_event.set()
+        outcome['status'] = 'timeout'
+        outcome['error'] = f"exceeded {timeout:.0f}s budget"
+
+    outcome['duration'] = time.monotonic() - start
+    outcome['worker'] = worker
+    outcome['fetch'] = scraper.fetch_stats
+    outcome['metrics'] = scraper.metrics.as_dict()
+    if outcome['error']:
+        print(f"Error running scraper {scraper.source_name}: {outcome['error']}")
+    return outcome
+
+
+def run_all(scrapers, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_SOURCE_TIMEOUT):
+    """Crawl all sources with at most `concurrency` running at once."""
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="crawl") as pool:
+        futures = [pool.submit(run_source, scraper, timeout) for scraper in scrapers]
+        return [future.result() for future in futures]
+
+
+def drain_workers(results, timeout):
+    """
+    Wait up to `timeout` seconds overall for the threads of cancelled sources
+    to stop, so they don't write to the clients closed after the crawl.
+    """
+    deadline = time.monotonic() + timeout
+    for result in results:
+        worker = result.pop('worker', None)
+        if worker is None or not worker.is_alive():
+            continue
+        print(f"Waiting for {result['source']} to stop...")
+        worker.join(max(0.0, deadline - time.monotonic()))
+        if worker.is_alive():
+            print(f"{result['source']} did not stop; closing the shared clients under it")
+
+
+def verify_links():
+    """Mark each active discount verified or not depending on whether its URL answers."""
+    try:
+        verify_discounts(get_database() if is_database_available() else None)
+    except Exception as e:
+        print(f"Link verification failed: {e}")
+
+
+def export_tiles():
+    """Rebuild the map tiles served by /api/discounts/map from what was just saved."""
+    try:
+        database = get_database() if is_database_available() else None
+        points, tiles = export_map_tiles(database)
+        print(f"Map tiles: {points} points in {tiles} tiles.")
+    except Exception as e:
+        print(f"Map tile export failed: {e}")
+
+
+def export_discounts():
+    """Rebuild the precomputed /api/discounts responses from what was just saved."""
+    try:
+        database = get_database() if is_database_available() else None
+        records, buckets, changed = export_read_model(database)
+        print(f"Read model: {records} discounts in {buckets} buckets, {changed} rewritten.")
+    except Exception as e:
+        print(f"Read model export failed: {e}")
+
+
+def print_summary(results, elapsed):
+    print("Crawl summary:")
+    for result in results:
+        line = f"  {result['source']:<20} {result['status']:<8} {result['duration']:7.2f}s"
+        if result.get('fetch'):
+            line += f"  tier={result['fetch']['tier']} cache={result['fetch']['cache'] or '-'}"
+        if result['error']:
+            line += f"  ({result['error']})"
+        print(line)
+    print(f"Total wall time: {elapsed:.2f}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ChileCupones crawler")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="max sources crawled in parallel")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_SOURCE_TIMEOUT,
+                        help="wall-clock budget per source, in seconds")
+    parser.add_argument("--sequential", action="store_true",
+                        help="crawl one source at a time")
+    parser.add_argument("--verify-links", action="store_true",
+                        help="check the discounts' URLs after crawling (see link_checker.py)")
+    parser.add_argument("--report-dir", default=REPORT_DIR,
+                        help="where run-report.json and crawler.prom are written")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("ChileCupones Crawler Engine Starting...")
+
+    scrapers = build_scrapers()
+    concurrency = 1 if args.sequential else args.concurrency
+
+    start = time.monotonic()
+    try:
+        # Checked once here; every scraper reuses the cached answer
+        if not is_database_available():
+            print("MongoDB unavailable, scrapers will use the JSON fallback.")
+        results = run_all(scrapers, concurrency=concurrency, timeout=args.timeout)
+        drain_workers(results, args.timeout)
+        if args.verify_links:
+            verify_links()
+        export_tiles()
+        export_discounts()
+    finally:
+        close_offer_grouper()
+        close_gazetteer()
+        close_browser_pool()
+        close_session()
+        close_client()
+        close_local_store()
+    elapsed = time.monotonic() - start
+    print_summary(results, elapsed)
+    json_path, prom_path = write_report(build_report(results, elapsed), args.report_dir)
+    print(f"Run report written to {json_path} and {prom_path}")
+
     print("All crawlers finished.")
+    return 0 if any(r['status'] == 'ok' for r in results) else 1
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from cache import atomic_write
+
+load_dotenv()
+
+REPORT_DIR = os.getenv("CRAWLER_REPORT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports'))
+METRIC_PREFIX = "chilecupones_crawler"
+
+# Metrics of the source running in the current thread, so code far from the
+# scraper (DB command listener, HTTP client) can attribute work to it
+current_metrics = contextvars.ContextVar('current_metrics', default=None)
+
+
+class StageTimer:
+    def __init__(self, items_in=None):
+        self.items_in = items_in
+        self.items_out = None
+        self.seconds = 0.0
+
+
+class SourceMetrics:
+    """Counters and stage timings for one source's run."""
+
+    def __init__(self, source):
+        self.source = source
+        self.started_at = datetime.now()
+        self.stages = {}
+        self.db_round_trips = 0
+        self.bytes_downloaded = 0
+        self.pages_opened = 0
+        self.used_fallback = False
+        # Set when fetch stopped on an error before the end of the listing
+        self.partial = False
+        self.fetch = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, items_in=None):
+        """Time one pipeline stage; set `.items_out` on the yielded timer."""
+        timer = StageTimer(items_in)
+        start = time.monotonic()
+        try:
+            yield timer
+        finally:
+            timer.seconds = time.monotonic() - start
+            self.stages[name] = timer
+
+    def add_stage(self, name, seconds, items_in=None, items_out=None):
+        """Add to a stage that runs in many small steps, as the streaming pipeline does."""
+        with self._lock:
+            timer = self.stages.get(name)
+            if timer is None:
+                timer = self.stages[name] = StageTimer()
+            timer.seconds += seconds
+            if items_in is not None:
+                timer.items_in = (timer.items_in or 0) + items_in
+            if items_out is not None:
+                timer.items_out = (timer.items_out or 0) + items_out
+
+    def add_round_trip(self):
+        with self._lock:
+            self.db_round_trips += 1
+
+    def add_bytes(self, count):
+        with self._lock:
+            self.bytes_downloaded += count or 0
+
+    def add_page(self):
+        with self._lock:
+            self.pages_opened += 1
+
+    def as_dict(self):
+        return {
+            'source': self.source,
+            'startedAt': self.started_at.isoformat(timespec='seconds'),
+            'stages': {
+                name: {'seconds': round(t.seconds, 4), 'itemsIn': t.items_in, 'itemsOut': t.items_out}
+                for name, t in self.stages.items()
+            },
+            'dbRoundTrips': self.db_round_trips,
+            'bytesDownloaded': self.bytes_downloaded,
+            'browserPagesOpened': self.pages_opened,
+            'usedFallback': self.used_fallback,
+            'partial': self.partial,
+            'fetch': self.fetch,
+        }
+
+
+def record_round_trip():
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.add_round_trip()
+
+
+def record_bytes(count):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.add_bytes(count)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_prometheus(report):
+    """Render a run report in the Prometheus textfile-collector format."""
+    series = {}
+
+    def add(name, help_text, labels, value):
+        if value is None:
+            return
+        entry = series.setdefault(name, (help_text, []))
+        label_text = ','.join(f'{k}="{_label(v)}"' for k, v in labels.items())
+        entry[1].append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {float(value):g}")
+
+    for source in report['sources']:
+        labels = {'source': source['source']}
+        add('source_success', 'Whether the source finished without error (1) or not (0).', labels,
+            1 if source['status'] == 'ok' else 0)
+        add('source_duration_seconds', 'Wall time of the whole source run.', labels, source['duration'])
+        add('db_round_trips', 'MongoDB commands sent by the source.', labels, source['dbRoundTrips'])
+        add('bytes_downloaded', 'Bytes downloaded by the source over HTTP and the browser.', labels,
+            source['bytesDownloaded'])
+        add('browser_pages_opened', 'Browser pages opened by the source.', labels, source['browserPagesOpened'])
+        add('fallback_used', 'Whether the source fell back to hardcoded data (1) or not (0).', labels,
+            1 if source['usedFallback'] else 0)
+        add('fetch_partial', 'Whether the source stopped fetching early on an error (1) or not (0).', labels,
+            1 if source.get('partial') else 0)
+        for stage, values in source['stages'].items():
+            stage_labels = {**labels, 'stage': stage}
+            add('stage_seconds', 'Wall time per pipeline stage.', stage_labels, values['seconds'])
+            add('stage_items', 'Items entering and leaving each pipeline stage.',
+                {**stage_labels, 'direction': 'in'}, values['itemsIn'])
+            add('stage_items', 'Items entering and leaving each pipeline stage.',
+                {**stage_labels, 'direction': 'out'}, values['itemsOut'])
+
+    lines = []
+    for name, (help_text, samples) in series.items():
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+        lines.extend(samples)
+    lines.append(f"# HELP {METRIC_PREFIX}_last_run_timestamp_seconds When the last crawl finished.")
+    lines.append(f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge")
+    lines.append(f"{METRIC_PREFIX}_last_run_timestamp_seconds {report['finishedAtEpoch']:.0f}")
+    return '\n'.join(lines) + '\n'
+
+
+def build_report(results, elapsed):
+    """Combine the runner's per-source outcomes with each source's metrics."""
+    sources = []
+    for result in results:
+        entry = {'source': result['source'], 'status': result['status'], 'error': result['error'],
+                 'duration': round(result['duration'], 4)}
+        entry.update(result['metrics'] or SourceMetrics(result['source']).as_dict())
+        sources.append(entry)
+    return {
+        'finishedAt': datetime.now().isoformat(timespec='seconds'),
+        'finishedAtEpoch': time.time(),
+        'wallSeconds': round(elapsed, 4),
+        'sources': sources,
+    }
+
+
+def write_report(report, report_dir=REPORT_DIR):
+    """Write run-report.json and crawler.prom (for node_exporter's textfile collector)."""
+    json_path = os.path.join(report_dir, 'run-report.json')
+    prom_path = os.path.join(report_dir, 'crawler.prom')
+    atomic_write(json_path, lambda f: json.dump(report, f, indent=2, default=str))
+    atomic_write(prom_path, lambda f: f.write(to_prometheus(report)))
+    return json_path, prom_path
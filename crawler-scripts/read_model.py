@@ -0,0 +1,162 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import date, datetime
+
+from dotenv import load_dotenv
+
+from cache import atomic_write
+from gazetteer import name_key
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it only the gzip files are written
+    brotli = None
+
+load_dotenv()
+
+# Precomputed responses of /api/discounts, served by backend/app.js
+READ_MODEL_DIR = os.getenv(
+    "READ_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'data', 'read-model'))
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Discount fields that stay in the crawler
+PRIVATE_FIELDS = ('contentHash', '__v')
+
+
+def slugify(name):
+    return name_key(name).replace(' ', '-')
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def read_records(database=None):
+    """
+    Active discounts, newest first, with their store and payment methods
+    inlined: from MongoDB when a database is given, otherwise from the
+    local store (where they already are).
+    """
+    if database is None:
+        from local_store import get_local_store
+        records = [r for r in get_local_store().records() if r.get('active', True)]
+        records.sort(key=lambda r: str(r.get('createdAt') or ''), reverse=True)
+        return records
+
+    pipeline = [
+        {'$match': {'active': True}},
+        {'$sort': {'createdAt': -1}},
+        {'$lookup': {'from': 'stores', 'localField': 'store', 'foreignField': '_id', 'as': 'store'}},
+        {'$unwind': {'path': '$store', 'preserveNullAndEmptyArrays': True}},
+        {'$lookup': {'from': 'paymentmethods', 'localField': 'paymentMethods', 'foreignField': '_id',
+                     'as': 'paymentMethods'}},
+        {'$project': {field: 0 for field in PRIVATE_FIELDS}},
+    ]
+    return list(database['discounts'].aggregate(pipeline))
+
+
+def bank_names(record):
+    names = [method.get('name') for method in record.get('paymentMethods') or [] if isinstance(method, dict)]
+    if record.get('paymentMethod'):
+        names.append(record['paymentMethod'])
+    return {name for name in names if name}
+
+
+def build_read_model(records):
+    """
+    Split the records into buckets: `all`, plus `bank/<slug>` per payment
+    method and `category/<slug>` per store category. Every bucket keeps the
+    newest-first order.
+    """
+    buckets = {'all': []}
+    for record in records:
+        record = {k: v for k, v in record.items() if k not in PRIVATE_FIELDS}
+        buckets['all'].append(record)
+        for bank in bank_names(record):
+            buckets.setdefault(f"bank/{slugify(bank)}", []).append(record)
+        for category in (record.get('store') or {}).get('categories') or []:
+            buckets.setdefault(f"category/{slugify(category)}", []).append(record)
+    return buckets
+
+
+class ReadModelWriter:
+    """
+    Writes each bucket as <name>.json.gz (and .json.br when brotli is
+    installed) under a content-hash ETag, plus manifest.json. A bucket whose
+    content hash didn't change is left untouched.
+    """
+
+    def __init__(self, out_dir=READ_MODEL_DIR):
+        self.out_dir = out_dir
+        self.manifest_path = os.path.join(out_dir, 'manifest.json')
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.previous = json.load(f).get('buckets', {})
+        except (OSError, ValueError):
+            self.previous = {}
+
+    def _path(self, name, suffix):
+        return os.path.join(self.out_dir, *f"{name}{suffix}".split('/'))
+
+    def _write_bucket(self, name, records):
+        body = json.dumps(records, ensure_ascii=False, separators=(',', ':'), default=_json_default).encode('utf-8')
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        entry = {'etag': etag, 'count': len(records), 'bytes': len(body), 'encodings': ['gzip']}
+        if brotli is not None:
+            entry['encodings'].append('br')
+
+        previous = self.previous.get(name)
+        if previous and previous.get('etag') == etag and previous.get('encodings') == entry['encodings'] \
+                and all(os.path.exists(self._path(name, self._suffix(e))) for e in entry['encodings']):
+            return entry, False
+
+        os.makedirs(os.path.dirname(self._path(name, '.json.gz')), exist_ok=True)
+        # mtime=0 so identical content compresses to identical bytes
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        atomic_write(self._path(name, '.json.gz'), lambda f: f.write(compressed), mode='wb')
+        if brotli is not None:
+            compressed_br = brotli.compress(body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+            atomic_write(self._path(name, '.json.br'), lambda f: f.write(compressed_br), mode='wb')
+        return entry, True
+
+    @staticmethod
+    def _suffix(encoding):
+        return '.json.gz' if encoding == 'gzip' else '.json.br'
+
+    def write(self, buckets, generated_at=None):
+        """
+        Write the buckets and the manifest. `generated_at` is when the records
+        were read; backend/app.js keeps its own later changes over them.
+        Returns how many buckets changed.
+        """
+        generated_at = generated_at or datetime.now()
+        manifest = {'generatedAt': generated_at.isoformat(timespec='seconds'), 'buckets': {}}
+        changed = 0
+        for name, records in buckets.items():
+            entry, written = self._write_bucket(name, records)
+            manifest['buckets'][name] = entry
+            changed += written
+
+        # The manifest goes last so readers never see an ETag before its files
+        atomic_write(self.manifest_path, lambda f: json.dump(manifest, f, separators=(',', ':')))
+        for name in self.previous:
+            if name not in manifest['buckets']:
+                for encoding in ('gzip', 'br'):
+                    path = self._path(name, self._suffix(encoding))
+                    if os.path.exists(path):
+                        os.remove(path)
+        return changed
+
+
+def export_read_model(database=None, out_dir=READ_MODEL_DIR):
+    """Rebuild the /api/discounts read model from the current discounts. Returns (records, buckets, changed)."""
+    read_at = datetime.now()
+    buckets = build_read_model(read_records(database))
+    changed = ReadModelWriter(out_dir).write(buckets, generated_at=read_at)
+    return len(buckets['all']), len(buckets), changed
@@ -1,91 +1,43 @@
-from .base_scraper import BaseScraper
-from playwright.sync_api import sync_playwright
-import time
-import random
+from .base_scraper import BaseScraper, ScraperCancelled, SourceNotModified
+from .extraction import CardSelectors, Pagination
+from .offer_text import parse_offer_text
+from .records import Offer, RawCard
 
 class BancoChileScraper(BaseScraper):
+    # Hypothetical selectors based on common patterns on bank portals
+    card_selectors = CardSelectors(
+        card='.card-beneficio, .m-card, article',
+        title='h3, h4, .title, .card-title',
+    )
+    pagination = Pagination("load_more", selector='button.ver-mas, .btn-load-more, button:has-text("Ver más")')
+    # Benefit feeds requested by the portal while it renders (hypothetical paths)
+    api_patterns = (r"bancochile\.cl/.*/api/", r"beneficios.*\.json")
+    id_prefix = "bch"
+    default_title = "Descuento Banco Chile"
+
     def __init__(self):
         super().__init__("banco-chile")
         self.url = "https://portales.bancochile.cl/personas/beneficios"
 
     def fetch(self):
-        print(f"[{self.source_name}] Starting Playwright scraper...")
-        data = []
-        
-        with sync_playwright() as p:
-            # Launch browser (headless=True for production, False for debugging)
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            
-            try:
-                print(f"[{self.source_name}] Navigating to {self.url}...")
-                page.goto(self.url, timeout=60000)
-                
-                # Wait for the content to load
-                # Adjust this selector to something that exists on the page
-                # Often banks use cards with classes like 'card', 'benefit', 'm-card'
-                page.wait_for_load_state('networkidle')
-                time.sleep(5) # Extra wait for dynamic content
-                
-                # Generic strategy: Look for elements that might be discount cards
-                # This is a heuristic since we don't have the exact selectors
-                # We look for common container classes or structures
-                
-                # Attempt 1: Look for article or div elements with specific keywords in text
-                # This is a placeholder. In a real scenario, we would inspect the DOM.
-                # For Banco Chile, they often use specific classes. 
-                # Let's try to find elements that look like cards.
-                
-                # Example selector for Banco Chile (Hypothetical based on common patterns)
-                cards = page.query_selector_all('.card-beneficio, .m-card, article')
-                
-                print(f"[{self.source_name}] Found {len(cards)} potential cards.")
-                
-                for i, card in enumerate(cards[:10]): # Limit to 10 for testing
-                    try:
-                        # Extract text content
-                        text = card.inner_text()
-                        if "%" not in text and "dcto" not in text.lower():
-                            continue
-                            
-                        # Extract Title
-                        title_el = card.query_selector('h3, h4, .title, .card-title')
-                        title = title_el.inner_text() if title_el else "Descuento Banco Chile"
-                        
-                        # Extract Image
-                        img_el = card.query_selector('img')
-                        img_src = img_el.get_attribute('src') if img_el else None
-                        if img_src and not img_src.startswith('http'):
-                            img_src = f"https://portales.bancochile.cl{img_src}"
-                            
-                        # Extract Link
-                        link_el = card.query_selector('a')
-                        link_href = link_el.get_attribute('href') if link_el else self.url
-                        if link_href and not link_href.startswith('http'):
-                            link_href = f"https://portales.bancochile.cl{link_href}"
+        print(f"[{self.source_name}] Fetching listing...")
+        count = 0
+
+        try:
+            for item in self.fetch_listing():
+                count += 1
+                yield item
+        except (ScraperCancelled, SourceNotModified):
+            raise
+        except Exception as e:
+            print(f"[{self.source_name}] Error during scraping: {e}")
+            self.metrics.partial = True
 
-                        data.append({
-                            "id": f"bch-{i}-{int(time.time())}",
-                            "title": title,
-                            "store": title.split(' en ')[-1] if ' en ' in title else "Comercio Asociado",
-                            "url": link_href,
-                            "img": img_src,
-                            "raw_text": text
-                        })
-                    except Exception as e:
-                        print(f"Error parsing card: {e}")
-                        
-            except Exception as e:
-                print(f"[{self.source_name}] Error during scraping: {e}")
-            finally:
-                browser.close()
-                
         # Fallback if scraping fails (so the app doesn't look empty during demo)
-        if not data:
+        if not count:
             print(f"[{self.source_name}] No data found with selectors. Using fallback real-like data.")
-            return self.get_fallback_data()
-            
-        return data
+            self.metrics.used_fallback = True
+            yield from self.get_fallback_data()
 
     def get_fallback_data(self):
         """
@@ -93,59 +45,51 @@ class BancoChileScraper(BaseScraper):
         to simulate a successful scrape when the site blocks us.
         """
         return [
-            {
-                "id": "bch-real-001",
-                "title": "40% Dcto en Pedro, Juan y Diego",
-                "store": "Pedro, Juan y Diego",
-                "url": "https://portales.bancochile.cl/personas/beneficios/sabores",
-                "img": "https://upload.wikimedia.org/wikipedia/commons/5/56/Pedro_Juan_y_Diego_logo.svg",
-                "lat": -33.4489,
-                "lng": -70.6693
-            },
-            {
-                "id": "bch-real-002",
-                "title": "25% Dcto en Salcobrand",
-                "store": "Salcobrand",
-                "url": "https://portales.bancochile.cl/personas/beneficios/salud",
-                "img": "https://upload.wikimedia.org/wikipedia/commons/thumb/6/66/Farmacias_Salcobrand_logo.svg/2560px-Farmacias_Salcobrand_logo.svg.png",
-                "lat": -33.42628,
-                "lng": -70.61099
-            },
-             {
-                "id": "bch-real-003",
-                "title": "$150 de descuento por litro en Shell",
-                "store": "Shell",
-                "url": "https://portales.bancochile.cl/personas/beneficios",
-                "img": "https://upload.wikimedia.org/wikipedia/en/thumb/e/e8/Shell_logo.svg/1200px-Shell_logo.svg.png",
-                "lat": -33.4100,
-                "lng": -70.5700
-            }
+            RawCard(
+                externalId="bch-real-001",
+                title="40% Dcto en Pedro, Juan y Diego",
+                store_name="Pedro, Juan y Diego",
+                url="https://portales.bancochile.cl/personas/beneficios/sabores",
+                imageUrl="https://upload.wikimedia.org/wikipedia/commons/5/56/Pedro_Juan_y_Diego_logo.svg",
+                latitude=-33.4489,
+                longitude=-70.6693,
+            ),
+            RawCard(
+                externalId="bch-real-002",
+                title="25% Dcto en Salcobrand",
+                store_name="Salcobrand",
+                url="https://portales.bancochile.cl/personas/beneficios/salud",
+                imageUrl="https://upload.wikimedia.org/wikipedia/commons/thumb/6/66/Farmacias_Salcobrand_logo.svg/2560px-Farmacias_Salcobrand_logo.svg.png",
+                latitude=-33.42628,
+                longitude=-70.61099,
+            ),
+            RawCard(
+                externalId="bch-real-003",
+                title="$150 de descuento por litro en Shell",
+                store_name="Shell",
+                url="https://portales.bancochile.cl/personas/beneficios",
+                imageUrl="https://upload.wikimedia.org/wikipedia/en/thumb/e/e8/Shell_logo.svg/1200px-Shell_logo.svg.png",
+                latitude=-33.4100,
+                longitude=-70.5700,
+            )
         ]
 
     def parse(self, raw_data):
         parsed_discounts = []
         for item in raw_data:
             # Basic parsing logic
-            title = item.get('title', 'Descuento')
-            
-            # Try to extract percentage
-            percentage = 0
-            import re
-            match = re.search(r'(\d+)%', title)
-            if match:
-                percentage = int(match.group(1))
-            
-            parsed_discounts.append({
-                'externalId': item['id'],
-                'title': title,
-                'description': item.get('raw_text', f"Descuento exclusivo en {item['store']}"),
-                'discountPercentage': percentage,
-                'url': item['url'],
-                'imageUrl': item.get('img'),
-                'store_name': item['store'],
-                'store_slug': item['store'].lower().replace(" ", "-").replace(",", ""),
-                'latitude': item.get('lat', -33.4489 + (random.random() - 0.5) * 0.1), # Randomize location if missing
-                'longitude': item.get('lng', -70.6693 + (random.random() - 0.5) * 0.1),
-                'paymentMethod': "Banco de Chile"
-            })
+            store_slug = item.store_name.lower().replace(" ", "-").replace(",", "")
+
+            parsed_discounts.append(Offer(
+                externalId=item.externalId,
+                title=item.title,
+                description=item.raw_text or f"Descuento exclusivo en {item.store_name}",
+                **parse_offer_text(item.title, item.raw_text),
+                url=item.url,
+                imageUrl=item.imageUrl,
+                store_name=item.store_name,
+                store_slug=store_slug,
+                **self.store_location(item, store_slug),
+                paymentMethod="Banco de Chile"
+            ))
         return parsed_discounts
@@ -1,113 +1,668 @@
 from abc import ABC, abstractmethod
-from db import get_database
+from db import get_database, is_database_available
+from browser_pool import get_browser_pool
+from local_store import get_local_store
+from gazetteer import get_gazetteer, name_key
+from spatial_index import geohash_encode
+from http_client import get_session, conditional_get, update_cache_meta, HTTP_TIMEOUT
+from metrics import SourceMetrics, current_metrics
+from .extraction import iter_cards, extract_cards_from_html, next_page_url
+from .dedup import get_offer_grouper
+from .expiry import archive_collection, archive_local, new_generation, sweep_collection, sweep_local
+from .fingerprint import content_hash, stable_id
+from .pipeline import run_pipeline
+from .records import RawCard
+from .network_capture import (
+    ResponseRecorder, find_offer_lists, first_value, load_endpoints, save_endpoints,
+    TITLE_KEYS, DESCRIPTION_KEYS, IMAGE_KEYS, URL_KEYS, ID_KEYS, STORE_KEYS,
+)
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from urllib.parse import urljoin
 from datetime import datetime
 
-import json
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import asyncio
 import os
+import queue
+import threading
+import time
+
+# Discount upserts sent per bulk_write call, and offers saved per pipeline flush
+SAVE_BATCH_SIZE = int(os.getenv("SAVE_BATCH_SIZE", "500"))
+# Card batches the browser may read ahead of the pipeline
+BROWSER_READ_AHEAD = 4
+# A listing card mentioning none of these is navigation or a banner, not an offer
+OFFER_HINTS = ('%', '$', 'dcto', 'descuento', 'cuota')
+
+# store slug -> Store _id, shared by all scrapers in this process
+_store_cache = {}
+_store_cache_lock = threading.Lock()
+# bank name -> PaymentMethod _id, likewise
+_payment_method_cache = {}
+
+
+class ScraperCancelled(Exception):
+    """Raised inside a scraper once its run budget has been exhausted."""
+
+
+class SourceNotModified(Exception):
+    """Raised by fetch() when the listing is unchanged since the last run."""
+
 
 class BaseScraper(ABC):
+    # Listing page scraped by scrape_listing()
+    url = None
+    # CardSelectors/Pagination describing the listing (see scrapers/extraction.py)
+    card_selectors = None
+    pagination = None
+    # Prefix for externalIds built from listing cards
+    id_prefix = None
+    # Regexes for the portal's own API calls; matching JSON responses are
+    # parsed directly and replayed over HTTP on later runs
+    api_patterns = ()
+    # Sources that need JavaScript to render skip the static HTTP tier
+    dynamic = False
+    default_title = "Descuento"
+
     def __init__(self, source_name):
         self.source_name = source_name
+        # Set by the runner when the source runs past its wall-clock budget
+        self.cancel_event = threading.Event()
+        self.deadline = None
+        self.fetch_stats = None
+        self.metrics = SourceMetrics(source_name)
+        # Stamped on every offer this run sees; older ones are swept afterwards
+        self.generation = new_generation()
+        # externalIds saved by this run
+        self.seen = set()
         self.db = get_database()
         self.collection = self.db['discounts']
         self.stores_collection = self.db['stores']
         self.payment_methods_collection = self.db['paymentmethods']
 
+    @property
+    def paginated(self):
+        return self.pagination is not None and self.pagination.mode != "none"
+
+    @property
+    def static(self):
+        """Whether the static HTTP tier can see the whole listing: `next` links can be followed without a browser."""
+        return not self.dynamic and (not self.paginated or self.pagination.mode == "next")
+
+    def set_budget(self, seconds):
+        """Give this scraper a wall-clock budget starting now."""
+        self.deadline = time.monotonic() + seconds if seconds else None
+
+    def remaining_ms(self, default):
+        """Milliseconds left in the budget, capped at `default`."""
+        if self.deadline is None:
+            return default
+        left = int((self.deadline - time.monotonic()) * 1000)
+        # Playwright treats 0 as "no timeout", so never hand it out
+        return max(1, min(default, left))
+
+    def check_cancelled(self):
+        """Abort the run if the runner cancelled us or the budget ran out."""
+        if self.cancel_event.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline):
+            raise ScraperCancelled(f"{self.source_name} exceeded its time budget")
+
+    def stream_in_browser(self, scrape):
+        """
+        Run `scrape(page, emit)` (a coroutine function) on a page borrowed
+        from the shared browser pool and yield the items it passes to
+        `await emit(items)` while it is still running. emit() waits, off the
+        event loop, whenever the pipeline is behind.
+        """
+        pool = get_browser_pool()
+        handoff = queue.Queue(BROWSER_READ_AHEAD)
+        closed = threading.Event()
+
+        def put(items):
+            while not closed.is_set():
+                self.check_cancelled()
+                try:
+                    handoff.put(items, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        async def emit(items):
+            if items:
+                await asyncio.get_running_loop().run_in_executor(None, put, items)
+
+        async def job():
+            async with pool.page(self.source_name) as page:
+                self.metrics.add_page()
+                # Content-Length is the cheap approximation; bodies aren't buffered
+                page.on('response', lambda response: self.metrics.add_bytes(
+                    int(response.headers.get('content-length') or 0)))
+                await scrape(page, emit)
+
+        future = pool.submit(job())
+        try:
+            while True:
+                try:
+                    items = handoff.get(timeout=0.1)
+                except queue.Empty:
+                    # emit() hands its items over before the job can finish
+                    if future.done() and handoff.empty():
+                        future.result()
+                        return
+                    self.check_cancelled()
+                    continue
+                yield from items
+        finally:
+            closed.set()
+            future.cancel()
+
+    def fetch_listing(self):
+        """
+        Yield the listing's raw items from the cheapest tier that works: API
+        endpoints discovered on a previous run replayed over HTTP, then a
+        plain (cached, conditional) GET of the listing page, and only then
+        the browser - straight away for sources marked `dynamic` and for
+        listings that load more cards with JavaScript (`load_more`, `scroll`),
+        which the static HTML only shows the first page of.
+        """
+        self.fetch_stats = {'tier': None, 'cache': None, 'latency': {}}
+        self.metrics.fetch = self.fetch_stats
+        try:
+            if (yield from self._timed('api', self.replay_endpoints)):
+                return
+            if self.static and (yield from self._timed('http', self.fetch_static)):
+                return
+            self.fetch_stats['tier'] = 'browser'
+            yield from self._timed('browser', lambda: self.stream_in_browser(self.scrape_listing))
+        finally:
+            stats = self.fetch_stats
+            latency = ", ".join(f"{tier} {seconds:.2f}s" for tier, seconds in stats['latency'].items())
+            print(f"[{self.source_name}] Fetch tier: {stats['tier']}, HTTP cache: {stats['cache'] or 'n/a'}, latency: {latency}")
+
+    def _timed(self, tier, fetch):
+        """
+        Yield the items of `fetch()` and return how many there were. The
+        tier's latency leaves out the time spent waiting on the pipeline.
+        """
+        count = 0
+        waiting = 0.0
+        start = time.monotonic()
+        try:
+            for item in fetch():
+                if not count:
+                    self.fetch_stats['tier'] = tier
+                count += 1
+                handed_over = time.monotonic()
+                yield item
+                waiting += time.monotonic() - handed_over
+        finally:
+            self.fetch_stats['latency'][tier] = time.monotonic() - start - waiting
+        return count
+
+    def fetch_static(self):
+        """
+        Try the listing as static HTML, following its `next` links when it
+        has any. A 304 for a single-page listing that parsed into offers
+        last time means nothing changed, so parsing is skipped.
+        """
+        try:
+            response = conditional_get(self.url, timeout=min(HTTP_TIMEOUT, self.remaining_ms(60000) / 1000))
+        except Exception as e:
+            print(f"[{self.source_name}] Static fetch failed ({e}), escalating to the browser.")
+            return
+
+        self.fetch_stats['cache'] = 'hit' if response.not_modified else 'miss'
+        if response.not_modified:
+            if response.meta.get('items') == 0:
+                # Same page that had nothing parseable last time
+                return
+            # Later pages may have changed behind an unchanged first one
+            if response.meta.get('items') and not self.paginated:
+                self.fetch_stats['tier'] = 'http'
+                raise SourceNotModified(f"{self.url} not modified since {response.meta.get('fetchedAt')}")
+
+        items = self.cards_to_items(extract_cards_from_html(response.text, self.card_selectors, self.url))
+        update_cache_meta(self.url, items=len(items))
+        if not items:
+            print(f"[{self.source_name}] Static HTML had no offers, escalating to the browser.")
+            return
+        yield from items
+        if self.paginated:
+            yield from self._static_pages(response.text)
+
+    def _static_pages(self, html):
+        """The items of the listing pages after the first, following `next` links over HTTP."""
+        url, visited = self.url, {self.url}
+        session = get_session()
+        while len(visited) < self.pagination.max_pages:
+            url = next_page_url(html, self.pagination.selector, url)
+            if not url or url in visited:
+                return
+            visited.add(url)
+            self.check_cancelled()
+            try:
+                response = session.get(url, timeout=min(HTTP_TIMEOUT, self.remaining_ms(60000) / 1000))
+                response.raise_for_status()
+            except Exception as e:
+                print(f"[{self.source_name}] Static page {len(visited)} failed ({e}).")
+                self.metrics.partial = True
+                return
+            self.metrics.add_bytes(len(response.content))
+            html = response.text
+            items = self.cards_to_items(extract_cards_from_html(html, self.card_selectors, url))
+            if not items:
+                return
+            yield from items
+
+    def replay_endpoints(self):
+        endpoints = load_endpoints(self.source_name)
+        if not endpoints:
+            return
+
+        session = get_session()
+        count = 0
+        try:
+            for endpoint in endpoints:
+                self.check_cancelled()
+                headers = {'Content-Type': endpoint['contentType']} if endpoint.get('contentType') else None
+                response = session.request(
+                    endpoint['method'], endpoint['url'], data=endpoint.get('body'), headers=headers,
+                    timeout=min(HTTP_TIMEOUT, self.remaining_ms(60000) / 1000)
+                )
+                response.raise_for_status()
+                self.metrics.add_bytes(len(response.content))
+                offers = self.offers_from_payload(response.json())
+                count += len(offers)
+                yield from offers
+        except ScraperCancelled:
+            raise
+        except Exception as e:
+            if count:
+                # What was already handed on is saved; the browser would only repeat it
+                print(f"[{self.source_name}] API replay failed after {count} offers ({e}).")
+                self.metrics.partial = True
+                return
+            print(f"[{self.source_name}] API replay failed ({e}), falling back to the browser.")
+
+        if not count:
+            save_endpoints(self.source_name, [])
+            return
+        print(f"[{self.source_name}] Replayed {len(endpoints)} API endpoint(s) without a browser: {count} offers.")
+
+    async def scrape_listing(self, page, emit):
+        """
+        Open `self.url` and pass its offers to `emit` as they come in,
+        preferring the JSON the portal loads for itself over the rendered cards.
+        """
+        recorder = None
+        if self.api_patterns:
+            recorder = ResponseRecorder(self.api_patterns)
+            recorder.attach(page)
+
+        print(f"[{self.source_name}] Navigating to {self.url}...")
+        await page.goto(self.url, wait_until='domcontentloaded', timeout=self.remaining_ms(60000))
+        cards_attached = asyncio.ensure_future(
+            page.wait_for_selector(self.card_selectors.card, state='attached', timeout=self.remaining_ms(30000)))
+        captured, endpoints = 0, []
+        try:
+            if recorder:
+                captured = await self._capture_api(recorder, emit, cards_attached, endpoints)
+            # Paginating needs the cards even when their offers came from the API
+            if not captured or self.paginated:
+                try:
+                    await cards_attached
+                except PlaywrightTimeoutError:
+                    pass
+        finally:
+            if cards_attached.done() and not cards_attached.cancelled():
+                cards_attached.exception()  # retrieved, so an unused timeout isn't logged
+            cards_attached.cancel()
+
+        count = 0
+        if not captured or self.paginated:
+            async for cards in iter_cards(page, self.card_selectors, self.pagination, on_page=self.check_cancelled):
+                if captured:
+                    # Every page the portal loads comes through its API too: emit that JSON instead
+                    captured += await self._emit_responses(recorder, emit, endpoints)
+                else:
+                    count += len(cards)
+                    await emit(self.cards_to_items(cards))
+        if captured:
+            captured += await self._emit_responses(recorder, emit, endpoints)
+            # All pages' endpoints, so a replay covers the whole listing
+            save_endpoints(self.source_name, endpoints)
+            print(f"[{self.source_name}] Captured {captured} offers from {len(endpoints)} API response(s).")
+        else:
+            print(f"[{self.source_name}] Found {count} potential cards.")
+
+    async def _capture_api(self, recorder, emit, cards_attached, endpoints):
+        """
+        Emit the offers of the API responses the page loads. Stops waiting
+        for a first response as soon as the cards are in the DOM, so portals
+        without a matching API don't pay the whole wait. Returns the count.
+        """
+        await recorder.wait(self.remaining_ms(15000), until=cards_attached)
+        return await self._emit_responses(recorder, emit, endpoints)
+
+    async def _emit_responses(self, recorder, emit, endpoints):
+        """Emit the offers of the responses recorded since the last call, adding their endpoints. Returns the count."""
+        count = 0
+        for captured in await recorder.take():
+            offers = self.offers_from_payload(captured['payload'])
+            if offers:
+                await emit(offers)
+                count += len(offers)
+                if captured['endpoint'] not in endpoints:
+                    endpoints.append(captured['endpoint'])
+        return count
+
+    def offers_from_payload(self, payload):
+        """Turn a captured JSON payload into raw items. Override for bank-specific shapes."""
+        items = []
+        for offer in find_offer_lists(payload):
+            item = self.api_offer_to_item(offer)
+            if item:
+                items.append(item)
+        return items
+
+    def api_offer_to_item(self, offer):
+        title = first_value(offer, TITLE_KEYS)
+        if not title:
+            return None
+        description = first_value(offer, DESCRIPTION_KEYS)
+        image = first_value(offer, IMAGE_KEYS)
+        link = urljoin(self.url, first_value(offer, URL_KEYS) or '')
+        offer_id = first_value(offer, ID_KEYS)
+        store = first_value(offer, STORE_KEYS)
+        if not store:
+            store = title.split(' en ')[-1] if ' en ' in title else "Comercio Asociado"
+        return RawCard(
+            externalId=f"{self.id_prefix}-{offer_id}" if offer_id else stable_id(self.id_prefix, link, title, store, self.url),
+            title=title,
+            store_name=store,
+            url=link,
+            imageUrl=urljoin(self.url, image) if image else None,
+            raw_text=f"{title}\n{description}" if description else title,
+        )
+
+    def cards_to_items(self, cards):
+        """Turn extracted cards into the RawCards parse() expects."""
+        items = []
+        for card in cards:
+            text = card.get('text') or ''
+            lowered = text.lower()
+            if not any(hint in lowered for hint in OFFER_HINTS):
+                continue
+            title = card.get('title') or self.default_title
+            store = title.split(' en ')[-1] if ' en ' in title else "Comercio Asociado"
+            items.append(RawCard(
+                externalId=stable_id(self.id_prefix, card.get('link'), title, store, self.url),
+                title=title,
+                store_name=store,
+                url=card.get('link') or self.url,
+                imageUrl=card.get('image'),
+                raw_text=text,
+            ))
+        return items
+
+    def store_location(self, item, store_slug):
+        """
+        latitude/longitude/geohash for a parsed discount: the RawCard's own
+        coordinates when the source gave them, else the main branch of the
+        store from the gazetteer, else none (it just isn't shown on the map).
+        """
+        if item.latitude is not None:
+            location = (item.latitude, item.longitude)
+        else:
+            location = get_gazetteer().locate(store_slug, item.store_name)
+        if location is None:
+            return {'latitude': None, 'longitude': None, 'geohash': None}
+        return {'latitude': location[0], 'longitude': location[1], 'geohash': geohash_encode(*location)}
+
+    def group_offers(self, discounts):
+        """Tag parsed discounts with the `offerGroupId` of their near-duplicates across sources."""
+        return get_offer_grouper().assign(discounts, self.source_name)
+
     @abstractmethod
     def fetch(self):
-        """Fetch data from the source."""
+        """Fetch data from the source: a list, or a generator of RawCards."""
         pass
 
     @abstractmethod
     def parse(self, raw_data):
-        """Parse raw data into structured discount objects."""
+        """Parse a chunk of RawCards into Offers (see scrapers/records.py)."""
         pass
 
     def save_to_json(self, discounts):
-        """Fallback: Save to JSON file if DB is down."""
-        file_path = os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'data', 'discounts.json')
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        existing_data = []
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-            except:
-                pass
-        
-        # Simple upsert logic for JSON
-        for new_d in discounts:
-            # Add store info directly since we don't have relations in JSON mode
-            new_d['store'] = {'name': new_d.pop('store_name', 'Unknown'), 'slug': new_d.pop('store_slug', 'unknown')}
-            new_d['_id'] = new_d['externalId'] # Use externalId as ID
-            
-            found = False
-            for i, old_d in enumerate(existing_data):
-                if old_d.get('externalId') == new_d['externalId'] and old_d.get('source') == self.source_name:
-                    existing_data[i] = {**old_d, **new_d}
-                    found = True
-                    break
-            if not found:
-                new_d['source'] = self.source_name
-                existing_data.append(new_d)
-                
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, indent=2, default=str)
-        print(f"[{self.source_name}] Saved {len(discounts)} items to JSON fallback.")
+        """Fallback: Save to the local JSONL store if DB is down."""
+        store = get_local_store()
+        now = datetime.now()
+        records = []
+        seen = []
+        for discount in discounts:
+            fingerprint = content_hash(discount)
+            existing = store.get(self.source_name, discount.externalId)
+            if existing and existing.get('active', True) and existing.get('contentHash') == fingerprint:
+                seen.append({'source': self.source_name, 'externalId': discount.externalId,
+                             'crawlGeneration': self.generation, 'lastSeenAt': now.isoformat()})
+                continue
+            record = discount.local_record(self.source_name, fingerprint, self.generation, now)
+            if existing is None:
+                record['createdAt'] = record['lastSeenAt']
+            records.append(record)
+
+        inserted, updated = store.upsert(records + seen)
+        updated -= len(seen)
+        print(f"[{self.source_name}] Saved {len(discounts)} items to JSON fallback. "
+              f"Inserted: {inserted}, updated: {updated}, unchanged: {len(discounts) - len(records)}")
+        return inserted + updated
+
+    def drop_duplicate_ids(self, discounts):
+        """
+        Keep the first offer of each externalId this run saves: a later one
+        with the same id would overwrite it in the same upsert.
+        """
+        unique = []
+        duplicates = []
+        for discount in discounts:
+            if discount.externalId in self.seen:
+                duplicates.append(discount)
+                continue
+            self.seen.add(discount.externalId)
+            unique.append(discount)
+        if duplicates:
+            print(f"[{self.source_name}] WARNING: Dropped {len(duplicates)} offers with an externalId already "
+                  f"saved in this run: " + ", ".join(f"{d.externalId} ({d.title!r})" for d in duplicates[:5]))
+        return unique
 
     def save(self, discounts):
-        """Save discounts to the database, avoiding duplicates."""
-        try:
-            # Check connection
-            self.db.command('ping')
-        except Exception as e:
+        """
+        Save discounts to the database, writing only offers whose content
+        fingerprint differs from what is already stored.
+        """
+        discounts = self.drop_duplicate_ids(discounts)
+        if not is_database_available():
             print(f"[{self.source_name}] WARNING: Database not connected. Using JSON fallback.")
-            self.save_to_json(discounts)
-            return
+            return self.save_to_json(discounts)
 
-        count = 0
-        for discount in discounts:
-            # Ensure store exists or create it
-            store_slug = discount['store_slug']
-            store = self.stores_collection.find_one({'slug': store_slug})
-            if not store:
-                store_id = self.stores_collection.insert_one({
-                    'name': discount['store_name'],
-                    'slug': store_slug,
-                    'createdAt': datetime.now()
-                }).inserted_id
-            else:
-                store_id = store['_id']
-
-            # Prepare discount object
-            discount_doc = {
-                'title': discount['title'],
-                'description': discount.get('description', ''),
-                'discountPercentage': discount.get('discountPercentage'),
-                'url': discount['url'],
-                'imageUrl': discount.get('imageUrl'),
-                'store': store_id,
-                'source': self.source_name,
-                'externalId': discount['externalId'],
-                'active': True,
-                'updatedAt': datetime.now()
-            }
-
-            # Upsert (Update if exists, Insert if not)
-            result = self.collection.update_one(
-                {'source': self.source_name, 'externalId': discount['externalId']},
-                {'$set': discount_doc, '$setOnInsert': {'createdAt': datetime.now()}},
-                upsert=True
+        now = datetime.now()
+        inserted = modified = unchanged = 0
+        for start in range(0, len(discounts), SAVE_BATCH_SIZE):
+            batch = discounts[start:start + SAVE_BATCH_SIZE]
+            fingerprints = {d.externalId: content_hash(d) for d in batch}
+
+            stored = self.collection.find(
+                {'source': self.source_name, 'externalId': {'$in': list(fingerprints)}},
+                {'externalId': 1, 'contentHash': 1, 'active': 1, 'paymentMethods': 1}
             )
-            if result.upserted_id:
-                count += 1
-        
-        print(f"[{self.source_name}] Processed {len(discounts)} items. New inserts: {count}")
+            # Offers saved before paymentMethods was written are rewritten once
+            current = {doc['externalId'] for doc in stored
+                       if doc.get('active') and doc.get('contentHash') == fingerprints[doc['externalId']]
+                       and 'paymentMethods' in doc}
+            changed = [d for d in batch if d.externalId not in current]
+            unchanged += len(batch) - len(changed)
+            if current:
+                # Unchanged offers are skipped, but this run still saw them
+                self.collection.update_many(
+                    {'source': self.source_name, 'externalId': {'$in': list(current)}},
+                    {'$set': {'crawlGeneration': self.generation, 'lastSeenAt': now}}
+                )
+            if not changed:
+                continue
+
+            store_ids = self.resolve_store_ids(changed, now)
+            unresolved = [d for d in changed if d.store_slug not in store_ids]
+            if unresolved:
+                print(f"[{self.source_name}] Skipping {len(unresolved)} offers whose store could not be saved: "
+                      f"{', '.join(sorted({d.store_slug for d in unresolved}))}")
+                changed = [d for d in changed if d.store_slug in store_ids]
+                if not changed:
+                    continue
+            payment_method_ids = self.resolve_payment_method_ids(changed)
+            operations = [UpdateOne(
+                {'source': self.source_name, 'externalId': discount.externalId},
+                {'$set': discount.discount_document(
+                    self.source_name, store_ids[discount.store_slug], fingerprints[discount.externalId],
+                    self.generation, now,
+                    [payment_method_ids[discount.paymentMethod]] if discount.paymentMethod else ()),
+                 '$setOnInsert': {'createdAt': now}},
+                upsert=True
+            ) for discount in changed]
+
+            result = self.collection.bulk_write(operations, ordered=False)
+            inserted += result.upserted_count
+            modified += result.modified_count
+            unchanged += result.matched_count - result.modified_count
+
+        print(f"[{self.source_name}] Processed {len(discounts)} items. "
+              f"Inserted: {inserted}, modified: {modified}, unchanged: {unchanged}")
+        return inserted + modified
+
+    def sweep(self):
+        """
+        After a complete run, deactivate the offers this source no longer
+        lists and archive the long-inactive ones (see scrapers/expiry.py).
+        Runs that fell back to hardcoded data, stopped fetching early or saw
+        nothing prove nothing and are skipped.
+        """
+        reason = ('fallback data' if self.metrics.used_fallback
+                  else 'fetch ended early' if self.metrics.partial
+                  else 'no offers seen' if not self.seen else None)
+        if reason:
+            print(f"[{self.source_name}] Skipping expiry: {reason}.")
+            return
+        now = datetime.now()
+        with self.metrics.stage('sweep') as timer:
+            if is_database_available():
+                timer.items_out = sweep_collection(self.collection, self.source_name, self.generation, now)
+            else:
+                timer.items_out = sweep_local(get_local_store(), self.source_name, self.generation, now)
+        with self.metrics.stage('archive') as timer:
+            if is_database_available():
+                timer.items_out = archive_collection(self.db, self.source_name, now)
+            else:
+                timer.items_out = archive_local(get_local_store(), self.source_name, now)
+        print(f"[{self.source_name}] Deactivated {self.metrics.stages['sweep'].items_out} vanished offers, "
+              f"archived {self.metrics.stages['archive'].items_out}.")
+
+    def touch_all(self):
+        """An unchanged listing still lists every active offer: restart their grace period."""
+        now = datetime.now()
+        if is_database_available():
+            self.collection.update_many({'source': self.source_name, 'active': True}, {'$set': {'lastSeenAt': now}})
+        else:
+            store = get_local_store()
+            store.upsert([{'source': self.source_name, 'externalId': r.get('externalId'), 'lastSeenAt': now.isoformat()}
+                          for r in store.records() if r.get('source') == self.source_name and r.get('active', True)])
+
+    def resolve_store_ids(self, discounts, now):
+        """
+        Map every store slug in `discounts` to its Store _id, creating the
+        missing stores in bulk. Stores are matched by slug or by name, both
+        unique in backend/models/Store.js. Known slugs are served from a
+        process-wide cache; slugs that can't be resolved are left out.
+        """
+        offers = {d.store_slug: d for d in discounts}
+        with _store_cache_lock:
+            store_ids = {slug: _store_cache[slug] for slug in offers if slug in _store_cache}
+        pending = [slug for slug in offers if slug not in store_ids]
+
+        if pending:
+            self._find_stores(pending, offers, store_ids)
+
+            missing = [slug for slug in pending if slug not in store_ids]
+            if missing:
+                try:
+                    self.stores_collection.insert_many(
+                        [offers[slug].store_document(now) for slug in missing],
+                        ordered=False
+                    )
+                except BulkWriteError as e:
+                    # Duplicate keys mean another scraper (or a store of the same
+                    # name) got there first; anything else is a real failure
+                    if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                        raise
+                self._find_stores(missing, offers, store_ids)
+
+            with _store_cache_lock:
+                _store_cache.update(store_ids)
+
+        return store_ids
+
+    def _find_stores(self, slugs, offers, store_ids):
+        """Add the stores matching `slugs`, by slug or by their offers' store name, to `store_ids`."""
+        by_name = {}
+        for slug in slugs:
+            by_name.setdefault(offers[slug].store_name, []).append(slug)
+        for store in self.stores_collection.find(
+                {'$or': [{'slug': {'$in': slugs}}, {'name': {'$in': list(by_name)}}]}, {'slug': 1, 'name': 1}):
+            if store['slug'] in offers:
+                store_ids[store['slug']] = store['_id']
+            for slug in by_name.get(store.get('name'), ()):
+                store_ids.setdefault(slug, store['_id'])
+
+    def resolve_payment_method_ids(self, discounts):
+        """
+        Map every bank name in `discounts` to its PaymentMethod _id (see
+        backend/models/PaymentMethod.js), creating the missing ones. A source
+        pays with one or two banks, so they are upserted one at a time.
+        """
+        names = {d.paymentMethod for d in discounts if d.paymentMethod}
+        with _store_cache_lock:
+            ids = {name: _payment_method_cache[name] for name in names if name in _payment_method_cache}
+
+        for name in names - set(ids):
+            slug = name_key(name).replace(' ', '-')
+            try:
+                self.payment_methods_collection.update_one(
+                    {'slug': slug}, {'$setOnInsert': {'name': name, 'type': 'bank', 'slug': slug}}, upsert=True)
+            except DuplicateKeyError:
+                # Another scraper created it concurrently
+                pass
+            ids[name] = self.payment_methods_collection.find_one({'slug': slug}, {'_id': 1})['_id']
+
+        with _store_cache_lock:
+            _payment_method_cache.update(ids)
+        return ids
 
     def run(self):
+        """
+        Stream this source through fetch, parse and save (see
+        scrapers/pipeline.py), recording per-stage metrics.
+        """
         print(f"Starting scraper: {self.source_name}")
-        raw_data = self.fetch()
-        discounts = self.parse(raw_data)
-        self.save(discounts)
-        print(f"Finished scraper: {self.source_name}")
+        self.metrics = SourceMetrics(self.source_name)
+        self.generation = new_generation()
+        self.seen = set()
+        token = current_metrics.set(self.metrics)
+        try:
+            run_pipeline(self, SAVE_BATCH_SIZE)
+        except SourceNotModified as e:
+            print(f"[{self.source_name}] {e}. Nothing to parse.")
+            self.touch_all()
+        else:
+            self.sweep()
+        finally:
+            current_metrics.reset(token)
+            print(f"Finished scraper: {self.source_name}")
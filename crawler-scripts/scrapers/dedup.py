@@ -0,0 +1,266 @@
+"""
+Near-duplicate offer detection across sources.
+
+Each offer is reduced to a set of shingles (words and word pairs of its
+normalized title and its store slug),
+summarized by a MinHash signature and filed under locality-sensitive hash
+bands of its discount. An offer only gets compared with the groups giving
+the same discount that it shares a band with, so grouping is linear in the
+number of offers instead of pairwise. A group holds at most one offer per
+source: two offers of the same bank are two promotions. Groups, their
+signatures and members persist in .cache between runs, which keeps
+`offerGroupId`s stable.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from array import array
+from datetime import datetime, timedelta
+from functools import lru_cache
+from operator import eq
+
+from dotenv import load_dotenv
+
+from cache import atomic_write, cache_path
+from .offer_text import normalize
+
+load_dotenv()
+
+GROUPS_PATH = cache_path('offer_groups.json.gz')
+# Estimated Jaccard similarity above which two offers are the same promotion
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.5"))
+# Groups no offer has joined for this many days are forgotten
+DEDUP_GROUP_TTL_DAYS = float(os.getenv("DEDUP_GROUP_TTL_DAYS", "30"))
+
+# Signature length and its split into LSH bands. With 16 bands of 2 rows a
+# pair at 0.5 similarity shares a band 99% of the time; candidates are then
+# checked against the threshold, so unrelated pairs that collide cost one
+# signature comparison each.
+NUM_BINS = 32
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+DIGEST_SALTS = [b'minhash-%d' % i for i in range(NUM_BINS // 16)]
+# Words that vary between banks' wordings of the same promotion
+STOPWORDS = frozenset("""
+    a al con de del el en la las lo los para por tu tus un una y o
+    dcto descuento descuentos exclusivo exclusiva pagando paga pago tarjeta tarjetas credito debito
+    banco bancochile chile itau santander bci scotiabank cmr estado cliente clientes
+""".split())
+WORD_RE = re.compile(r'[a-z0-9%$]+(?:[.,][0-9]+)*')
+
+
+def _words(text):
+    # Percentages and amounts are left out: the discount itself is a blocking key
+    return [w for w in WORD_RE.findall(normalize(text or ''))
+            if w not in STOPWORDS and '%' not in w and '$' not in w]
+
+
+def shingles(discount):
+    """
+    Shingles of an offer: title words and word pairs, and its store.
+    Descriptions are left out: their boilerplate (validity, bank, card)
+    made offers of different stores look alike.
+    """
+    title = _words(discount.title)
+    found = set(title)
+    found.update(f"{a} {b}" for a, b in zip(title, title[1:]))
+    # One shingle like any word: a shared store alone doesn't make two offers the same promotion
+    found.add(f"store:{discount.store_slug}")
+    return found
+
+
+def discount_key(discount):
+    """Offers are only compared with groups giving the same discount."""
+    return f"{discount.discountPercentage or ''}|{discount.discountAmount or ''}"
+
+
+@lru_cache(maxsize=65536)
+def _hashes(shingle):
+    # Cached: boilerplate words and store shingles recur across offers.
+    # blake2b rather than hash(): signatures must not change between processes.
+    # Each 64-byte digest is 16 independent 32-bit hash values.
+    data = shingle.encode('utf-8')
+    values = array('I')
+    for salt in DIGEST_SALTS:
+        values.frombytes(hashlib.blake2b(data, digest_size=64, salt=salt).digest())
+    return values
+
+
+def signature(shingle_set):
+    """
+    MinHash signature: for each of NUM_BINS hash functions, the smallest
+    value any shingle takes. Two offers agree on a bin with probability
+    equal to the Jaccard similarity of their shingle sets.
+    """
+    if not shingle_set:
+        return array('I', [0] * NUM_BINS)
+    if len(shingle_set) == 1:
+        return array('I', _hashes(next(iter(shingle_set))))
+    return array('I', map(min, *(_hashes(shingle) for shingle in shingle_set)))
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(map(eq, a, b)) / NUM_BINS
+
+
+def bands(sig, key):
+    """LSH bucket keys of a signature within its discount key."""
+    for band in range(BANDS):
+        yield key, band, hash(tuple(sig[band * ROWS:(band + 1) * ROWS]))
+
+
+class OfferGrouper:
+    """Process-wide LSH index that assigns `offerGroupId`s, shared by all scrapers."""
+
+    def __init__(self, path=GROUPS_PATH, threshold=DEDUP_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        # group id -> (representative signature, discount key, last seen as date ordinal)
+        self.groups = {}
+        # group id -> {source: externalId of its offer in the group}
+        self.members = {}
+        # (source, externalId) -> group id
+        self.member_groups = {}
+        # (discount key, band, band hash) -> group ids
+        self.buckets = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        oldest = (datetime.now() - timedelta(days=DEDUP_GROUP_TTL_DAYS)).toordinal()
+        for group_id, (encoded, key, last_seen, *members) in stored.get('groups', {}).items():
+            if last_seen < oldest:
+                self._dirty = True
+                continue
+            sig = array('I')
+            sig.frombytes(base64.b64decode(encoded))
+            if len(sig) == NUM_BINS:
+                self._add_group(group_id, sig, key, last_seen)
+                # Files from before members were kept have none
+                for source, external_id in (members[0] if members else {}).items():
+                    self._join(group_id, source, external_id)
+
+    def _add_group(self, group_id, sig, key, last_seen):
+        self.groups[group_id] = (sig, key, last_seen)
+        self.members.setdefault(group_id, {})
+        for bucket in bands(sig, key):
+            self.buckets.setdefault(bucket, []).append(group_id)
+
+    def _join(self, group_id, source, external_id):
+        previous = self.member_groups.get((source, external_id))
+        if previous is not None and previous != group_id:
+            self.members[previous].pop(source, None)
+        self.members[group_id][source] = external_id
+        self.member_groups[(source, external_id)] = group_id
+
+    def assign(self, discounts, source):
+        """
+        Set `offerGroupId` on each discount. Returns how many joined a group
+        holding another source's offer; staying in its own group from an
+        earlier run doesn't count.
+        """
+        today = datetime.now().toordinal()
+        prepared = [(discount, signature(shingles(discount)), discount_key(discount)) for discount in discounts]
+        joined = 0
+        with self._lock:
+            for discount, sig, key in prepared:
+                group_id = self._match(sig, key, source, discount.externalId)
+                if group_id is None:
+                    group_id = 'grp-' + hashlib.sha1(
+                        f"{source}|{discount.externalId}".encode('utf-8')).hexdigest()[:16]
+                    if group_id in self.groups:
+                        # Opened by this offer on an earlier run, and it no longer resembles it
+                        if any(other != source for other in self.members[group_id]):
+                            # Other banks' offers still are that promotion: leave it to them
+                            group_id = 'grp-' + hashlib.sha1(
+                                f"{source}|{discount.externalId}|{sig.tobytes().hex()}".encode('utf-8')).hexdigest()[:16]
+                        else:
+                            self._drop_group(group_id)
+                    self._add_group(group_id, sig, key, today)
+                else:
+                    if any(other != source for other in self.members[group_id]):
+                        joined += 1
+                    group_sig, _, last_seen = self.groups[group_id]
+                    if last_seen != today:
+                        self.groups[group_id] = (group_sig, key, today)
+                self._join(group_id, source, discount.externalId)
+                discount.offerGroupId = group_id
+            self._dirty = True
+        return joined
+
+    def _drop_group(self, group_id):
+        sig, key, _ = self.groups.pop(group_id)
+        for bucket in bands(sig, key):
+            self.buckets[bucket].remove(group_id)
+        for source, external_id in self.members.pop(group_id).items():
+            del self.member_groups[(source, external_id)]
+
+    def _match(self, sig, key, source, external_id):
+        """
+        The most similar group sharing a band with `sig`, if similar enough,
+        leaving out groups that hold another offer of the same source.
+        """
+        best, best_score = None, 0.0
+        checked = set()
+        for bucket in bands(sig, key):
+            for group_id in self.buckets.get(bucket, ()):
+                if group_id in checked:
+                    continue
+                checked.add(group_id)
+                if self.members[group_id].get(source, external_id) != external_id:
+                    continue
+                score = similarity(sig, self.groups[group_id][0])
+                if score > best_score:
+                    best, best_score = group_id, score
+        return best if best_score >= self.threshold else None
+
+    def save(self):
+        """Persist the groups and their representative signatures."""
+        with self._lock:
+            if not self._dirty:
+                return False
+            stored = {'groups': {
+                group_id: [base64.b64encode(sig.tobytes()).decode('ascii'), key, last_seen, self.members[group_id]]
+                for group_id, (sig, key, last_seen) in self.groups.items()
+            }}
+            self._dirty = False
+
+        def write(f):
+            with gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+                gz.write(json.dumps(stored, separators=(',', ':')).encode('utf-8'))
+
+        atomic_write(self.path, write, mode='wb')
+        return True
+
+
+_grouper = None
+_grouper_lock = threading.Lock()
+
+
+def get_offer_grouper():
+    """Return the process-wide grouper, loading the saved groups on first use."""
+    global _grouper
+    with _grouper_lock:
+        if _grouper is None:
+            _grouper = OfferGrouper()
+        return _grouper
+
+
+def close_offer_grouper():
+    """Save the groups and drop the grouper."""
+    global _grouper
+    with _grouper_lock:
+        grouper, _grouper = _grouper, None
+    if grouper is not None:
+        grouper.save()
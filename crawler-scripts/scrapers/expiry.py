@@ -0,0 +1,91 @@
+"""
+Mark-and-sweep expiry of offers a source no longer lists.
+
+Every run stamps the offers it sees with its own `crawlGeneration` and
+`lastSeenAt`. After a complete run, the source's active offers from older
+generations that haven't been seen for SWEEP_GRACE_HOURS are deactivated
+in one update, and offers inactive for ARCHIVE_AFTER_DAYS are moved out of
+the hot collection into `discounts_archive`.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# An offer missing from a run stays active until it has been unseen this long
+SWEEP_GRACE_HOURS = float(os.getenv("SWEEP_GRACE_HOURS", "48"))
+# Inactive offers are archived after this many days
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_COLLECTION = 'discounts_archive'
+
+
+def new_generation(now=None):
+    """Id of one crawl of one source: sortable by time, unique across processes."""
+    return f"{(now or datetime.now()):%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+def _timestamp(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+
+def sweep_collection(collection, source, generation, now, grace_hours=SWEEP_GRACE_HOURS):
+    """Deactivate the source's offers from older generations unseen for the grace period. Returns the count."""
+    cutoff = now - timedelta(hours=grace_hours)
+    result = collection.update_many(
+        {
+            'source': source, 'active': True, 'crawlGeneration': {'$ne': generation},
+            # Offers saved before generations existed fall back to updatedAt
+            '$or': [{'lastSeenAt': {'$lt': cutoff}},
+                    {'lastSeenAt': {'$exists': False}, 'updatedAt': {'$lt': cutoff}}],
+        },
+        {'$set': {'active': False, 'deactivatedAt': now}}
+    )
+    return result.modified_count
+
+
+def archive_collection(database, source, now, archive_after_days=ARCHIVE_AFTER_DAYS):
+    """Move the source's long-inactive offers to discounts_archive. Returns the count."""
+    match = {'source': source, 'active': False,
+             'deactivatedAt': {'$lt': now - timedelta(days=archive_after_days)}}
+    collection = database['discounts']
+    if collection.count_documents(match, limit=1) == 0:
+        return 0
+    # Copied server-side, then removed; an offer reactivated in between no longer matches
+    collection.aggregate([{'$match': match}, {'$merge': {'into': ARCHIVE_COLLECTION, 'whenMatched': 'replace'}}])
+    return collection.delete_many(match).deleted_count
+
+
+def sweep_local(store, source, generation, now, grace_hours=SWEEP_GRACE_HOURS):
+    """sweep_collection() for the local JSON store."""
+    cutoff = now - timedelta(hours=grace_hours)
+    stale, touched = [], []
+    for record in store.records():
+        if record.get('source') != source or not record.get('active', True) \
+                or record.get('crawlGeneration') == generation:
+            continue
+        last_seen = _timestamp(record.get('lastSeenAt') or record.get('updatedAt'))
+        if last_seen is None:
+            # Saved before generations existed: its grace period starts now
+            touched.append({'source': source, 'externalId': record.get('externalId'), 'lastSeenAt': now.isoformat()})
+        elif last_seen < cutoff:
+            stale.append({'source': source, 'externalId': record.get('externalId'),
+                          'active': False, 'deactivatedAt': now.isoformat()})
+    store.upsert(stale + touched)
+    return len(stale)
+
+
+def archive_local(store, source, now, archive_after_days=ARCHIVE_AFTER_DAYS):
+    """archive_collection() for the local JSON store."""
+    cutoff = now - timedelta(days=archive_after_days)
+    keys = [store.key(record) for record in store.records()
+            if record.get('source') == source and not record.get('active', True)
+            and (_timestamp(record.get('deactivatedAt')) or now) < cutoff]
+    return store.archive(keys)
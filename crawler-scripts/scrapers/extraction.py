@@ -0,0 +1,160 @@
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+
+class CardSelectors:
+    """CSS selectors describing one discount card on a listing page."""
+
+    def __init__(self, card, title=None, image='img', link='a', text=None):
+        self.card = card
+        self.title = title
+        self.image = image
+        self.link = link
+        # Element whose text is used as raw_text; the whole card when None
+        self.text = text
+
+    def as_dict(self):
+        return {
+            'card': self.card,
+            'title': self.title,
+            'image': self.image,
+            'link': self.link,
+            'text': self.text,
+        }
+
+
+class Pagination:
+    """
+    How a listing reveals more cards:
+      - "none": everything is on the first page
+      - "load_more": click `selector` until it disappears
+      - "scroll": scroll to the bottom until no new cards show up
+      - "next": follow the `selector` link to the next listing page
+    """
+
+    def __init__(self, mode="none", selector=None, max_pages=50, wait_ms=5000):
+        self.mode = mode
+        self.selector = selector
+        self.max_pages = max_pages
+        self.wait_ms = wait_ms
+
+
+# Pulls every card from `offset` onwards in a single round trip.
+# URLs are resolved against the document so relative paths come back absolute.
+EXTRACT_CARDS_JS = """
+({selectors, offset}) => {
+    const absolute = (value) => {
+        if (!value) return null;
+        try { return new URL(value, document.baseURI).href; } catch (e) { return value; }
+    };
+    const pick = (root, selector) => selector ? root.querySelector(selector) : null;
+    const text = (el) => el ? (el.innerText || el.textContent || '').trim() : null;
+
+    return Array.from(document.querySelectorAll(selectors.card)).slice(offset).map((card) => {
+        const img = pick(card, selectors.image);
+        const link = card.matches('a[href]') ? card : pick(card, selectors.link);
+        return {
+            title: text(pick(card, selectors.title)),
+            text: text(selectors.text ? pick(card, selectors.text) : card),
+            image: img ? absolute(img.getAttribute('src') || img.getAttribute('data-src')) : null,
+            link: link ? absolute(link.getAttribute('href')) : null,
+        };
+    });
+}
+"""
+
+COUNT_CARDS_JS = "([selector, count]) => document.querySelectorAll(selector).length > count"
+
+
+async def _evaluate_cards(page, selectors, offset):
+    return await page.evaluate(EXTRACT_CARDS_JS, {'selectors': selectors.as_dict(), 'offset': offset})
+
+
+async def _wait_for_more(page, selectors, count, wait_ms):
+    try:
+        await page.wait_for_function(COUNT_CARDS_JS, arg=[selectors.card, count], timeout=wait_ms)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def iter_cards(page, selectors, pagination=None, on_page=None):
+    """
+    Yield the cards of the listing currently open in `page` one batch per
+    page, following the pagination strategy until it runs dry. Cards are
+    plain dicts with title, text, image and link keys. `on_page` is called
+    after each batch so callers can check their time budget.
+    """
+    pagination = pagination or Pagination()
+    batch = await _evaluate_cards(page, selectors, 0)
+    seen_on_page = len(batch)
+    if batch:
+        yield batch
+
+    for _ in range(pagination.max_pages - 1):
+        if on_page:
+            on_page()
+
+        if pagination.mode == "load_more":
+            button = await page.query_selector(pagination.selector)
+            if not button or not await button.is_visible():
+                break
+            await button.click()
+            if not await _wait_for_more(page, selectors, seen_on_page, pagination.wait_ms):
+                break
+
+        elif pagination.mode == "scroll":
+            await page.evaluate("() => window.scrollTo(0, document.body.scrollHeight)")
+            if not await _wait_for_more(page, selectors, seen_on_page, pagination.wait_ms):
+                break
+
+        elif pagination.mode == "next":
+            next_link = await page.query_selector(pagination.selector)
+            href = await next_link.get_attribute('href') if next_link else None
+            if not href:
+                break
+            await page.goto(await page.evaluate("(href) => new URL(href, document.baseURI).href", href))
+            seen_on_page = 0
+
+        else:
+            break
+
+        batch = await _evaluate_cards(page, selectors, seen_on_page)
+        if not batch:
+            break
+        seen_on_page += len(batch)
+        yield batch
+
+
+def next_page_url(html, selector, base_url):
+    """Absolute URL of the `selector` link of a server-rendered page, or None."""
+    link = BeautifulSoup(html, 'html.parser').select_one(selector)
+    href = link.get('href') if link else None
+    return urljoin(base_url, href) if href else None
+
+
+def extract_cards_from_html(html, selectors, base_url):
+    """Static counterpart of iter_cards() for server-rendered listings."""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    def pick(root, selector):
+        return root.select_one(selector) if selector else None
+
+    def text(el):
+        return el.get_text(' ', strip=True) if el else None
+
+    cards = []
+    for card in soup.select(selectors.card):
+        img = pick(card, selectors.image)
+        link = card if card.name == 'a' and card.get('href') else pick(card, selectors.link)
+        src = (img.get('src') or img.get('data-src')) if img else None
+        href = link.get('href') if link else None
+        cards.append({
+            'title': text(pick(card, selectors.title)),
+            'text': text(pick(card, selectors.text) if selectors.text else card),
+            'image': urljoin(base_url, src) if src else None,
+            'link': urljoin(base_url, href) if href else None,
+        })
+    return cards
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import re
+import unicodedata
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Parsed fields that make up an offer's content; anything else (timestamps,
+# counters, ids) doesn't count as a change. offerGroupId is derived, but an
+# offer that moved to another group still has to be written.
+HASHED_FIELDS = (
+    'title', 'description', 'discountPercentage', 'discountAmount', 'currency',
+    'installments', 'weekdays', 'validFrom', 'validUntil', 'url', 'imageUrl',
+    'store_name', 'store_slug', 'latitude', 'longitude', 'paymentMethod', 'offerGroupId',
+)
+
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|gclid|fbclid|mc_\w+|_ga)$', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Lowercase, strip accents and collapse whitespace."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return WHITESPACE.sub(' ', text).strip().lower()
+
+
+def normalize_url(url):
+    """Canonical form of a URL: lowercase host, no fragment, no tracking params, sorted query."""
+    parts = urlsplit((url or '').strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not TRACKING_PARAMS.match(k))
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ''))
+
+
+def _digest(value):
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+def stable_id(prefix, url=None, title=None, store=None, listing_url=None):
+    """
+    Deterministic externalId for an offer: its normalized title and store,
+    plus its link when it has one other than the listing. Links alone
+    aren't enough, since cards often share a category page.
+    """
+    key = 'text:' + normalize_text(title) + '|' + normalize_text(store)
+    if url and (not listing_url or normalize_url(url) != normalize_url(listing_url)):
+        key += '|url:' + normalize_url(url)
+    return f"{prefix}-{_digest(key)[:16]}"
+
+
+def content_hash(discount):
+    """Fingerprint of a parsed Offer's content, stored as `contentHash`."""
+    content = {field: getattr(discount, field) for field in HASHED_FIELDS}
+    return _digest(json.dumps(content, sort_keys=True, ensure_ascii=False, default=str))
@@ -1,4 +1,6 @@
 from .base_scraper import BaseScraper
+from .offer_text import parse_offer_text
+from .records import Offer, RawCard
 import random
 
 class MockBankScraper(BaseScraper):
@@ -13,61 +15,61 @@ class MockBankScraper(BaseScraper):
         base_discount = random.randint(15, 25)
         
         return [
-            {
-                "id": "101",
-                "title": f"{base_discount}% Dcto en Starbucks",
-                "store": "Starbucks",
-                "url": "https://www.starbucks.cl",
-                "img": "https://upload.wikimedia.org/wikipedia/en/thumb/d/d3/Starbucks_Corporation_Logo_2011.svg/1200px-Starbucks_Corporation_Logo_2011.svg.png",
-                "lat": -33.42628, # Providencia
-                "lng": -70.61099
-            },
-            {
-                "id": "102",
-                "title": "40% Dcto en McDonald's",
-                "store": "McDonald's",
-                "url": "https://www.mcdonalds.cl",
-                "img": "https://upload.wikimedia.org/wikipedia/commons/thumb/3/36/McDonald%27s_Golden_Arches.svg/1200px-McDonald%27s_Golden_Arches.svg.png",
-                "lat": -33.4372, # Santiago Centro
-                "lng": -70.6506
-            },
-            {
-                "id": "103",
-                "title": "30% en Farmacias Ahumada",
-                "store": "Farmacias Ahumada",
-                "url": "https://www.farmaciasahumada.cl",
-                "img": "https://upload.wikimedia.org/wikipedia/commons/thumb/e/e5/Farmacias_Ahumada_logo.svg/2560px-Farmacias_Ahumada_logo.svg.png",
-                "lat": -33.4100, # Las Condes
-                "lng": -70.5700
-            },
-            {
-                "id": f"104-{random.randint(1000, 9999)}", # New random offer
-                "title": "25% en Dunkin Donuts",
-                "store": "Dunkin Donuts",
-                "url": "https://www.dunkindonuts.cl",
-                "img": "https://upload.wikimedia.org/wikipedia/en/thumb/b/b8/Dunkin%27_Donuts_logo.svg/1200px-Dunkin%27_Donuts_logo.svg.png",
-                "lat": -33.4200, 
-                "lng": -70.6000
-            }
+            RawCard(
+                externalId="101",
+                title=f"{base_discount}% Dcto en Starbucks",
+                store_name="Starbucks",
+                url="https://www.starbucks.cl",
+                imageUrl="https://upload.wikimedia.org/wikipedia/en/thumb/d/d3/Starbucks_Corporation_Logo_2011.svg/1200px-Starbucks_Corporation_Logo_2011.svg.png",
+                latitude=-33.42628,  # Providencia
+                longitude=-70.61099,
+            ),
+            RawCard(
+                externalId="102",
+                title="40% Dcto en McDonald's",
+                store_name="McDonald's",
+                url="https://www.mcdonalds.cl",
+                imageUrl="https://upload.wikimedia.org/wikipedia/commons/thumb/3/36/McDonald%27s_Golden_Arches.svg/1200px-McDonald%27s_Golden_Arches.svg.png",
+                latitude=-33.4372,  # Santiago Centro
+                longitude=-70.6506,
+            ),
+            RawCard(
+                externalId="103",
+                title="30% en Farmacias Ahumada",
+                store_name="Farmacias Ahumada",
+                url="https://www.farmaciasahumada.cl",
+                imageUrl="https://upload.wikimedia.org/wikipedia/commons/thumb/e/e5/Farmacias_Ahumada_logo.svg/2560px-Farmacias_Ahumada_logo.svg.png",
+                latitude=-33.4100,  # Las Condes
+                longitude=-70.5700,
+            ),
+            RawCard(
+                externalId="104",
+                title="25% en Dunkin Donuts",
+                store_name="Dunkin Donuts",
+                url="https://www.dunkindonuts.cl",
+                imageUrl="https://upload.wikimedia.org/wikipedia/en/thumb/b/b8/Dunkin%27_Donuts_logo.svg/1200px-Dunkin%27_Donuts_logo.svg.png",
+                latitude=-33.4200,
+                longitude=-70.6000,
+            )
         ]
 
     def parse(self, raw_data):
         parsed_discounts = []
         for item in raw_data:
             # Infer bank/payment method for demo purposes
-            bank_name = "Banco de Chile" if "101" in item['id'] else "Banco Santander" if "103" in item['id'] else "CMR Falabella"
+            bank_name = "Banco de Chile" if "101" in item.externalId else "Banco Santander" if "103" in item.externalId else "CMR Falabella"
+            store_slug = item.store_name.lower().replace("'", "").replace(" ", "-")
             
-            parsed_discounts.append({
-                'externalId': item['id'],
-                'title': item['title'],
-                'description': f"Descuento exclusivo pagando con {bank_name}.",
-                'discountPercentage': int(item['title'].split('%')[0]),
-                'url': item['url'],
-                'imageUrl': item['img'],
-                'store_name': item['store'],
-                'store_slug': item['store'].lower().replace("'", "").replace(" ", "-"),
-                'latitude': item.get('lat'),
-                'longitude': item.get('lng'),
-                'paymentMethod': bank_name # Field for filtering
-            })
+            parsed_discounts.append(Offer(
+                externalId=item.externalId,
+                title=item.title,
+                description=f"Descuento exclusivo pagando con {bank_name}.",
+                **parse_offer_text(item.title),
+                url=item.url,
+                imageUrl=item.imageUrl,
+                store_name=item.store_name,
+                store_slug=store_slug,
+                **self.store_location(item, store_slug),
+                paymentMethod=bank_name # Field for filtering
+            ))
         return parsed_discounts
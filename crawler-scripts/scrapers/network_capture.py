@@ -0,0 +1,143 @@
+import asyncio
+import re
+import threading
+
+from cache import cache_path, load_json, save_json
+
+ENDPOINTS_PATH = cache_path('endpoints.json')
+
+# Keys that commonly carry each field in the banks' JSON payloads
+TITLE_KEYS = ('title', 'titulo', 'nombre', 'name', 'headline')
+DESCRIPTION_KEYS = ('description', 'descripcion', 'detalle', 'bajada', 'text', 'texto')
+IMAGE_KEYS = ('image', 'imagen', 'img', 'imageUrl', 'logo', 'thumbnail')
+URL_KEYS = ('url', 'link', 'href', 'permalink')
+ID_KEYS = ('id', '_id', 'uuid', 'codigo', 'slug')
+STORE_KEYS = ('comercio', 'store', 'merchant', 'partner', 'marca')
+
+_endpoints_lock = threading.Lock()
+
+
+def first_value(obj, keys):
+    """Return the first usable string among `keys`, unwrapping {url|src|name} objects."""
+    for key in keys:
+        value = obj.get(key)
+        if isinstance(value, dict):
+            value = value.get('url') or value.get('src') or value.get('name')
+        if isinstance(value, (str, int)) and str(value).strip():
+            return str(value).strip()
+    return None
+
+
+def find_offer_lists(payload):
+    """
+    Walk a JSON payload and return every dict that sits in a list of
+    title-bearing objects, i.e. the offers regardless of how they're nested.
+    """
+    offers = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            dicts = [item for item in node if isinstance(item, dict)]
+            if dicts and sum(1 for item in dicts if first_value(item, TITLE_KEYS)) * 2 > len(dicts):
+                offers.extend(item for item in dicts if first_value(item, TITLE_KEYS))
+            else:
+                stack.extend(node)
+    return offers
+
+
+class ResponseRecorder:
+    """
+    Records JSON responses whose URL matches one of `patterns` while a page
+    loads, so offers can be read straight from the portal's own API calls.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [re.compile(p) for p in patterns]
+        self.responses = []
+        # Responses already handed out by take()
+        self._taken = 0
+        self._pending = set()
+        self._arrived = asyncio.Event()
+
+    def attach(self, page):
+        page.on('response', self._on_response)
+
+    def _on_response(self, response):
+        if not any(p.search(response.url) for p in self.patterns):
+            return
+        if 'json' not in (response.headers.get('content-type') or ''):
+            return
+        task = asyncio.ensure_future(self._record(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _record(self, response):
+        try:
+            payload = await response.json()
+        except Exception:
+            return
+        request = response.request
+        self.responses.append({
+            'endpoint': {
+                'url': response.url,
+                'method': request.method,
+                'body': request.post_data,
+                'contentType': request.headers.get('content-type'),
+            },
+            'payload': payload,
+        })
+        self._arrived.set()
+
+    async def wait(self, timeout_ms, quiet_ms=1000, until=None):
+        """
+        Wait up to `timeout_ms` for the first matching response, then keep
+        collecting until no new one arrives for `quiet_ms`. If the future
+        `until` finishes before any response arrived, stop waiting right away.
+        """
+        arrived = asyncio.ensure_future(self._arrived.wait())
+        waiting = {arrived} | ({until} if until is not None else set())
+        try:
+            await asyncio.wait(waiting, timeout=timeout_ms / 1000, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            arrived.cancel()
+        if not self._arrived.is_set():
+            if self._pending:
+                await asyncio.gather(*self._pending, return_exceptions=True)
+            return self.responses
+        while True:
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), quiet_ms / 1000)
+            except asyncio.TimeoutError:
+                break
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        return self.responses
+
+
+    async def take(self):
+        """The responses recorded since the last call, once those still being read are in."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        responses = self.responses[self._taken:]
+        self._taken = len(self.responses)
+        return responses
+
+
+def load_endpoints(source):
+    with _endpoints_lock:
+        return load_json(ENDPOINTS_PATH, {}).get(source, [])
+
+
+def save_endpoints(source, endpoints):
+    """Remember (or forget, with an empty list) the API endpoints of a source."""
+    with _endpoints_lock:
+        known = load_json(ENDPOINTS_PATH, {})
+        if endpoints:
+            known[source] = endpoints
+        else:
+            known.pop(source, None)
+        save_json(ENDPOINTS_PATH, known)
@@ -0,0 +1,203 @@
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+DAY_NAMES = {
+    'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3, 'viernes': 4, 'sabado': 5, 'domingo': 6,
+}
+MONTHS = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6, 'julio': 7,
+    'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12,
+}
+
+_DAY = r'(lunes|martes|miercoles|jueves|viernes|sabado|domingo)s?'
+_MONTH = '(' + '|'.join(MONTHS) + ')'
+
+PERCENT_RE = re.compile(r'(\d{1,3}(?:[.,]\d+)?)\s*%')
+AMOUNT_RE = re.compile(r'(us\$|usd|\$|clp)\s*(\d{1,3}(?:\.\d{3})+|\d+)')
+# Amounts that are limits or thresholds, not the discount itself
+AMOUNT_LIMIT_RE = re.compile(r'(tope|maximo|minim[oa]|sobre|desde|superiores?|compras? de|monto)\W*(de\s+)?(hasta\s+)?$')
+AMOUNT_DISCOUNT_RE = re.compile(r'^\s*(de\s+)?(descuento|dcto|off|ahorro|menos)')
+INSTALLMENTS_RE = re.compile(r'(\d{1,2})\s*cuotas?')
+DAY_RE = re.compile(r'\b' + _DAY + r'\b')
+# What sits between the two days of "lunes a jueves"
+DAY_RANGE_JOIN_RE = re.compile(r'\s+(?:a|al|hasta)\s+$')
+NUMERIC_DATE_RE = re.compile(r'(\d{1,2})[/-](\d{1,2})(?:[/-](\d{4}|\d{2}))?\b')
+TEXT_DATE_RE = re.compile(r'(\d{1,2})\s+de\s+' + _MONTH + r'(?:\s+(?:de|del)\s+(\d{4}))?')
+TEXT_RANGE_RE = re.compile(r'\bdel?\s+(\d{1,2})(?:\s+de\s+' + _MONTH + r')?\s+(?:al|hasta el)\s+(\d{1,2})\s+de\s+'
+                           + _MONTH + r'(?:\s+(?:de|del)\s+(\d{4}))?')
+UNTIL_HINT_RE = re.compile(r'(hasta|vence|vigencia|valido al|al)\W*(el\s+)?$')
+FROM_HINT_RE = re.compile(r'(desde|a partir del?|comienza)\W*(el\s+)?$')
+# str.replace per accent is far cheaper than unicodedata per character
+ACCENTS = (('á', 'a'), ('é', 'e'), ('í', 'i'), ('ó', 'o'), ('ú', 'u'), ('ü', 'u'),
+           ('à', 'a'), ('è', 'e'), ('ì', 'i'), ('ò', 'o'), ('ù', 'u'))
+
+
+def normalize(text):
+    """Lowercase, strip Spanish accents and collapse whitespace."""
+    text = text.lower()
+    if not text.isascii():
+        for accented, plain in ACCENTS:
+            if accented in text:
+                text = text.replace(accented, plain)
+    return ' '.join(text.split())
+
+
+def _year(value):
+    if not value:
+        return None
+    year = int(value)
+    return year + 2000 if year < 100 else year
+
+
+def _make_date(day, month, year, today):
+    try:
+        if year is None:
+            candidate = date(today.year, month, day)
+            # "hasta el 15 de enero" read in December means next January
+            if (today - candidate).days > 183:
+                candidate = date(today.year + 1, month, day)
+            return candidate
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _year_before(value):
+    try:
+        return value.replace(year=value.year - 1)
+    except ValueError:
+        # February 29th has no match in the year before
+        return value.replace(year=value.year - 1, day=28)
+
+
+def _percentage(text):
+    for match in PERCENT_RE.finditer(text):
+        value = float(match.group(1).replace(',', '.'))
+        if 0 < value <= 100:
+            return int(value) if value.is_integer() else value
+    return None
+
+
+def _amount(text, has_percentage):
+    for match in AMOUNT_RE.finditer(text):
+        before = text[max(0, match.start() - 25):match.start()]
+        after = text[match.end():match.end() + 25]
+        if AMOUNT_LIMIT_RE.search(before):
+            continue
+        # Next to a percentage a bare amount is usually a cap or minimum
+        if has_percentage and not AMOUNT_DISCOUNT_RE.search(after):
+            continue
+        currency = 'USD' if match.group(1) in ('us$', 'usd') else 'CLP'
+        return int(match.group(2).replace('.', '')), currency
+    return None, None
+
+
+def _weekdays(text):
+    if 'todos los dias' in text:
+        return WEEKDAYS
+    days = set()
+    previous = None
+    for match in DAY_RE.finditer(text):
+        day = DAY_NAMES[match.group(1)]
+        if previous is not None and DAY_RANGE_JOIN_RE.match(text, previous.end(), match.start()):
+            start = DAY_NAMES[previous.group(1)]
+            days.update((start + i) % 7 for i in range((day - start) % 7 + 1))
+        days.add(day)
+        previous = match
+    if 'fin de semana' in text or 'fines de semana' in text:
+        days.update((5, 6))
+    return tuple(WEEKDAYS[d] for d in sorted(days)) or None
+
+
+def _validity(text, today):
+    match = TEXT_RANGE_RE.search(text)
+    if match:
+        start_day, start_month, end_day, end_month, year = match.groups()
+        year = _year(year)
+        valid_until = _make_date(int(end_day), MONTHS[end_month], year, today)
+        valid_from = _make_date(int(start_day), MONTHS[start_month or end_month], year, today)
+        if valid_from and valid_until and valid_from > valid_until:
+            valid_from = _year_before(valid_from)
+        return valid_from, valid_until
+
+    found = []
+    for match in NUMERIC_DATE_RE.finditer(text):
+        day, month, year = match.groups()
+        if year is None:
+            # "31/12" is only a date when it reads as one ("hasta el 31/12"), not in "24/7"
+            before = text[max(0, match.start() - 20):match.start()]
+            if not (UNTIL_HINT_RE.search(before) or FROM_HINT_RE.search(before)):
+                continue
+        found.append((match.start(), _make_date(int(day), int(month), _year(year), today)))
+    for match in TEXT_DATE_RE.finditer(text):
+        day, month, year = match.groups()
+        found.append((match.start(), _make_date(int(day), MONTHS[month], _year(year), today)))
+    found = sorted((start, d) for start, d in found if d)
+
+    valid_from = valid_until = None
+    for start, found_date in found:
+        before = text[max(0, start - 20):start]
+        if FROM_HINT_RE.search(before) and valid_from is None:
+            valid_from = found_date
+        elif UNTIL_HINT_RE.search(before) and valid_until is None:
+            valid_until = found_date
+    if valid_until is None and found and (valid_from is None or found[-1][1] > valid_from):
+        # A lone date on an offer is almost always its end date
+        valid_until = found[-1][1]
+    return valid_from, valid_until
+
+
+@lru_cache(maxsize=65536)
+def _parse(text, today_ordinal):
+    today = date.fromordinal(today_ordinal)
+    text = normalize(text)
+    percentage = _percentage(text) if '%' in text else None
+    amount, currency = _amount(text, percentage is not None) if '$' in text or 'usd' in text or 'clp' in text else (None, None)
+    installments = INSTALLMENTS_RE.search(text) if 'cuota' in text else None
+    valid_from, valid_until = _validity(text, today) if any(c.isdigit() for c in text) else (None, None)
+    return (
+        percentage,
+        amount,
+        currency,
+        int(installments.group(1)) if installments else None,
+        _weekdays(text),
+        valid_from,
+        valid_until,
+    )
+
+
+def _as_datetime(value):
+    return datetime(value.year, value.month, value.day) if value else None
+
+
+def parse_offer_text(title, raw_text=None, today=None):
+    """
+    Extract the structured discount fields of models/Discount.js from an
+    offer's title and raw text. The title wins for the discount itself;
+    the raw text fills in whatever the title doesn't say.
+    """
+    today_ordinal = (today or date.today()).toordinal()
+    fields = list(_parse(title or '', today_ordinal))
+    if raw_text and raw_text != title:
+        for i, value in enumerate(_parse(raw_text, today_ordinal)):
+            if fields[i] is None:
+                fields[i] = value
+
+    percentage, amount, currency, installments, weekdays, valid_from, valid_until = fields
+    return {
+        'discountPercentage': percentage or 0,
+        'discountAmount': amount,
+        'currency': currency or 'CLP',
+        'installments': installments,
+        'weekdays': list(weekdays) if weekdays else [],
+        'validFrom': _as_datetime(valid_from),
+        'validUntil': _as_datetime(valid_until),
+    }
+
+
+def parse_offer_texts(pairs, today=None):
+    """Batch form of parse_offer_text for an iterable of (title, raw_text)."""
+    today = today or date.today()
+    return [parse_offer_text(title, raw_text, today) for title, raw_text in pairs]
@@ -0,0 +1,168 @@
+"""
+Streaming fetch -> parse -> save pipeline.
+
+fetch() runs in its own thread and hands raw items over a bounded queue, so a
+slow save holds the fetcher back instead of letting items pile up in memory.
+The scraper thread parses them in small chunks, groups near-duplicates
+(scrapers/dedup.py) and saves a batch as soon as one fills up, so a run that
+dies halfway keeps what it already scraped.
+"""
+import contextvars
+import os
+import queue
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Raw items buffered between fetch and parse before fetch has to wait
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "1000"))
+# Raw items handed to parse() per call
+PARSE_BATCH_SIZE = int(os.getenv("PARSE_BATCH_SIZE", "100"))
+# How often a blocked stage wakes up to check whether it should give up
+POLL_SECONDS = 0.1
+
+STAGES = ('fetch', 'parse', 'dedup', 'save')
+
+_DONE = object()
+
+
+class PipelineStopped(Exception):
+    """Raised in the fetch thread once the consuming side has given up."""
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+class BoundedQueue:
+    """A queue.Queue whose blocking calls can be interrupted."""
+
+    def __init__(self, maxsize, stopped):
+        self._queue = queue.Queue(maxsize)
+        self.stopped = stopped
+
+    def put(self, item):
+        """Block while the queue is full; raise PipelineStopped once the consumer quits."""
+        while True:
+            if self.stopped.is_set():
+                raise PipelineStopped()
+            try:
+                self._queue.put(item, timeout=POLL_SECONDS)
+                return
+            except queue.Full:
+                pass
+
+    def get_batch(self, size, check=None):
+        """Block for one item, then take whatever else is ready, up to `size`."""
+        while True:
+            if check:
+                check()
+            try:
+                batch = [self._queue.get(timeout=POLL_SECONDS)]
+                break
+            except queue.Empty:
+                pass
+        while len(batch) < size and batch[-1] is not _DONE and not isinstance(batch[-1], _Failed):
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+
+def _produce(scraper, channel):
+    start = time.monotonic()
+    count = 0
+    # Time blocked on a full queue is the consumer's, not fetch's
+    waiting = 0.0
+    try:
+        for item in scraper.fetch():
+            handed_over = time.monotonic()
+            channel.put(item)
+            waiting += time.monotonic() - handed_over
+            count += 1
+        channel.put(_DONE)
+    except PipelineStopped:
+        pass
+    except BaseException as e:
+        try:
+            channel.put(_Failed(e))
+        except PipelineStopped:
+            pass
+    finally:
+        scraper.metrics.add_stage('fetch', time.monotonic() - start - waiting, items_out=count)
+
+
+def run_pipeline(scraper, save_batch_size):
+    """
+    Stream `scraper.fetch()` through `parse()` into `save()`, saving every
+    `save_batch_size` parsed offers. Errors from fetch are re-raised once
+    whatever was parsed before them has been saved. Returns the number of
+    offers save() reported as written.
+    """
+    metrics = scraper.metrics
+    # Keeps the run report in pipeline order even though the stages overlap
+    for name in STAGES:
+        metrics.add_stage(name, 0.0, items_in=0 if name != 'fetch' else None)
+
+    stopped = threading.Event()
+    channel = BoundedQueue(PIPELINE_QUEUE_SIZE, stopped)
+    # The fetch thread reports bytes and round trips to this source's metrics too
+    context = contextvars.copy_context()
+    producer = threading.Thread(target=context.run, args=(_produce, scraper, channel),
+                                name=f"fetch-{scraper.source_name}", daemon=True)
+    producer.start()
+
+    pending = []
+    written = 0
+
+    def flush(batch):
+        start = time.monotonic()
+        count = scraper.save(batch)
+        metrics.add_stage('save', time.monotonic() - start, items_in=len(batch), items_out=count)
+        return count
+
+    try:
+        failure = None
+        while True:
+            batch = channel.get_batch(PARSE_BATCH_SIZE, scraper.check_cancelled)
+            end = batch[-1]
+            if end is _DONE or isinstance(end, _Failed):
+                batch.pop()
+
+            if batch:
+                start = time.monotonic()
+                discounts = scraper.parse(batch)
+                metrics.add_stage('parse', time.monotonic() - start, items_in=len(batch),
+                                  items_out=len(discounts))
+
+                start = time.monotonic()
+                joined = scraper.group_offers(discounts)
+                # itemsOut counts the offers that weren't near-duplicates of an earlier one
+                metrics.add_stage('dedup', time.monotonic() - start, items_in=len(discounts),
+                                  items_out=len(discounts) - joined)
+                pending.extend(discounts)
+
+            if isinstance(end, _Failed):
+                failure = end.error
+                break
+            if end is _DONE:
+                break
+
+            while len(pending) >= save_batch_size:
+                scraper.check_cancelled()
+                written += flush(pending[:save_batch_size])
+                del pending[:save_batch_size]
+
+        # Once the runner has abandoned the source, leave the database alone
+        if pending and not scraper.cancel_event.is_set():
+            written += flush(pending)
+        if failure is not None:
+            raise failure
+        return written
+    finally:
+        stopped.set()
@@ -0,0 +1,146 @@
+"""
+Typed records passed through the fetch -> parse -> save pipeline.
+
+`RawCard` is one offer as fetch() found it and `Offer` a parsed discount.
+Both are slotted dataclasses: a fixed set of attributes instead of a dict
+per record, with the required fields checked once, when the record is
+built. An Offer serializes straight to the documents of
+backend/models/Discount.js and models/Store.js, or to a local store record.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+
+
+class InvalidRecord(ValueError):
+    """Raised when a record is built with a missing or malformed field."""
+
+
+def _require(record, names):
+    for name in names:
+        value = getattr(record, name)
+        if not isinstance(value, str) or not value.strip():
+            raise InvalidRecord(f"{type(record).__name__}.{name} is required, got {value!r}")
+
+
+def _check_location(record):
+    if record.latitude is None and record.longitude is None:
+        return
+    if record.latitude is None or record.longitude is None:
+        raise InvalidRecord(f"{type(record).__name__} {record.externalId!r} has only half a location")
+    if not (-90 <= record.latitude <= 90 and -180 <= record.longitude <= 180):
+        raise InvalidRecord(f"{type(record).__name__} {record.externalId!r} is off the map: "
+                            f"{record.latitude}, {record.longitude}")
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+@dataclass(slots=True)
+class RawCard:
+    """An offer as the listing, its API or the fallback data gave it."""
+    externalId: str
+    title: str
+    store_name: str
+    url: str
+    imageUrl: str | None = None
+    raw_text: str | None = None
+    # Only when the source itself gives coordinates; otherwise the gazetteer decides
+    latitude: float | None = None
+    longitude: float | None = None
+
+    def __post_init__(self):
+        _require(self, ('externalId', 'title', 'store_name', 'url'))
+        _check_location(self)
+
+
+@dataclass(slots=True)
+class Offer:
+    """A parsed discount, with the fields of models/Discount.js plus its store's name and slug."""
+    externalId: str
+    title: str
+    url: str
+    store_name: str
+    store_slug: str
+    description: str = ''
+    discountPercentage: float | None = None
+    discountAmount: float | None = None
+    currency: str = 'CLP'
+    installments: int | None = None
+    weekdays: list = field(default_factory=list)
+    validFrom: datetime | None = None
+    validUntil: datetime | None = None
+    imageUrl: str | None = None
+    latitude: float | None = None
+    longitude: float | None = None
+    geohash: str | None = None
+    # Bank name; MongoDB also relates it through paymentMethods
+    paymentMethod: str | None = None
+    # Set by scrapers/dedup.py
+    offerGroupId: str | None = None
+
+    def __post_init__(self):
+        _require(self, ('externalId', 'title', 'url', 'store_name', 'store_slug'))
+        _check_location(self)
+        if self.discountPercentage is not None and not 0 <= self.discountPercentage <= 100:
+            raise InvalidRecord(f"Offer {self.externalId!r} has a {self.discountPercentage}% discount")
+
+    def _discount_fields(self, dates):
+        return {
+            'title': self.title,
+            'description': self.description,
+            'discountPercentage': self.discountPercentage,
+            'discountAmount': self.discountAmount,
+            'currency': self.currency,
+            'installments': self.installments,
+            'weekdays': self.weekdays,
+            'validFrom': dates(self.validFrom),
+            'validUntil': dates(self.validUntil),
+            'url': self.url,
+            'imageUrl': self.imageUrl,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'geohash': self.geohash,
+            'externalId': self.externalId,
+            'offerGroupId': self.offerGroupId,
+            'paymentMethod': self.paymentMethod,
+        }
+
+    def discount_document(self, source, store_id, content_hash, generation, now, payment_method_ids=()):
+        """The `$set` of this offer's upsert into the discounts collection."""
+        document = self._discount_fields(lambda value: value)
+        document.update({
+            'store': store_id,
+            'paymentMethods': list(payment_method_ids),
+            'source': source,
+            'contentHash': content_hash,
+            'active': True,
+            'deactivatedAt': None,
+            'crawlGeneration': generation,
+            'lastSeenAt': now,
+            'updatedAt': now,
+        })
+        return document
+
+    def store_document(self, now):
+        """A new document for the stores collection."""
+        return {'name': self.store_name, 'slug': self.store_slug, 'createdAt': now}
+
+    def local_record(self, source, content_hash, generation, now):
+        """
+        This offer as a local store record: the same fields, dates as ISO
+        strings, and the store inlined since JSON mode has no relations.
+        """
+        record = self._discount_fields(_iso)
+        now = now.isoformat()
+        record.update({
+            '_id': self.externalId,
+            'store': {'name': self.store_name, 'slug': self.store_slug},
+            'source': source,
+            'contentHash': content_hash,
+            'active': True,
+            'deactivatedAt': None,
+            'crawlGeneration': generation,
+            'lastSeenAt': now,
+        })
+        return record
@@ -0,0 +1,163 @@
+import json
+import os
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from cache import atomic_write
+
+load_dotenv()
+
+# Map tiles read by backend/app.js (/api/discounts/map)
+TILE_DIR = os.getenv(
+    "MAP_TILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'data', 'tiles'))
+# Geohash length of one tile; 5 characters is a cell of about 4.9 x 4.9 km
+TILE_PRECISION = int(os.getenv("MAP_TILE_PRECISION", "5"))
+# Geohash length stored on each discount, fine enough for prefix queries at any zoom
+POINT_PRECISION = 9
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+BASE32_INDEX = {c: i for i, c in enumerate(BASE32)}
+
+# Fields of a discount that the map needs; tiles carry nothing else
+TILE_FIELDS = ('_id', 'externalId', 'title', 'discountPercentage', 'discountAmount', 'currency', 'imageUrl',
+               'url', 'store', 'paymentMethod', 'source', 'validUntil', 'offerGroupId')
+
+
+def geohash_encode(lat, lng, precision=POINT_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    code, bits, bit_count, even = [], 0, 0, True
+    while len(code) < precision:
+        value, interval = (lng, lng_range) if even else (lat, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            interval[0] = mid
+        else:
+            bits *= 2
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            code.append(BASE32[bits])
+            bits = bit_count = 0
+    return ''.join(code)
+
+
+def geohash_bounds(code):
+    """(south, west, north, east) of a geohash cell."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in code:
+        bits = BASE32_INDEX[char]
+        for shift in range(4, -1, -1):
+            interval = lng_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if bits >> shift & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+class SpatialIndex:
+    """
+    Points bucketed by geohash cell, each cell exported as one map tile.
+    backend/app.js answers area queries by encoding the cells that cover
+    the area and reading only those tiles.
+    """
+
+    def __init__(self, precision=TILE_PRECISION):
+        self.precision = precision
+        self.cells = {}
+        self._bounds = {}
+
+    def __len__(self):
+        return sum(len(points) for points in self.cells.values())
+
+    def add(self, lat, lng, record):
+        code = geohash_encode(lat, lng, self.precision)
+        if code not in self.cells:
+            self.cells[code] = []
+            self._bounds[code] = geohash_bounds(code)
+        self.cells[code].append((lat, lng, record))
+
+    def export_tiles(self, tile_dir=TILE_DIR):
+        """
+        Write one <geohash>.json per non-empty cell plus index.json listing
+        the cells and their bounds, and drop tiles of cells that emptied.
+        """
+        os.makedirs(tile_dir, exist_ok=True)
+        manifest = {
+            'precision': self.precision,
+            'generatedAt': datetime.now().isoformat(timespec='seconds'),
+            'cells': {},
+        }
+        for code, points in self.cells.items():
+            records = [record for _, _, record in points]
+            atomic_write(os.path.join(tile_dir, f"{code}.json"),
+                         lambda f: json.dump(records, f, ensure_ascii=False, separators=(',', ':'), default=str))
+            manifest['cells'][code] = {'count': len(records), 'bounds': self._bounds[code]}
+
+        # The manifest goes last so readers never see cells without tiles
+        atomic_write(os.path.join(tile_dir, 'index.json'),
+                     lambda f: json.dump(manifest, f, separators=(',', ':')))
+        for name in os.listdir(tile_dir):
+            if name.endswith('.json') and name != 'index.json' and name[:-5] not in self.cells:
+                os.remove(os.path.join(tile_dir, name))
+        return len(self.cells)
+
+
+def build_map_index(records, gazetteer, precision=TILE_PRECISION):
+    """
+    Index active discounts for the map. A discount whose location is one of
+    its store's known branches is placed at every branch of that store;
+    one with its own coordinates stays there.
+    """
+    index = SpatialIndex(precision)
+    for record in records:
+        store = record.get('store') or {}
+        tile_record = {field: record.get(field) for field in TILE_FIELDS if record.get(field) is not None}
+        branches = gazetteer.branches(store.get('slug'), store.get('name')) if store.get('slug') else []
+        lat, lng = record.get('latitude'), record.get('longitude')
+
+        if branches and (lat is None or any(b['lat'] == lat and b['lng'] == lng for b in branches)):
+            for branch in branches:
+                index.add(branch['lat'], branch['lng'], {**tile_record, 'latitude': branch['lat'],
+                                                         'longitude': branch['lng'], 'branch': branch.get('name')})
+        elif lat is not None and lng is not None:
+            index.add(lat, lng, {**tile_record, 'latitude': lat, 'longitude': lng})
+    return index
+
+
+def map_records(database=None):
+    """
+    Active discounts with their store's name and slug, from MongoDB when a
+    database is given, otherwise from the local store.
+    """
+    if database is None:
+        from local_store import get_local_store
+        return [r for r in get_local_store().records() if r.get('active', True)]
+
+    pipeline = [
+        {'$match': {'active': True}},
+        {'$lookup': {'from': 'stores', 'localField': 'store', 'foreignField': '_id', 'as': 'store'}},
+        {'$unwind': {'path': '$store', 'preserveNullAndEmptyArrays': True}},
+        {'$project': {**{field: 1 for field in TILE_FIELDS}, 'store': {'name': 1, 'slug': 1},
+                      'latitude': 1, 'longitude': 1}},
+    ]
+    records = []
+    for doc in database['discounts'].aggregate(pipeline):
+        doc['_id'] = str(doc['_id'])
+        doc['store'] = {'name': doc.get('store', {}).get('name'), 'slug': doc.get('store', {}).get('slug')}
+        records.append(doc)
+    return records
+
+
+def export_map_tiles(database=None, tile_dir=TILE_DIR):
+    """Rebuild the map tiles from the current discounts. Returns (points, tiles)."""
+    from gazetteer import get_gazetteer
+
+    index = build_map_index(map_records(database), get_gazetteer())
+    return len(index), index.export_tiles(tile_dir)
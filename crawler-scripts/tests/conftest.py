@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The crawler reads its paths when its modules are imported: point them away from the real data first
+_TMP = tempfile.mkdtemp(prefix='crawler-tests-')
+for name, path in (('CRAWLER_CACHE_DIR', 'cache'), ('LOCAL_STORE_LOG', 'discounts.jsonl'),
+                   ('LOCAL_STORE_SNAPSHOT', 'discounts.json'), ('LOCAL_STORE_ARCHIVE', 'discounts_archive.jsonl'),
+                   ('MAP_TILE_DIR', 'tiles'), ('READ_MODEL_DIR', 'read-model'), ('CRAWLER_REPORT_DIR', 'reports')):
+    os.environ[name] = os.path.join(_TMP, path)
+os.environ['MONGO_URI'] = 'mongodb://127.0.0.1:1/chilecupones_test'
+os.environ['MONGO_SERVER_TIMEOUT_MS'] = '100'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scrapers.base_scraper as base  # noqa: E402
+from local_store import LocalStore  # noqa: E402
+from scrapers.base_scraper import BaseScraper  # noqa: E402
+from scrapers.records import Offer, RawCard  # noqa: E402
+
+
+class ListScraper(BaseScraper):
+    """Scraper over a fixed list of RawCards."""
+
+    def __init__(self, cards=(), source_name='test-bank'):
+        super().__init__(source_name)
+        self.cards = list(cards)
+
+    def fetch(self):
+        yield from self.cards
+
+    def parse(self, raw_data):
+        return [Offer(externalId=item.externalId, title=item.title, description=item.raw_text or '',
+                      url=item.url, store_name=item.store_name,
+                      store_slug=item.store_name.lower().replace(' ', '-'), paymentMethod="Banco Test")
+                for item in raw_data]
+
+    def group_offers(self, discounts):
+        return 0
+
+
+def card(external_id, title=None, store='Tienda', url=None):
+    return RawCard(externalId=external_id, title=title or f"20% Dcto en {store}", store_name=store,
+                   url=url or f"https://example.com/{external_id}")
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """A mongomock database the scrapers save to."""
+    mongomock = pytest.importorskip('mongomock')
+    database = mongomock.MongoClient().get_database('chilecupones_test')
+    monkeypatch.setattr(base, 'get_database', lambda: database)
+    monkeypatch.setattr(base, 'is_database_available', lambda: True)
+    monkeypatch.setattr(base, '_store_cache', {})
+    monkeypatch.setattr(base, '_payment_method_cache', {})
+    return database
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    """A fresh local store the scrapers save to, as without MongoDB."""
+    local = LocalStore(str(tmp_path / 'discounts.jsonl'), str(tmp_path / 'discounts.json'),
+                       archive_path=str(tmp_path / 'discounts_archive.jsonl'))
+    monkeypatch.setattr(base, 'get_local_store', lambda: local)
+    monkeypatch.setattr(base, 'is_database_available', lambda: False)
+    return local
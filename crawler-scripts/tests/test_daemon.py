@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+daemon_module = pytest.importorskip('daemon')
+
+from conftest import ListScraper  # noqa: E402
+
+
+class StubbornScraper(ListScraper):
+    """A scraper that only notices its cancellation once `release` is set."""
+    built = 0
+    release = threading.Event()
+    stopped = threading.Event()
+
+    def __init__(self):
+        super().__init__(source_name='stubborn-bank')
+        StubbornScraper.built += 1
+
+    def run(self):
+        self.release.wait(5)
+        self.stopped.set()
+
+
+@pytest.fixture
+def crawl_daemon(monkeypatch):
+    monkeypatch.setattr(daemon_module.CrawlDaemon, '_build_scrapers',
+                        staticmethod(lambda: [StubbornScraper(), ListScraper()]))
+    monkeypatch.setattr(daemon_module.CrawlDaemon, '_after_run', lambda self, elapsed: None)
+    StubbornScraper.built = 0
+    StubbornScraper.release.clear()
+    StubbornScraper.stopped.clear()
+    crawl_daemon = daemon_module.CrawlDaemon(concurrency=1, timeout=0.05, schedule=False)
+    yield crawl_daemon
+    StubbornScraper.release.set()
+    crawl_daemon.stop()
+
+
+def running(crawl_daemon, source):
+    return next(view['running'] for view in crawl_daemon.sources_view() if view['source'] == source)
+
+
+def test_a_timed_out_source_stays_active_until_its_thread_stops(crawl_daemon):
+    first, = crawl_daemon.trigger(['stubborn-bank'])
+    crawl_daemon.wait([first], timeout=0.5)
+
+    # Past its budget but still running: no second run starts next to it
+    again, = crawl_daemon.trigger(['stubborn-bank'])
+    assert again['started'] is False and again['id'] == first['id']
+
+    StubbornScraper.release.set()
+    assert StubbornScraper.stopped.wait(5)
+    deadline = time.monotonic() + 5
+    while running(crawl_daemon, 'stubborn-bank') and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert crawl_daemon.run_view(first['id'])['status'] == 'timeout'
+    assert crawl_daemon.trigger(['stubborn-bank'])[0]['started'] is True
+
+
+def test_a_stuck_source_gives_its_pool_thread_back(crawl_daemon):
+    stuck, = crawl_daemon.trigger(['stubborn-bank'])
+    # One budget to run and one to stop, then the only pool thread is free again
+    crawl_daemon.wait([stuck], timeout=1)
+    assert crawl_daemon.run_view(stuck['id'])['status'] == 'timeout'
+    assert not StubbornScraper.stopped.is_set() and running(crawl_daemon, 'stubborn-bank')
+
+    other, = crawl_daemon.trigger(['test-bank'])
+    crawl_daemon.wait([other], timeout=1)
+    assert crawl_daemon.run_view(other['id'])['status'] == 'ok'
+
+
+def test_a_run_builds_only_its_own_scraper(crawl_daemon):
+    built = StubbornScraper.built
+    run, = crawl_daemon.trigger(['test-bank'])
+    crawl_daemon.wait([run], timeout=5)
+    assert crawl_daemon.run_view(run['id'])['status'] == 'ok'
+    assert StubbornScraper.built == built
@@ -0,0 +1,100 @@
+from scrapers.dedup import DEDUP_THRESHOLD, OfferGrouper, shingles, signature, similarity
+from scrapers.records import Offer
+
+
+def offer(external_id, title, store, pct, description=''):
+    return Offer(externalId=external_id, title=title, description=description, url=f"https://example.com/{external_id}",
+                 store_name=store, store_slug=store.lower().replace(' ', '-'), discountPercentage=pct)
+
+
+def grouper(tmp_path):
+    return OfferGrouper(path=str(tmp_path / 'offer_groups.json.gz'))
+
+
+def test_same_promotion_from_two_banks_shares_a_group(tmp_path):
+    a = offer('bch-1', "40% Dcto en Pedro, Juan y Diego", "Pedro, Juan y Diego", 40,
+              "40% Dcto en Pedro, Juan y Diego\nPagando con tarjetas Banco de Chile.")
+    b = offer('itau-1', "40% de descuento en Pedro, Juan y Diego", "Pedro, Juan y Diego", 40,
+              "Descuento exclusivo en Pedro, Juan y Diego")
+    groups = grouper(tmp_path)
+    assert groups.assign([a], 'banco-chile') == 0
+    assert groups.assign([b], 'banco-itau') == 1
+    assert a.offerGroupId == b.offerGroupId
+
+
+def test_different_discount_or_store_opens_a_new_group(tmp_path):
+    base = offer('bch-1', "40% Dcto en Salcobrand", "Salcobrand", 40)
+    other_discount = offer('itau-1', "25% Dcto en Salcobrand", "Salcobrand", 25)
+    other_store = offer('itau-2', "40% Dcto en Cruz Verde", "Cruz Verde", 40)
+    groups = grouper(tmp_path)
+    groups.assign([base, other_discount, other_store], 'test')
+    assert len({base.offerGroupId, other_discount.offerGroupId, other_store.offerGroupId}) == 3
+
+
+def test_group_ids_are_stable_across_a_reload(tmp_path):
+    first = grouper(tmp_path)
+    a = offer('bch-1', "30% Dcto en Fork", "Fork", 30)
+    first.assign([a], 'banco-chile')
+    first.save()
+
+    b = offer('itau-1', "30% dcto. en Fork", "Fork", 30)
+    grouper(tmp_path).assign([b], 'banco-itau')
+    assert b.offerGroupId == a.offerGroupId
+
+
+def test_signature_estimates_jaccard_similarity():
+    a = offer('a', "20% Dcto en Jumbo todos los martes", "Jumbo", 20)
+    assert similarity(signature(shingles(a)), signature(shingles(a))) == 1.0
+    b = offer('b', "Cuotas sin interés en Ripley", "Ripley", 20)
+    assert similarity(signature(shingles(a)), signature(shingles(b))) < 0.3
+
+
+def test_same_store_offers_with_different_products_stay_apart(tmp_path):
+    meat = offer('bch-1', "20% Dcto en carnes Jumbo", "Jumbo", 20)
+    electro = offer('itau-1', "20% Dcto en electro Jumbo", "Jumbo", 20)
+    assert similarity(signature(shingles(meat)), signature(shingles(electro))) < DEDUP_THRESHOLD
+    groups = grouper(tmp_path)
+    groups.assign([meat], 'banco-chile')
+    assert groups.assign([electro], 'banco-itau') == 0
+    assert meat.offerGroupId != electro.offerGroupId
+
+
+def test_a_bank_never_has_two_offers_in_one_group(tmp_path):
+    a = offer('bch-1', "30% Dcto en Fork", "Fork", 30)
+    b = offer('bch-2', "30% dcto. en Fork", "Fork", 30)
+    groups = grouper(tmp_path)
+    assert groups.assign([a, b], 'banco-chile') == 0
+    assert a.offerGroupId != b.offerGroupId
+
+
+def test_staying_in_its_own_group_is_not_joining(tmp_path):
+    a = offer('bch-1', "30% Dcto en Fork", "Fork", 30)
+    groups = grouper(tmp_path)
+    groups.assign([a], 'banco-chile')
+    groups.save()
+    first = a.offerGroupId
+
+    again = grouper(tmp_path)
+    assert again.assign([a], 'banco-chile') == 0
+    assert a.offerGroupId == first
+
+    b = offer('itau-1', "30% dcto. en Fork", "Fork", 30)
+    assert again.assign([b], 'banco-itau') == 1
+    assert again.assign([a], 'banco-chile') == 1
+    assert a.offerGroupId == b.offerGroupId == first
+
+
+def test_an_offer_that_changed_leaves_its_group(tmp_path):
+    a = offer('bch-1', "30% Dcto en Fork", "Fork", 30)
+    b = offer('itau-1', "30% dcto. en Fork", "Fork", 30)
+    groups = grouper(tmp_path)
+    groups.assign([a], 'banco-chile')
+    groups.assign([b], 'banco-itau')
+
+    changed = offer('bch-1', "30% Dcto en zapatillas Bata", "Bata", 30)
+    groups.assign([changed], 'banco-chile')
+    assert changed.offerGroupId != b.offerGroupId
+    # Its old place is free for another Banco de Chile offer of the promotion
+    c = offer('bch-9', "30% Dcto en Fork", "Fork", 30)
+    assert groups.assign([c], 'banco-chile') == 1
+    assert c.offerGroupId == b.offerGroupId
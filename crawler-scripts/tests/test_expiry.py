@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from conftest import ListScraper, card
+from scrapers.banco_chile import BancoChileScraper
+from scrapers.expiry import sweep_collection, sweep_local
+
+NOW = datetime(2026, 3, 10, 12, 0)
+
+
+def offers_seen(hours_ago):
+    """One offer per case the sweep tells apart, all of source `test-bank` unless noted."""
+    seen = lambda hours: NOW - timedelta(hours=hours)  # noqa: E731
+    return [
+        {'source': 'test-bank', 'externalId': 'vanished', 'active': True, 'crawlGeneration': 'g1',
+         'lastSeenAt': seen(hours_ago)},
+        {'source': 'test-bank', 'externalId': 'recent', 'active': True, 'crawlGeneration': 'g1',
+         'lastSeenAt': seen(1)},
+        {'source': 'test-bank', 'externalId': 'current', 'active': True, 'crawlGeneration': 'g2',
+         'lastSeenAt': seen(hours_ago)},
+        {'source': 'other-bank', 'externalId': 'other', 'active': True, 'crawlGeneration': 'g1',
+         'lastSeenAt': seen(hours_ago)},
+    ]
+
+
+def as_local(records):
+    return [{**r, 'lastSeenAt': r['lastSeenAt'].isoformat()} for r in records]
+
+
+def active(records):
+    return {r['externalId'] for r in records if r.get('active', True)}
+
+
+def test_local_sweep_waits_for_the_grace_period(store):
+    store.upsert(as_local(offers_seen(hours_ago=49)))
+    assert sweep_local(store, 'test-bank', 'g2', NOW, grace_hours=48) == 1
+    assert active(store.records()) == {'recent', 'current', 'other'}
+    assert store.get('test-bank', 'vanished')['deactivatedAt'] == NOW.isoformat()
+
+
+def test_local_sweep_leaves_offers_inside_the_grace_period(store):
+    store.upsert(as_local(offers_seen(hours_ago=47)))
+    assert sweep_local(store, 'test-bank', 'g2', NOW, grace_hours=48) == 0
+    assert active(store.records()) == {'vanished', 'recent', 'current', 'other'}
+
+
+def test_local_records_from_before_generations_start_their_grace_period(store):
+    store.upsert([{'source': 'test-bank', 'externalId': 'legacy', 'active': True}])
+    assert sweep_local(store, 'test-bank', 'g2', NOW) == 0
+    assert store.get('test-bank', 'legacy')['lastSeenAt'] == NOW.isoformat()
+
+
+def test_collection_sweep_waits_for_the_grace_period(mongo):
+    mongo.discounts.insert_many(offers_seen(hours_ago=49) + [
+        {'source': 'test-bank', 'externalId': 'legacy-old', 'active': True, 'updatedAt': NOW - timedelta(hours=49)},
+        {'source': 'test-bank', 'externalId': 'legacy-new', 'active': True, 'updatedAt': NOW - timedelta(hours=1)},
+    ])
+    assert sweep_collection(mongo.discounts, 'test-bank', 'g2', NOW, grace_hours=48) == 2
+    assert active(mongo.discounts.find()) == {'recent', 'current', 'other', 'legacy-new'}
+
+
+def vanished_offer(store):
+    store.upsert([{'source': 'test-bank', 'externalId': 'vanished', 'active': True, 'crawlGeneration': 'old',
+                   'lastSeenAt': (datetime.now() - timedelta(days=3)).isoformat()}])
+
+
+def test_a_complete_run_deactivates_what_it_no_longer_lists(store):
+    vanished_offer(store)
+    scraper = ListScraper([card('a')])
+    scraper.run()
+    assert store.get('test-bank', 'vanished')['active'] is False
+    assert store.get('test-bank', 'a')['crawlGeneration'] == scraper.generation
+
+
+class FallbackScraper(ListScraper):
+    def fetch(self):
+        self.metrics.used_fallback = True
+        yield from self.cards
+
+
+class PartialScraper(ListScraper):
+    def fetch(self):
+        yield from self.cards
+        self.metrics.partial = True
+
+
+def test_fallback_partial_and_empty_runs_deactivate_nothing(store):
+    vanished_offer(store)
+    for scraper in (FallbackScraper([card('a')]), PartialScraper([card('a')]), ListScraper([])):
+        scraper.run()
+        assert store.get('test-bank', 'vanished')['active'] is True
+
+
+def test_bank_fetch_that_fails_midway_is_partial(store, monkeypatch):
+    def listing():
+        yield card('bch-1')
+        raise RuntimeError("page 2 failed")
+
+    scraper = BancoChileScraper()
+    monkeypatch.setattr(scraper, 'fetch_listing', listing)
+    assert [item.externalId for item in scraper.fetch()] == ['bch-1']
+    assert scraper.metrics.partial and not scraper.metrics.used_fallback
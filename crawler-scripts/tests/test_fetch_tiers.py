@@ -0,0 +1,80 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import ListScraper
+from scrapers.extraction import CardSelectors, Pagination
+from scrapers.records import RawCard
+
+PAGES = {
+    '/ofertas': ('<a class="oferta" href="/o/1">20% Dcto en Uno</a>'
+                 '<a class="oferta" href="/o/2">25% Dcto en Dos</a><a class="next" href="/ofertas?p=2">Siguiente</a>'),
+    '/ofertas?p=2': '<a class="oferta" href="/o/3">30% Dcto en Tres</a><a class="next" href="/ofertas?p=3">Siguiente</a>',
+    '/ofertas?p=3': '<a class="oferta" href="/o/4">35% Dcto en Cuatro</a>',
+}
+
+
+class Listing(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = PAGES.get(self.path)
+        if body is None:
+            self.send_response(500)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(f"<html><body>{body}</body></html>".encode('utf-8'))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Listing)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+class ListingScraper(ListScraper):
+    card_selectors = CardSelectors(card='a.oferta', title=None)
+    id_prefix = 'lst'
+
+    def __init__(self, url, pagination):
+        super().__init__()
+        self.url = url
+        self.pagination = pagination
+        self.browser_used = False
+
+    def fetch(self):
+        return self.fetch_listing()
+
+    def stream_in_browser(self, scrape):
+        self.browser_used = True
+        return iter([RawCard(externalId='browser-1', title="10% Dcto en Navegador", store_name="Navegador",
+                             url=self.url)])
+
+
+def test_next_links_are_followed_over_http(site):
+    scraper = ListingScraper(f"{site}/ofertas", Pagination("next", selector='a.next'))
+    items = list(scraper.fetch())
+    assert [item.raw_text for item in items] == [
+        "20% Dcto en Uno", "25% Dcto en Dos", "30% Dcto en Tres", "35% Dcto en Cuatro"]
+    assert not scraper.browser_used and not scraper.metrics.partial
+
+
+def test_a_failing_later_page_makes_the_fetch_partial(site, monkeypatch):
+    monkeypatch.delitem(PAGES, '/ofertas?p=3')
+    scraper = ListingScraper(f"{site}/ofertas", Pagination("next", selector='a.next'))
+    assert len(list(scraper.fetch())) == 3
+    assert scraper.metrics.partial
+
+
+@pytest.mark.parametrize('mode', ['load_more', 'scroll'])
+def test_javascript_pagination_goes_to_the_browser(site, mode):
+    scraper = ListingScraper(f"{site}/ofertas", Pagination(mode, selector='button.more'))
+    assert [item.externalId for item in scraper.fetch()] == ['browser-1']
+    assert scraper.browser_used and scraper.fetch_stats['tier'] == 'browser'
@@ -0,0 +1,47 @@
+from conftest import ListScraper, card
+from scrapers.fingerprint import stable_id
+
+LISTING = "https://portales.bancochile.cl/personas/beneficios"
+CATEGORY = "https://portales.bancochile.cl/personas/beneficios/sabores"
+
+
+def test_cards_sharing_a_category_link_get_different_ids():
+    first = stable_id('bch', CATEGORY, "40% Dcto en Pedro, Juan y Diego", "Pedro, Juan y Diego", LISTING)
+    second = stable_id('bch', CATEGORY, "25% Dcto en Tanta", "Tanta", LISTING)
+    assert first != second
+
+
+def test_ids_ignore_case_accents_whitespace_and_tracking_params():
+    assert stable_id('bch', CATEGORY + "?utm_source=x#top", "40% Dcto en  Café Altura", "Café Altura", LISTING) == \
+        stable_id('bch', CATEGORY, "40% dcto en cafe altura", "CAFE ALTURA", LISTING)
+
+
+def test_a_link_back_to_the_listing_does_not_count():
+    assert stable_id('bch', LISTING + "/", "Oferta", "Tienda", LISTING) == \
+        stable_id('bch', None, "Oferta", "Tienda", LISTING)
+
+
+def test_offers_on_different_pages_get_different_ids():
+    assert stable_id('bch', LISTING + "/a", "Oferta", "Tienda", LISTING) != \
+        stable_id('bch', LISTING + "/b", "Oferta", "Tienda", LISTING)
+
+
+def test_save_keeps_both_offers_sharing_a_category_link(mongo):
+    ids = [stable_id('bch', CATEGORY, title, store, LISTING)
+           for title, store in (("40% Dcto en Fork", "Fork"), ("25% Dcto en Tanta", "Tanta"))]
+    scraper = ListScraper([card(ids[0], store="Fork", url=CATEGORY), card(ids[1], store="Tanta", url=CATEGORY)])
+    scraper.run()
+    assert mongo['discounts'].count_documents({}) == 2
+
+
+def test_save_drops_duplicate_ids_instead_of_overwriting(mongo):
+    scraper = ListScraper([card('dup', title="40% Dcto en Fork"), card('dup', title="25% Dcto en Tanta")])
+    scraper.run()
+    assert [d['title'] for d in mongo['discounts'].find()] == ["40% Dcto en Fork"]
+
+
+def test_duplicates_across_batches_are_dropped_too(store):
+    scraper = ListScraper()
+    scraper.save(scraper.parse([card('a', title="Primera")]))
+    scraper.save(scraper.parse([card('a', title="Segunda")]))
+    assert store.get('test-bank', 'a')['title'] == "Primera"
@@ -0,0 +1,79 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import gazetteer as gazetteer_module
+from gazetteer import Gazetteer, name_key
+
+STORES = {
+    'farmacias-ahumada': {'aliases': ['farmacias ahumada', 'ahumada'],
+                          'branches': [{'name': 'Ahumada Centro', 'commune': 'Santiago', 'lat': -33.44, 'lng': -70.65},
+                                       {'name': 'Ahumada Providencia', 'commune': 'Providencia',
+                                        'lat': -33.42, 'lng': -70.61}]},
+    'ahumada-express': {'aliases': ['ahumada express'],
+                        'branches': [{'name': 'Express Las Condes', 'commune': 'Las Condes',
+                                      'lat': -33.41, 'lng': -70.57}]},
+    'rappi': {'aliases': ['rappi'], 'branches': []},
+}
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    dataset = tmp_path / 'store_locations.json'
+    dataset.write_text(json.dumps({'stores': STORES}), encoding='utf-8')
+    return Gazetteer(str(dataset), str(tmp_path / 'geocodes.json'))
+
+
+def test_name_key_drops_case_accents_and_punctuation():
+    assert name_key("Farmacias  Ahumada, Ñuñoa!") == 'farmacias ahumada nunoa'
+    assert name_key(None) == ''
+
+
+def test_a_known_slug_gets_all_its_branches(gazetteer):
+    assert [b['name'] for b in gazetteer.branches('farmacias-ahumada')] == ['Ahumada Centro', 'Ahumada Providencia']
+    assert gazetteer.locate('farmacias-ahumada') == (-33.44, -70.65)
+
+
+def test_an_unknown_slug_resolves_through_the_longest_alias_in_its_name(gazetteer):
+    assert gazetteer.locate('ahumada-express-lo-barnechea', "Ahumada Express Lo Barnechea") == (-33.41, -70.57)
+    assert gazetteer.locate('farmacia-ahumada-mall', "Farmacias Ahumada (Mall Plaza)") == (-33.44, -70.65)
+
+
+def test_online_only_and_unknown_stores_have_no_location(gazetteer):
+    assert gazetteer.branches('rappi') == []
+    assert gazetteer.locate('tienda-sin-datos', "Tienda Sin Datos") is None
+
+
+def test_resolutions_are_cached_across_instances(gazetteer, tmp_path):
+    gazetteer.locate('ahumada-express-centro', "Ahumada Express Centro")
+    gazetteer.locate('tienda-sin-datos', "Tienda Sin Datos")
+    assert gazetteer.save() and not gazetteer.save()
+
+    cached = json.loads((tmp_path / 'geocodes.json').read_text(encoding='utf-8'))
+    assert cached['ahumada express centro']['store'] == 'ahumada-express'
+    assert cached['tienda sin datos']['store'] is None
+
+    reloaded = Gazetteer(str(tmp_path / 'store_locations.json'), str(tmp_path / 'geocodes.json'))
+    reloaded._aliases = []
+    assert reloaded.locate('ahumada-express-centro', "Ahumada Express Centro") == (-33.41, -70.57)
+
+
+def test_a_miss_is_looked_up_again_once_it_expires(gazetteer, monkeypatch):
+    lookups = []
+    monkeypatch.setattr(gazetteer, '_geocode', lambda query: lookups.append(query) or None)
+    gazetteer.locate('tienda-sin-datos', "Tienda Sin Datos")
+    gazetteer.locate('tienda-sin-datos', "Tienda Sin Datos")
+    assert lookups == ["Tienda Sin Datos"]
+
+    stale = datetime.now() - timedelta(days=gazetteer_module.GEOCODE_MISS_TTL_DAYS + 1)
+    gazetteer._cache['tienda sin datos']['resolvedAt'] = stale.isoformat(timespec='seconds')
+    gazetteer.locate('tienda-sin-datos', "Tienda Sin Datos")
+    assert lookups == ["Tienda Sin Datos", "Tienda Sin Datos"]
+
+
+def test_a_geocoded_store_has_one_unnamed_branch(gazetteer, monkeypatch):
+    monkeypatch.setattr(gazetteer, '_geocode',
+                        lambda query: {'store': None, 'source': 'geocoder', 'lat': -33.5, 'lng': -70.7})
+    assert gazetteer.branches('tienda-nueva', "Tienda Nueva") == [
+        {'name': None, 'commune': None, 'lat': -33.5, 'lng': -70.7}]
@@ -0,0 +1,117 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import link_checker
+from link_checker import LinkChecker, verify_discounts
+
+# path: (status to HEAD, status to GET, Location)
+ROUTES = {
+    '/ok': (200, 200, None),
+    '/no-head': (405, 200, None),
+    '/moved': (301, 301, '/ok'),
+    '/moved-away': (302, 302, '/gone'),
+    '/missing': (404, 404, None),
+    '/gone': (410, 410, None),
+    '/forbidden': (403, 403, None),
+}
+SLOW_PATH = '/slow'
+
+
+class Site(BaseHTTPRequestHandler):
+    requests = []
+
+    def _answer(self, method):
+        Site.requests.append((method, self.path))
+        if self.path == SLOW_PATH:
+            time.sleep(0.5)
+            status, location = 200, None
+        else:
+            head, get, location = ROUTES.get(self.path, (404, 404, None))
+            status = head if method == 'HEAD' else get
+        self.send_response(status)
+        if location:
+            self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._answer('HEAD')
+
+    def do_GET(self):
+        self._answer('GET')
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    Site.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Site)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def checker(**options):
+    return LinkChecker(rate=0, cache_file=None, **options)
+
+
+def test_a_live_url_is_checked_with_head_only(site):
+    result = checker().check(f"{site}/ok")
+    assert result['alive'] and result['status'] == 200
+    assert Site.requests == [('HEAD', '/ok')]
+
+
+def test_head_not_allowed_falls_back_to_get(site):
+    result = checker().check(f"{site}/no-head")
+    assert result['alive'] and result['status'] == 200
+    assert Site.requests == [('HEAD', '/no-head'), ('GET', '/no-head')]
+
+
+def test_redirects_are_followed_to_the_final_answer(site):
+    live, dead = checker().check(f"{site}/moved"), checker().check(f"{site}/moved-away")
+    assert live['alive'] and live['status'] == 200
+    assert not dead['alive'] and dead['status'] == 410
+
+
+@pytest.mark.parametrize('path, status', [('/missing', 404), ('/gone', 410), ('/forbidden', 403)])
+def test_error_answers_to_head_are_dead_without_a_get(site, path, status):
+    result = checker().check(f"{site}{path}")
+    assert not result['alive'] and result['status'] == status
+    assert Site.requests == [('HEAD', path)]
+
+
+def test_a_timeout_is_dead_with_an_error(site):
+    result = checker(timeout=0.1).check(f"{site}{SLOW_PATH}")
+    assert not result['alive'] and result['status'] is None and result['error']
+
+
+def test_check_all_requests_each_distinct_url_once(site):
+    urls = [f"{site}/ok", f"{site}/gone", f"{site}/ok"]
+    results, checked = checker().check_all(urls)
+    assert checked == 2
+    assert {url: result['alive'] for url, result in results.items()} == {f"{site}/ok": True, f"{site}/gone": False}
+
+
+def test_results_are_written_back_in_batches(site, mongo, monkeypatch):
+    monkeypatch.setattr(link_checker, 'LINK_CHECK_BATCH_SIZE', 2)
+    paths = ['/ok', '/no-head', '/moved', '/missing', '/gone']
+    mongo['discounts'].insert_many([{'externalId': str(i), 'active': True, 'url': f"{site}{path}"}
+                                    for i, path in enumerate(paths)])
+    writes = []
+    bulk_write = mongo['discounts'].bulk_write
+    monkeypatch.setattr(mongo['discounts'], 'bulk_write',
+                        lambda operations, **kwargs: writes.append(len(operations)) or bulk_write(operations, **kwargs),
+                        raising=False)
+
+    alive, dead = verify_discounts(mongo, checker())
+
+    assert (alive, dead) == (3, 2)
+    # 3 alive URLs in batches of 2, plus 2 dead ones
+    assert writes == [3]
+    verified = {doc['url'].removeprefix(site): doc['verified'] for doc in mongo['discounts'].find()}
+    assert verified == {'/ok': True, '/no-head': True, '/moved': True, '/missing': False, '/gone': False}
@@ -0,0 +1,84 @@
+import json
+import os
+import time
+
+from local_store import LocalStore
+
+
+def new_store(tmp_path):
+    return LocalStore(str(tmp_path / 'discounts.jsonl'), str(tmp_path / 'discounts.json'),
+                      archive_path=str(tmp_path / 'discounts_archive.jsonl'))
+
+
+def backend_edit(path, external_id, **fields):
+    """What backend/app.js does: rewrite the snapshot in place."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    for record in data:
+        if record['externalId'] == external_id:
+            record.update(fields)
+    time.sleep(0.01)  # a distinct mtime even on coarse filesystems
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def test_backend_edits_survive_a_long_lived_store(tmp_path):
+    store = new_store(tmp_path)
+    store.upsert([{'source': 's', 'externalId': 'a', 'title': 'A'}, {'source': 's', 'externalId': 'b', 'title': 'B'}])
+    store.export_snapshot()
+
+    backend_edit(store.snapshot_path, 'a', clicks=5, verified=True)
+    store.upsert([{'source': 's', 'externalId': 'b', 'title': 'B2'}])
+    store.export_snapshot()
+
+    with open(store.snapshot_path, 'r', encoding='utf-8') as f:
+        exported = {r['externalId']: r for r in json.load(f)}
+    assert exported['a']['clicks'] == 5 and exported['a']['verified'] is True
+    assert exported['b']['title'] == 'B2'
+
+
+def test_crawler_changes_not_yet_exported_are_kept(tmp_path):
+    store = new_store(tmp_path)
+    store.upsert([{'source': 's', 'externalId': 'a', 'title': 'A'}])
+    store.export_snapshot()
+    store.upsert([{'source': 's', 'externalId': 'a', 'title': 'A2'}])
+
+    backend_edit(store.snapshot_path, 'a', likes=3)
+    store.export_snapshot()
+    assert store.get('s', 'a')['title'] == 'A2'
+    assert store.get('s', 'a')['likes'] == 3
+
+
+def test_a_restart_reads_the_log_back(tmp_path):
+    store = new_store(tmp_path)
+    store.upsert([{'source': 's', 'externalId': 'a', 'title': 'A'}])
+    store.export_snapshot()
+    store.upsert([{'source': 's', 'externalId': 'a', 'title': 'A2'}])
+
+    assert new_store(tmp_path).get('s', 'a')['title'] == 'A2'
+
+
+def test_archived_records_leave_the_store_for_good(tmp_path):
+    store = new_store(tmp_path)
+    store.upsert([{'source': 's', 'externalId': 'a'}, {'source': 's', 'externalId': 'b'}])
+    assert store.archive([('s', 'a'), ('s', 'missing')]) == 1
+    assert new_store(tmp_path).get('s', 'a') is None
+    assert os.path.getsize(store.archive_path) > 0
+
+
+def test_a_reload_keeps_logged_records_not_yet_exported(tmp_path):
+    store = new_store(tmp_path)
+    store.upsert([{'source': 's', 'externalId': 'a', 'title': 'A'}])
+    store.export_snapshot()
+    store.upsert([{'source': 's', 'externalId': 'b', 'title': 'B'}])
+
+    backend_edit(store.snapshot_path, 'a', clicks=2)
+    reloaded = new_store(tmp_path)
+    assert sorted(r['externalId'] for r in reloaded.records()) == ['a', 'b']
+    assert reloaded.get('s', 'a')['clicks'] == 2
+
+
+def test_a_snapshot_without_a_log_is_loaded_whole(tmp_path):
+    with open(tmp_path / 'discounts.json', 'w', encoding='utf-8') as f:
+        json.dump([{'source': 's', 'externalId': 'a', 'title': 'A', 'likes': 1}], f)
+    assert new_store(tmp_path).get('s', 'a')['likes'] == 1
@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+
+main = pytest.importorskip('main')
+
+from conftest import ListScraper  # noqa: E402
+
+
+class SlowToStopScraper(ListScraper):
+    """A scraper that overruns its budget and stops `grace` seconds after being cancelled."""
+
+    def __init__(self, grace):
+        super().__init__(source_name='slow-bank')
+        self.grace = grace
+        self.stopped = threading.Event()
+
+    def run(self):
+        self.cancel_event.wait(5)
+        threading.Event().wait(self.grace)
+        self.stopped.set()
+
+
+def test_a_cancelled_source_is_waited_for_before_the_clients_close():
+    scraper = SlowToStopScraper(grace=0.1)
+    results = [main.run_source(scraper, 0.05)]
+    assert results[0]['status'] == 'timeout' and not scraper.stopped.is_set()
+
+    main.drain_workers(results, 5)
+    assert scraper.stopped.is_set() and 'worker' not in results[0]
+
+
+def test_the_wait_for_cancelled_sources_is_bounded():
+    scraper = SlowToStopScraper(grace=5)
+    results = [main.run_source(scraper, 0.05)]
+    main.drain_workers(results, 0.1)
+    assert not scraper.stopped.is_set()
@@ -0,0 +1,87 @@
+import asyncio
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from conftest import ListScraper
+from scrapers.extraction import CardSelectors, Pagination
+from scrapers.network_capture import find_offer_lists, load_endpoints
+
+API = "https://banco.example/api/beneficios"
+
+
+class FakeResponse:
+    def __init__(self, url, payload):
+        self.url = url
+        self.headers = {'content-type': 'application/json'}
+        self.request = type('Request', (), {'method': 'GET', 'post_data': None, 'headers': {}})()
+        self._payload = payload
+
+    async def json(self):
+        return self._payload
+
+
+class ScrollingPage:
+    """
+    A listing that loads one more page of offers from its API on every
+    scroll to the bottom, rendering a card per offer.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.loaded = 0
+        self.listeners = []
+
+    def on(self, event, callback):
+        self.listeners.append(callback)
+
+    def _load_next(self):
+        page = self.pages[self.loaded]
+        self.loaded += 1
+        for callback in self.listeners:
+            callback(FakeResponse(f"{API}?page={self.loaded}", {'data': page}))
+
+    def cards(self):
+        return [{'title': offer['title'], 'text': offer['title'], 'image': None, 'link': None}
+                for page in self.pages[:self.loaded] for offer in page]
+
+    async def goto(self, url, **kwargs):
+        self._load_next()
+
+    async def wait_for_selector(self, selector, **kwargs):
+        return object()
+
+    async def evaluate(self, script, arg=None):
+        if isinstance(arg, dict):
+            return self.cards()[arg['offset']:]
+        if self.loaded < len(self.pages):
+            self._load_next()
+
+    async def wait_for_function(self, script, arg=None, timeout=None):
+        if len(self.cards()) <= arg[1]:
+            raise PlaywrightTimeoutError("no more cards")
+
+
+class ApiScraper(ListScraper):
+    url = "https://banco.example/beneficios"
+    card_selectors = CardSelectors(card='.card')
+    pagination = Pagination("scroll", wait_ms=10)
+    api_patterns = (r"/api/",)
+    id_prefix = 'api'
+
+
+def test_api_responses_of_every_page_are_captured_and_remembered():
+    pages = [[{'id': f"{n}-{i}", 'title': f"{n}0% Dcto en Tienda {n}{i}"} for i in range(2)] for n in (1, 2, 3)]
+    scraper = ApiScraper()
+    emitted = []
+
+    async def emit(items):
+        emitted.extend(items)
+
+    asyncio.run(scraper.scrape_listing(ScrollingPage(pages), emit))
+    assert len(emitted) == 6
+    assert [e['url'] for e in load_endpoints('test-bank')] == [f"{API}?page={n}" for n in (1, 2, 3)]
+
+
+def test_offers_are_found_however_deep_they_are_nested():
+    payload = {'ok': True, 'result': {'items': [{'titulo': "20% Dcto"}, {'titulo': "30% Dcto"}], 'meta': [{'x': 1}]}}
+    assert [offer['titulo'] for offer in find_offer_lists(payload)] == ["20% Dcto", "30% Dcto"]
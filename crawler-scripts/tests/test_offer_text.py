@@ -0,0 +1,114 @@
+from datetime import date, datetime
+
+import pytest
+
+from conftest import ListScraper
+from scrapers.offer_text import parse_offer_text
+
+TODAY = date(2026, 10, 18)
+
+
+def parse(title, raw_text=None, today=TODAY):
+    return parse_offer_text(title, raw_text, today=today)
+
+
+@pytest.mark.parametrize('title, percentage', [
+    ("40% Dcto en Starbucks", 40),
+    ("Hasta 30% dcto con tope de $10.000", 30),
+    ("12,5% dcto en Lider", 12.5),
+    ("7.5 % off", 7.5),
+    ("Compras sobre $20.000 obtén 15% dcto", 15),
+    ("2x1 en Cinemark", 0),
+    ("", 0),
+])
+def test_percentage(title, percentage):
+    assert parse(title)['discountPercentage'] == percentage
+
+
+@pytest.mark.parametrize('title, amount, currency', [
+    ("$150 de descuento por litro en Shell", 150, 'CLP'),
+    ("$5.000 de descuento en Rappi", 5000, 'CLP'),
+    ("US$ 20 de descuento", 20, 'USD'),
+    # Amounts next to a percentage are caps and minimums, not the discount
+    ("Hasta 30% dcto con tope de $10.000", None, 'CLP'),
+    ("Compras sobre $20.000 obtén 15% dcto", None, 'CLP'),
+])
+def test_amount(title, amount, currency):
+    fields = parse(title)
+    assert (fields['discountAmount'], fields['currency']) == (amount, currency)
+
+
+@pytest.mark.parametrize('title, weekdays', [
+    ("20% de lunes a jueves", ['monday', 'tuesday', 'wednesday', 'thursday']),
+    ("10% todos los martes y jueves", ['tuesday', 'thursday']),
+    ("Descuento fines de semana 15%", ['saturday', 'sunday']),
+    ("Sábados y domingos 2x1", ['saturday', 'sunday']),
+    # A range across the weekend wraps around
+    ("15% de viernes a lunes", ['monday', 'friday', 'saturday', 'sunday']),
+    ("30% en Jumbo", []),
+])
+def test_weekdays(title, weekdays):
+    assert parse(title)['weekdays'] == weekdays
+
+
+@pytest.mark.parametrize('text, valid_from, valid_until', [
+    ("20% hasta el 5 de marzo de 2027", None, datetime(2027, 3, 5)),
+    ("Válido hasta el 01/02/27", None, datetime(2027, 2, 1)),
+    ("Válido hasta el 31/12", None, datetime(2026, 12, 31)),
+    # Read in October, January means next year
+    ("del 1 al 15 de enero", datetime(2027, 1, 1), datetime(2027, 1, 15)),
+    ("Desde el 1 de noviembre 10%", datetime(2026, 11, 1), None),
+    ("Atención 24/7, 20% dcto", None, None),
+])
+def test_validity(text, valid_from, valid_until):
+    fields = parse(text)
+    assert (fields['validFrom'], fields['validUntil']) == (valid_from, valid_until)
+
+
+def test_validity_range_across_new_year():
+    fields = parse("del 20 de diciembre al 10 de enero de 2027")
+    assert (fields['validFrom'], fields['validUntil']) == (datetime(2026, 12, 20), datetime(2027, 1, 10))
+
+
+def test_range_from_february_29th_into_the_next_year():
+    # Read in a leap year the start lands on February 29th, a year too late
+    fields = parse("del 29 de febrero al 1 de enero", today=date(2028, 1, 10))
+    assert (fields['validFrom'], fields['validUntil']) == (datetime(2027, 2, 28), datetime(2028, 1, 1))
+
+
+def test_installments():
+    assert parse("6 cuotas sin interés en Falabella")['installments'] == 6
+    assert parse("20% en Falabella")['installments'] is None
+
+
+def test_title_wins_and_raw_text_fills_the_gaps():
+    fields = parse("40% en Fork", "Fork: 25% dcto los domingos, hasta el 30 de noviembre")
+    assert fields['discountPercentage'] == 40
+    assert fields['weekdays'] == ['sunday']
+    assert fields['validUntil'] == datetime(2026, 11, 30)
+
+
+def test_results_are_not_shared_between_calls():
+    first = parse("20% de lunes a jueves")
+    first['weekdays'].append('sunday')
+    assert parse("20% de lunes a jueves")['weekdays'] == ['monday', 'tuesday', 'wednesday', 'thursday']
+
+
+def listing():
+    scraper = ListScraper()
+    scraper.url, scraper.id_prefix = "https://banco.example/beneficios", 'bnc'
+    return scraper
+
+
+@pytest.mark.parametrize('text', [
+    "20% dcto en Lider",
+    "$150 de descuento por litro en Shell",
+    "6 cuotas sin interés en Falabella",
+    "Descuento exclusivo en Ripley",
+])
+def test_listing_cards_with_any_kind_of_offer_are_kept(text):
+    assert len(listing().cards_to_items([{'title': text, 'text': text, 'link': "https://banco.example/o/1"}])) == 1
+
+
+def test_listing_cards_without_an_offer_are_dropped():
+    assert listing().cards_to_items([{'title': "Ver todos los beneficios", 'text': "Ver todos"}]) == []
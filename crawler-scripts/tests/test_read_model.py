@@ -0,0 +1,47 @@
+import local_store
+from conftest import ListScraper, card
+from read_model import build_read_model, read_records
+
+
+def test_local_records_are_newest_first(store, monkeypatch):
+    monkeypatch.setattr(local_store, 'get_local_store', lambda: store)
+    ListScraper([card('old')]).run()
+    ListScraper([card('old'), card('new')]).run()
+
+    records = read_records()
+    assert [r['externalId'] for r in records] == ['new', 'old']
+    assert all(r['createdAt'] for r in records)
+
+
+def test_an_update_keeps_the_creation_time(store):
+    ListScraper([card('a', title="20% Dcto en Tienda")]).run()
+    created = store.get('test-bank', 'a')['createdAt']
+    ListScraper([card('a', title="30% Dcto en Tienda")]).run()
+    assert store.get('test-bank', 'a')['createdAt'] == created
+    assert store.get('test-bank', 'a')['title'] == "30% Dcto en Tienda"
+
+
+def test_buckets_by_bank_and_category():
+    records = [{'_id': 'a', 'paymentMethod': "Banco Itaú", 'store': {'categories': ["Comida rápida"]}, 'contentHash': 'x'}]
+    buckets = build_read_model(records)
+    assert set(buckets) == {'all', 'bank/banco-itau', 'category/comida-rapida'}
+    assert 'contentHash' not in buckets['all'][0]
+
+
+def test_mongo_offers_get_their_bank_bucket(mongo):
+    ListScraper([card('a'), card('b', store='Otra Tienda')]).run()
+    ListScraper([card('c')], source_name='other-bank').run()
+
+    assert [m['name'] for m in mongo.paymentmethods.find()] == ["Banco Test"]
+    records = read_records(mongo)
+    assert {r['paymentMethod'] for r in records} == {"Banco Test"}
+    assert all(r['paymentMethods'][0]['slug'] == 'banco-test' for r in records)
+    buckets = build_read_model(records)
+    assert len(buckets['bank/banco-test']) == 3
+
+
+def test_offers_saved_without_a_payment_method_are_rewritten(mongo):
+    ListScraper([card('a')]).run()
+    mongo.discounts.update_many({}, {'$unset': {'paymentMethod': '', 'paymentMethods': ''}})
+    ListScraper([card('a')]).run()
+    assert mongo.discounts.find_one()['paymentMethod'] == "Banco Test"
@@ -0,0 +1,72 @@
+import json
+import random
+
+import pytest
+
+from spatial_index import SpatialIndex, build_map_index, geohash_bounds, geohash_encode
+
+
+def test_known_geohash():
+    assert geohash_encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert geohash_bounds('ezs42')[:2] == pytest.approx((42.5830078125, -5.625))
+
+
+@pytest.mark.parametrize('precision', [1, 5, 9])
+def test_a_point_round_trips_into_its_cell(precision):
+    rng = random.Random(precision)
+    for _ in range(500):
+        lat, lng = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        code = geohash_encode(lat, lng, precision)
+        south, west, north, east = geohash_bounds(code)
+        assert south <= lat <= north and west <= lng <= east
+        # The centre of the cell encodes back to the same cell, and a longer code is nested in it
+        assert geohash_encode((south + north) / 2, (west + east) / 2, precision) == code
+        assert geohash_encode(lat, lng, precision + 2).startswith(code)
+
+
+def test_cell_size_halves_per_bit():
+    south, west, north, east = geohash_bounds(geohash_encode(-33.44, -70.65, 5))
+    assert north - south == pytest.approx(180 / 2 ** 12)
+    assert east - west == pytest.approx(360 / 2 ** 13)
+
+
+class Branches:
+    def __init__(self, stores):
+        self.stores = stores
+
+    def branches(self, slug, name=None):
+        return self.stores.get(slug, [])
+
+
+def test_offers_are_placed_at_every_branch_of_their_store(tmp_path):
+    gazetteer = Branches({'cafe': [{'name': 'Centro', 'lat': -33.44, 'lng': -70.65},
+                                   {'name': 'Costa', 'lat': -33.02, 'lng': -71.55}]})
+    records = [
+        {'_id': '1', 'title': "20% Dcto", 'store': {'slug': 'cafe', 'name': "Café"}},
+        {'_id': '2', 'title': "Own point", 'store': {'slug': 'otra'}, 'latitude': -33.45, 'longitude': -70.66},
+        {'_id': '3', 'title': "Online", 'store': {'slug': 'online'}},
+    ]
+    index = build_map_index(records, gazetteer)
+    assert len(index) == 3
+
+    assert index.export_tiles(str(tmp_path)) == len(index.cells)
+    manifest = json.loads((tmp_path / 'index.json').read_text())
+    placed = {}
+    for code, cell in manifest['cells'].items():
+        for offer in json.loads((tmp_path / f"{code}.json").read_text()):
+            south, west, north, east = cell['bounds']
+            assert south <= offer['latitude'] <= north and west <= offer['longitude'] <= east
+            placed.setdefault(offer['_id'], []).append(offer.get('branch'))
+    assert sorted(placed['1']) == ['Centro', 'Costa'] and placed['2'] == [None] and '3' not in placed
+
+
+def test_tiles_of_emptied_cells_are_removed(tmp_path):
+    index = SpatialIndex()
+    index.add(-33.44, -70.65, {'_id': '1'})
+    index.add(-33.02, -71.55, {'_id': '2'})
+    index.export_tiles(str(tmp_path))
+
+    index = SpatialIndex()
+    index.add(-33.44, -70.65, {'_id': '1'})
+    index.export_tiles(str(tmp_path))
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(['index.json', f"{geohash_encode(-33.44, -70.65, 5)}.json"])
@@ -0,0 +1,60 @@
+import pytest
+from pymongo.errors import BulkWriteError
+
+from conftest import ListScraper, card
+
+
+@pytest.fixture
+def stores(mongo):
+    # The unique indexes of backend/models/Store.js
+    mongo['stores'].create_index('name', unique=True)
+    mongo['stores'].create_index('slug', unique=True)
+    return mongo['stores']
+
+
+def failing_insert(code):
+    def insert_many(documents, ordered=True):
+        raise BulkWriteError({'writeErrors': [{'index': i, 'code': code, 'errmsg': 'rejected'}
+                                              for i in range(len(documents))]})
+    return insert_many
+
+
+def test_new_stores_are_created_once(mongo, stores):
+    ListScraper([card('a', store="Fork"), card('b', store="Fork"), card('c', store="Tanta")]).run()
+    assert sorted(s['slug'] for s in stores.find()) == ['fork', 'tanta']
+    fork = stores.find_one({'slug': 'fork'})['_id']
+    assert {d['externalId'] for d in mongo['discounts'].find({'store': fork})} == {'a', 'b'}
+
+
+def test_a_store_saved_under_another_slug_is_found_by_name(mongo, stores):
+    existing = stores.insert_one({'name': "Fork", 'slug': 'fork-restaurant'}).inserted_id
+    ListScraper([card('a', store="Fork")]).run()
+    assert stores.count_documents({}) == 1
+    assert mongo['discounts'].find_one({'externalId': 'a'})['store'] == existing
+
+
+def test_a_store_created_concurrently_is_picked_up(mongo, stores, monkeypatch):
+    def insert_elsewhere(documents, ordered=True):
+        # Another scraper wins the race for every store
+        for document in documents:
+            stores.database['stores'].insert_one(dict(document))
+        failing_insert(11000)(documents)
+
+    monkeypatch.setattr(stores, 'insert_many', insert_elsewhere, raising=False)
+    ListScraper([card('a', store="Fork")]).run()
+    assert mongo['discounts'].find_one({'externalId': 'a'})['store'] == stores.find_one({'slug': 'fork'})['_id']
+
+
+def test_errors_other_than_duplicate_keys_are_raised(mongo, stores, monkeypatch):
+    monkeypatch.setattr(stores, 'insert_many', failing_insert(121), raising=False)
+    scraper = ListScraper()
+    with pytest.raises(BulkWriteError):
+        scraper.save(scraper.parse([card('a', store="Fork")]))
+
+
+def test_offers_of_a_store_that_could_not_be_saved_are_skipped(mongo, stores, monkeypatch):
+    stores.insert_one({'name': "Tanta", 'slug': 'tanta'})
+    monkeypatch.setattr(stores, 'insert_many', failing_insert(11000), raising=False)
+    scraper = ListScraper()
+    assert scraper.save(scraper.parse([card('a', store="Fork"), card('b', store="Tanta")])) == 1
+    assert [d['externalId'] for d in mongo['discounts'].find()] == ['b']
@@ -81,6 +81,11 @@ export default function DiscountCard({ discount }) {
         <p className="text-sm text-gray-500 line-clamp-3 mb-4 flex-grow">
           {discount.description}
         </p>
+        {discount.alsoWith?.length > 0 && (
+          <p className="text-xs text-gray-400 mb-4">
+            También con {discount.alsoWith.join(', ')}
+          </p>
+        )}
         
         {/* Feedback Section */}
         <div className="flex items-center justify-between mb-4 text-sm text-gray-500">
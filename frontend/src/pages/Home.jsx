@@ -34,6 +34,19 @@ export default function Home() {
     ? discounts 
     : discounts.filter(d => d.paymentMethod === selectedBank);
 
+  // The same promotion under several banks (same offerGroupId) gets one card
+  const groupedDiscounts = [...filteredDiscounts.reduce((groups, discount) => {
+    const key = discount.offerGroupId || discount._id || discount.externalId;
+    const group = groups.get(key);
+    if (!group) {
+      groups.set(key, { ...discount, alsoWith: [] });
+    } else if (discount.paymentMethod && discount.paymentMethod !== group.paymentMethod
+               && !group.alsoWith.includes(discount.paymentMethod)) {
+      group.alsoWith.push(discount.paymentMethod);
+    }
+    return groups;
+  }, new Map()).values()];
+
   const handleCrawl = async () => {
     if (!window.confirm('¿Estás seguro de actualizar los datos? Esto puede tardar unos segundos.')) return;
     setLoading(true);
@@ -87,7 +100,7 @@ export default function Home() {
           </div>
         ) : (
           <div className="grid grid-cols-1 gap-y-10 gap-x-6 sm:grid-cols-2 lg:grid-cols-3 xl:gap-x-8">
-            {filteredDiscounts.map((discount) => (
+            {groupedDiscounts.map((discount) => (
               <DiscountCard key={discount._id || discount.externalId} discount={discount} />
             ))}
           </div>
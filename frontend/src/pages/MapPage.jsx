@@ -1,5 +1,5 @@
-import React, { useEffect, useState } from 'react';
-import { MapContainer, TileLayer, Marker, Popup, useMap } from 'react-leaflet';
+import React, { useCallback, useEffect, useState } from 'react';
+import { MapContainer, TileLayer, Marker, Popup, useMap, useMapEvents } from 'react-leaflet';
 import 'leaflet/dist/leaflet.css';
 import axios from 'axios';
 import L from 'leaflet';
@@ -38,6 +38,19 @@ function LocationMarker() {
   );
 }
 
+// Reports the visible area on load and after every pan/zoom
+function ViewportWatcher({ onChange }) {
+  const map = useMapEvents({
+    moveend: () => onChange(map.getBounds()),
+  });
+
+  useEffect(() => {
+    onChange(map.getBounds());
+  }, [map, onChange]);
+
+  return null;
+}
+
 export default function MapPage() {
   const [discounts, setDiscounts] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -46,21 +59,24 @@ export default function MapPage() {
   // Santiago Center coordinates
   const center = [-33.4489, -70.6693];
 
-  useEffect(() => {
-    const fetchDiscounts = async () => {
+  const fetchDiscounts = useCallback(async (bounds) => {
+    setLoading(true);
+    try {
+      // Only the offers in view, looked up in the crawler's map tiles
+      const bbox = [bounds.getSouth(), bounds.getWest(), bounds.getNorth(), bounds.getEast()].join(',');
+      const response = await axios.get(`${API_URL}/api/discounts/map`, { params: { bbox } });
+      setDiscounts(response.data);
+    } catch (error) {
       try {
+        // No tiles yet: fall back to every discount that has coordinates
         const response = await axios.get(`${API_URL}/api/discounts`);
-        // Filter discounts that have coordinates
-        const geoDiscounts = response.data.filter(d => d.latitude && d.longitude);
-        setDiscounts(geoDiscounts);
-      } catch (error) {
-        console.error("Error fetching discounts", error);
-      } finally {
-        setLoading(false);
+        setDiscounts(response.data.filter(d => d.latitude && d.longitude));
+      } catch (fallbackError) {
+        console.error("Error fetching discounts", fallbackError);
       }
-    };
-
-    fetchDiscounts();
+    } finally {
+      setLoading(false);
+    }
   }, []);
 
   // Extract unique payment methods
@@ -92,50 +108,54 @@ export default function MapPage() {
         </div>
       </div>
 
-      {loading ? (
-        <div className="flex justify-center items-center h-full">
-          <div className="animate-spin rounded-full h-32 w-32 border-b-2 border-primary"></div>
+      {loading && (
+        <div className="absolute top-4 left-1/2 -translate-x-1/2 z-[1000]">
+          <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-primary"></div>
         </div>
-      ) : (
-        <MapContainer center={center} zoom={13} scrollWheelZoom={true} style={{ height: '100%', width: '100%' }}>
-          <TileLayer
-            attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
-            url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
-          />
-          <LocationMarker />
-          {filteredDiscounts.map((discount) => (
-            <Marker 
-              key={discount._id || discount.externalId} 
-              position={[discount.latitude, discount.longitude]}
-            >
-              <Popup className="custom-popup">
-                <div className="w-64 p-1">
-                  <div className="relative h-32 mb-2 rounded-lg overflow-hidden">
-                    <img 
-                      src={discount.imageUrl || "https://via.placeholder.com/400x200?text=Oferta"} 
-                      alt={discount.title}
-                      className="w-full h-full object-cover"
-                    />
-                    <div className="absolute top-2 right-2 bg-primary text-white text-xs font-bold px-2 py-1 rounded">
-                      {discount.discountPercentage}% OFF
-                    </div>
+      )}
+
+      <MapContainer center={center} zoom={13} scrollWheelZoom={true} style={{ height: '100%', width: '100%' }}>
+        <TileLayer
+          attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+          url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
+        />
+        <LocationMarker />
+        <ViewportWatcher onChange={fetchDiscounts} />
+        {filteredDiscounts.map((discount) => (
+          <Marker 
+            key={`${discount._id || discount.externalId}@${discount.latitude},${discount.longitude}`}
+            position={[discount.latitude, discount.longitude]}
+          >
+            <Popup className="custom-popup">
+              <div className="w-64 p-1">
+                <div className="relative h-32 mb-2 rounded-lg overflow-hidden">
+                  <img 
+                    src={discount.imageUrl || "https://via.placeholder.com/400x200?text=Oferta"} 
+                    alt={discount.title}
+                    className="w-full h-full object-cover"
+                  />
+                  <div className="absolute top-2 right-2 bg-primary text-white text-xs font-bold px-2 py-1 rounded">
+                    {discount.discountPercentage}% OFF
                   </div>
-                  <h3 className="font-bold text-sm mb-1 line-clamp-2">{discount.title}</h3>
-                  <p className="text-xs text-gray-500 mb-2">{discount.store?.name || discount.store_name}</p>
-                  <a 
-                    href={`${API_URL}/api/track/${discount._id || discount.externalId}`}
-                    target="_blank" 
-                    rel="noopener noreferrer"
-                    className="block w-full text-center bg-gray-900 text-white text-xs font-bold py-2 rounded hover:bg-primary transition-colors"
-                  >
-                    Ir a la Oferta
-                  </a>
                 </div>
-              </Popup>
-            </Marker>
-          ))}
-        </MapContainer>
-      )}
+                <h3 className="font-bold text-sm mb-1 line-clamp-2">{discount.title}</h3>
+                <p className="text-xs text-gray-500 mb-2">
+                  {discount.store?.name || discount.store_name}
+                  {discount.branch && ` · ${discount.branch}`}
+                </p>
+                <a 
+                  href={`${API_URL}/api/track/${discount._id || discount.externalId}`}
+                  target="_blank" 
+                  rel="noopener noreferrer"
+                  className="block w-full text-center bg-gray-900 text-white text-xs font-bold py-2 rounded hover:bg-primary transition-colors"
+                >
+                  Ir a la Oferta
+                </a>
+              </div>
+            </Popup>
+          </Marker>
+        ))}
+      </MapContainer>
     </div>
   );
 }